@@ -0,0 +1,162 @@
+"""
+Change Batcher Module
+
+This module coalesces hub change notifications before they are broadcast. Messages added
+within a short window are deduplicated per resource (message type and path, or project
+for project-level messages); when the window closes a single change is sent unchanged,
+while several are sent as one `batch` message. Within a batch, changes of the same kind
+are merged (e.g. every `document_updated` becomes one message with `paths`), so a bulk
+operation touching hundreds of files costs each client one refetch per kind of resource.
+Changes that carry a per-project revision (tasks_updated, project_updated) are never
+merged: the revision only describes the one project it was issued for.
+
+Batch message:
+    {"type": "batch", "project_ids": [...], "resources": [...types], "changes": [...merged messages]}
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Any, Callable, Awaitable, Optional, Tuple
+
+from log_setup import RateLimitedLog
+
+logger = logging.getLogger(__name__)
+batch_log = RateLimitedLog(logger)
+
+# Per-change fields that are collected into lists when changes are merged
+MERGED_FIELDS = {"project_id": "project_ids", "path": "paths"}
+IGNORED_MERGE_FIELDS = {"event"}
+
+
+def change_key(message: Dict[str, Any]) -> Tuple:
+    """Identity of the resource a change message refers to (used for deduplication)."""
+    return (message.get("type"), message.get("path") or message.get("project_id"),
+            message.get("date"), message.get("session_id"))
+
+
+def merge_changes(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge changes of the same kind into one message each
+
+    Changes are grouped by type plus every field other than project_id, path and event;
+    each group becomes one message with project_ids/paths lists. project_id and path keep
+    the first value so single-resource consumers still work. Changes with a "revision"
+    are passed through unmerged, since clients check it against their copy of that one
+    project's stream.
+
+    Args:
+        changes: Deduplicated change messages in arrival order
+
+    Returns:
+        Merged change messages in order of first appearance
+    """
+    groups: Dict[Tuple, Dict[str, Any]] = {}
+    for index, change in enumerate(changes):
+        if "revision" in change:
+            groups[("revision", index)] = change
+            continue
+        extras = tuple(sorted((k, v) for k, v in change.items()
+                              if k not in MERGED_FIELDS and k not in IGNORED_MERGE_FIELDS
+                              and isinstance(v, (str, int, float, bool, type(None)))))
+        merged = groups.get(extras)
+        if merged is None:
+            merged = groups[extras] = {k: v for k, v in change.items() if k not in IGNORED_MERGE_FIELDS}
+        for field, list_field in MERGED_FIELDS.items():
+            value = change.get(field)
+            if value is not None:
+                values = merged.setdefault(list_field, [])
+                if value not in values:
+                    values.append(value)
+    return list(groups.values())
+
+
+class ChangeBatcher:
+    """Collects change messages over a short window and broadcasts them together."""
+
+    def __init__(self, send: Callable[[Dict[str, Any]], Awaitable[None]], window: float = 0.25):
+        """
+        Initialize the batcher
+
+        Args:
+            send: Coroutine function that broadcasts a message
+            window: Seconds changes are collected after the first one arrives (0 only
+                coalesces changes queued in the same event loop iteration)
+        """
+        self.send = send
+        self.window = window
+        self._pending: Dict[Tuple, Dict[str, Any]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.received = 0
+        self.deduplicated = 0
+        self.batches_sent = 0
+        self.messages_sent = 0
+
+    def add(self, message: Dict[str, Any]):
+        """
+        Queue a change message; must be called on the event loop
+
+        (From other threads use loop.call_soon_threadsafe(batcher.add, message).)
+        """
+        self.received += 1
+        key = change_key(message)
+        if key in self._pending:
+            self.deduplicated += 1
+            # Keep the first position but the latest content (e.g. the final event type)
+        self._pending[key] = message
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.window, self._start_flush)
+
+    def _start_flush(self):
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        """Broadcast everything collected so far."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        changes = list(self._pending.values())
+        self._pending.clear()
+        if not changes:
+            return
+        if len(changes) == 1:
+            message = changes[0]
+        else:
+            merged = merge_changes(changes)
+            project_ids: List[str] = []
+            for change in merged:
+                for project_id in change.get("project_ids", []):
+                    if project_id not in project_ids:
+                        project_ids.append(project_id)
+            message = {
+                "type": "batch",
+                "project_ids": project_ids,
+                "resources": sorted({change["type"] for change in merged}),
+                "changes": merged,
+            }
+            self.batches_sent += 1
+            batch_log.info("batch.sent", "Coalesced changes into one batch", changes=len(changes), messages=len(merged))
+        self.messages_sent += 1
+        try:
+            await self.send(message)
+        except Exception as e:
+            logger.error(f"Error broadcasting change batch: {e}", exc_info=True)
+
+    async def close(self):
+        """Send pending changes and wait for running flushes (used on shutdown)."""
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window,
+            "pending": len(self._pending),
+            "received": self.received,
+            "deduplicated": self.deduplicated,
+            "batches_sent": self.batches_sent,
+            "messages_sent": self.messages_sent,
+        }
@@ -0,0 +1,250 @@
+"""
+Chat Session Index Module
+
+This module keeps an in-memory index of chat sessions so that listing and searching
+sessions never has to open the session files. It holds one metadata entry per session
+(title, timestamps, message count, first/last snippet) and inverted token indexes over
+message contents and titles, so a search only looks at sessions that contain every query
+token. The ChatSessionStore updates it on every write.
+"""
+
+import re
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_LENGTH = 80
+PREVIEW_LENGTH = 160
+MAX_SNIPPETS_PER_RESULT = 3
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens of at least two characters."""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1]
+
+
+def _snippet(text: str, length: int) -> str:
+    text = " ".join((text or "").split())
+    return text[:length] + ("..." if len(text) > length else "")
+
+
+class ChatSessionIndex:
+    """In-memory metadata and full-text index over chat sessions."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # token -> session_id -> positions of the messages containing the token
+        self._postings: Dict[str, Dict[str, Set[int]]] = {}
+        # session_id -> message position -> (message id, role, preview)
+        self._previews: Dict[str, Dict[int, Tuple[str, str, str]]] = {}
+        # session_id -> tokens present in the session, used for removal
+        self._session_tokens: Dict[str, Set[str]] = {}
+        # token -> sessions whose title contains the token
+        self._title_postings: Dict[str, Set[str]] = {}
+        self.ready = False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+            self._previews.clear()
+            self._session_tokens.clear()
+            self._title_postings.clear()
+            self.ready = False
+
+    # --- Updates ---
+    def add_session(self, header: Dict[str, Any], messages: Optional[List[Dict[str, Any]]] = None):
+        """
+        Index a whole session, replacing any previous entry for it
+
+        Args:
+            header: Session header as stored by ChatSessionStore
+            messages: All messages of the session, in order
+        """
+        with self._lock:
+            self.remove_session(header["id"])
+            self._store_entry(header)
+            if messages:
+                self.add_messages(header, messages, start_position=0)
+
+    def add_messages(self, header: Dict[str, Any], messages: List[Dict[str, Any]],
+                     start_position: Optional[int] = None):
+        """
+        Index messages appended to a session
+
+        Args:
+            header: Session header after the append
+            messages: The newly appended messages
+            start_position: Position of the first new message (defaults to count - len(messages))
+        """
+        session_id = header["id"]
+        if start_position is None:
+            start_position = max(0, header.get("messageCount", len(messages)) - len(messages))
+        with self._lock:
+            entry = self._store_entry(header)
+
+            previews = self._previews.setdefault(session_id, {})
+            session_tokens = self._session_tokens.setdefault(session_id, set())
+            for offset, message in enumerate(messages):
+                position = start_position + offset
+                content = message.get("content") or ""
+                if position == 0:
+                    entry["firstSnippet"] = _snippet(content, SNIPPET_LENGTH)
+                previews[position] = (message.get("id", ""), message.get("role", ""),
+                                      _snippet(content, PREVIEW_LENGTH))
+                for token in set(tokenize(content)):
+                    self._postings.setdefault(token, {}).setdefault(session_id, set()).add(position)
+                    session_tokens.add(token)
+            if messages:
+                entry["lastSnippet"] = _snippet(messages[-1].get("content") or "", SNIPPET_LENGTH)
+
+    def update_header(self, header: Dict[str, Any]):
+        """Refresh the metadata of a session without touching its messages."""
+        with self._lock:
+            self._store_entry(header)
+
+    def remove_session(self, session_id: str):
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self._unindex_title(session_id, entry["title"])
+            self._previews.pop(session_id, None)
+            for token in self._session_tokens.pop(session_id, set()):
+                sessions = self._postings.get(token)
+                if sessions is None:
+                    continue
+                sessions.pop(session_id, None)
+                if not sessions:
+                    del self._postings[token]
+
+    # --- Queries ---
+    def list_sessions(self, offset: int = 0, limit: int = 50) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        List sessions ordered by most recent update
+
+        Args:
+            offset: Number of sessions to skip
+            limit: Maximum number of sessions to return
+
+        Returns:
+            Tuple of (page of session entries, total number of sessions)
+        """
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: e.get("lastUpdated") or "", reverse=True)
+            page = [dict(entry) for entry in entries[offset:offset + limit]]
+        return page, len(entries)
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Full-text search over session titles and message contents
+
+        All query tokens must occur in a session for it to match. Sessions are ranked by
+        the number of messages that contain every query token, then by recency.
+
+        Args:
+            query: Free-text query
+            offset: Number of results to skip
+            limit: Maximum number of results to return
+
+        Returns:
+            Tuple of (page of results, total number of matching sessions)
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return [], 0
+
+        with self._lock:
+            # Candidates come from the posting lists, smallest first, so the cost follows
+            # the number of matching sessions rather than the number of sessions
+            token_sessions = []
+            for token in tokens:
+                sessions = set(self._postings.get(token, ()))
+                sessions |= self._title_postings.get(token, set())
+                if not sessions:
+                    return [], 0
+                token_sessions.append(sessions)
+            token_sessions.sort(key=len)
+            candidates = token_sessions[0].intersection(*token_sessions[1:])
+
+            results = []
+            for session_id in candidates:
+                entry = self._entries.get(session_id)
+                if entry is None:
+                    continue
+                per_token_positions = []
+                for token in tokens:
+                    positions = self._postings.get(token, {}).get(session_id)
+                    if positions:
+                        per_token_positions.append(positions)
+
+                if per_token_positions:
+                    hit_positions = set.intersection(*per_token_positions)
+                    if not hit_positions:
+                        hit_positions = set.union(*per_token_positions)
+                else:
+                    hit_positions = set()
+
+                previews = self._previews.get(session_id, {})
+                snippets = []
+                for position in sorted(hit_positions, reverse=True)[:MAX_SNIPPETS_PER_RESULT]:
+                    message_id, role, preview = previews.get(position, ("", "", ""))
+                    snippets.append({"message_id": message_id, "role": role,
+                                     "position": position, "snippet": preview})
+
+                result = dict(entry)
+                result["score"] = len(hit_positions)
+                result["matches"] = snippets
+                results.append(result)
+
+        results.sort(key=lambda r: (r["score"], r.get("lastUpdated") or ""), reverse=True)
+        return results[offset:offset + limit], len(results)
+
+    # --- Helpers ---
+    def _store_entry(self, header: Dict[str, Any]) -> Dict[str, Any]:
+        """Create or refresh a session's entry, keeping the title index in step."""
+        session_id = header["id"]
+        entry = self._entries.get(session_id)
+        if entry is None:
+            entry = self._entries[session_id] = self._entry_from_header(header)
+            self._index_title(session_id, entry["title"])
+            return entry
+        old_title = entry["title"]
+        entry.update(self._entry_from_header(header, keep=entry))
+        if entry["title"] != old_title:
+            self._unindex_title(session_id, old_title)
+            self._index_title(session_id, entry["title"])
+        return entry
+
+    def _index_title(self, session_id: str, title: str):
+        for token in set(tokenize(title)):
+            self._title_postings.setdefault(token, set()).add(session_id)
+
+    def _unindex_title(self, session_id: str, title: str):
+        for token in set(tokenize(title)):
+            sessions = self._title_postings.get(token)
+            if sessions is None:
+                continue
+            sessions.discard(session_id)
+            if not sessions:
+                del self._title_postings[token]
+
+    @staticmethod
+    def _entry_from_header(header: Dict[str, Any], keep: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        keep = keep or {}
+        return {
+            "id": header["id"],
+            "title": header.get("title") or header["id"],
+            "lastMessage": header.get("lastMessage", ""),
+            "lastUpdated": header.get("lastUpdated"),
+            "created_at": header.get("created_at"),
+            "messageCount": header.get("messageCount", 0),
+            "firstSnippet": keep.get("firstSnippet", ""),
+            "lastSnippet": keep.get("lastSnippet", ""),
+        }
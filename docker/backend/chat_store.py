@@ -0,0 +1,418 @@
+"""
+Chat Session Store Module
+
+This module provides append-only storage for chat sessions in the LocalDashboard application.
+Each session is kept as two files inside the sessions directory:
+
+    {session_id}.jsonl      one JSON-encoded message per line, only ever appended to
+    {session_id}.meta.json  a small header (title, timestamps, message count)
+
+Appending a turn writes only the new messages plus the header, and recent-history reads
+seek backwards from the end of the log instead of loading the whole session.
+Legacy single-file sessions ({session_id}.json with an embedded "messages" list) are
+converted on startup or on first access.
+
+Session listing and search are answered from a ChatSessionIndex that the store keeps
+up to date on every write.
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from chat_index import ChatSessionIndex
+
+logger = logging.getLogger(__name__)
+
+LOG_SUFFIX = ".jsonl"
+HEADER_SUFFIX = ".meta.json"
+LEGACY_SUFFIX = ".json"
+MIGRATED_SUFFIX = ".json.migrated"
+# A session id ending in this would make its legacy path another session's header
+RESERVED_ID_SUFFIX = HEADER_SUFFIX[:-len(LEGACY_SUFFIX)]
+
+# Block size used when scanning a message log backwards from its end
+TAIL_BLOCK_SIZE = 8192
+
+
+class ChatSessionStore:
+    """Store for chat sessions backed by append-only JSONL message logs."""
+
+    def __init__(self, sessions_path: Path, index: Optional[ChatSessionIndex] = None):
+        """
+        Initialize the store
+
+        Args:
+            sessions_path: Directory holding the session files
+            index: Session index to maintain (a new one is created if omitted)
+        """
+        self.sessions_path = sessions_path
+        self.index = index or ChatSessionIndex()
+        self._lock = threading.RLock()
+
+    # --- Paths ---
+    def _log_path(self, session_id: str) -> Path:
+        return self.sessions_path / f"{session_id}{LOG_SUFFIX}"
+
+    def _header_path(self, session_id: str) -> Path:
+        return self.sessions_path / f"{session_id}{HEADER_SUFFIX}"
+
+    def _legacy_path(self, session_id: str) -> Path:
+        return self.sessions_path / f"{session_id}{LEGACY_SUFFIX}"
+
+    # --- Header ---
+    def _new_header(self, session_id: str, title: Optional[str] = None) -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        return {
+            "id": session_id,
+            "title": title or session_id,
+            "lastMessage": "",
+            "lastUpdated": now,
+            "created_at": now,
+            "messageCount": 0,
+        }
+
+    def _read_header(self, session_id: str) -> Optional[Dict[str, Any]]:
+        header_path = self._header_path(session_id)
+        if not header_path.exists():
+            return None
+        try:
+            with open(header_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"Error reading chat session header {header_path.name}: {e}")
+            return None
+
+    def _write_header(self, header: Dict[str, Any]):
+        """Write the header atomically so readers never see a half-written file."""
+        header_path = self._header_path(header["id"])
+        tmp_path = header_path.with_name(header_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(header, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, header_path)
+
+    # --- Public API ---
+    def exists(self, session_id: str) -> bool:
+        """Check whether a session exists in either the new or the legacy format."""
+        return (self._header_path(session_id).exists() or
+                self._log_path(session_id).exists() or
+                self._legacy_path(session_id).exists())
+
+    def get_header(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the header of a session without reading its messages
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            Header dictionary or None if the session does not exist
+        """
+        with self._lock:
+            self._ensure_migrated(session_id)
+            return self._read_header(session_id)
+
+    def create_session(self, session_id: str, title: Optional[str] = None,
+                       extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Create an empty session, or return the existing header if it already exists
+
+        Args:
+            session_id: Session identifier
+            title: Optional session title (defaults to the session id)
+            extra: Optional additional header fields
+
+        Returns:
+            The session header
+        """
+        with self._lock:
+            self._ensure_migrated(session_id)
+            header = self._read_header(session_id)
+            if header:
+                return header
+            self.sessions_path.mkdir(parents=True, exist_ok=True)
+            header = self._new_header(session_id, title)
+            if extra:
+                for key, value in extra.items():
+                    if key not in ("id", "messageCount", "messages"):
+                        header[key] = value
+            self._log_path(session_id).touch()
+            self._write_header(header)
+            self.index.update_header(header)
+            return header
+
+    def update_header(self, session_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Update header fields of a session (e.g. its title)
+
+        Args:
+            session_id: Session identifier
+            updates: Fields to change; id, messageCount and messages are ignored
+
+        Returns:
+            The updated header or None if the session does not exist
+        """
+        with self._lock:
+            self._ensure_migrated(session_id)
+            header = self._read_header(session_id)
+            if header is None:
+                return None
+            for key, value in updates.items():
+                if key not in ("id", "messageCount", "messages"):
+                    header[key] = value
+            self._write_header(header)
+            self.index.update_header(header)
+            return header
+
+    def append_messages(self, session_id: str, messages: List[Dict[str, Any]],
+                        last_message: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Append messages to a session, creating it if needed
+
+        Only the new messages are written to the log; the header is rewritten
+        but stays constant-size regardless of session length.
+
+        Args:
+            session_id: Session identifier
+            messages: Message dictionaries to append
+            last_message: Preview text stored in the header's lastMessage field
+
+        Returns:
+            The updated session header
+        """
+        with self._lock:
+            self._ensure_migrated(session_id)
+            self.sessions_path.mkdir(parents=True, exist_ok=True)
+            header = self._read_header(session_id) or self._new_header(session_id)
+
+            lines = "".join(json.dumps(msg, ensure_ascii=False) + "\n" for msg in messages)
+            with open(self._log_path(session_id), "a", encoding="utf-8") as f:
+                f.write(lines)
+
+            header["messageCount"] = header.get("messageCount", 0) + len(messages)
+            if last_message is not None:
+                header["lastMessage"] = last_message
+            header["lastUpdated"] = datetime.now().isoformat()
+            self._write_header(header)
+            self.index.add_messages(header, messages)
+            return header
+
+    def read_recent(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Read the last messages of a session by scanning the log from its end
+
+        Args:
+            session_id: Session identifier
+            limit: Maximum number of messages to return
+
+        Returns:
+            Up to `limit` messages in chronological order
+        """
+        if limit <= 0:
+            return []
+        with self._lock:
+            self._ensure_migrated(session_id)
+            log_path = self._log_path(session_id)
+            if not log_path.exists():
+                return []
+            raw_lines = self._tail_lines(log_path, limit)
+        return self._decode_lines(raw_lines, log_path)
+
+    def read_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Read every message of a session
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            All messages in chronological order
+        """
+        with self._lock:
+            self._ensure_migrated(session_id)
+            log_path = self._log_path(session_id)
+            if not log_path.exists():
+                return []
+            with open(log_path, "rb") as f:
+                raw_lines = f.read().splitlines()
+        return self._decode_lines(raw_lines, log_path)
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a session in the legacy single-document shape (header plus messages)
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            Session dictionary or None if the session does not exist
+        """
+        header = self.get_header(session_id)
+        if header is None:
+            return None
+        session = dict(header)
+        session["messages"] = self.read_messages(session_id)
+        return session
+
+    def delete_session(self, session_id: str) -> bool:
+        """
+        Delete all files belonging to a session
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            True if anything was deleted
+        """
+        deleted = False
+        with self._lock:
+            for path in (self._log_path(session_id), self._header_path(session_id),
+                         self._legacy_path(session_id)):
+                if path.exists():
+                    path.unlink()
+                    deleted = True
+            self.index.remove_session(session_id)
+        return deleted
+
+    def list_session_ids(self) -> List[str]:
+        """List the ids of all stored sessions (new and legacy formats)."""
+        if not self.sessions_path.exists():
+            return []
+        session_ids = set()
+        for path in self.sessions_path.iterdir():
+            name = path.name
+            if name.endswith(HEADER_SUFFIX):
+                session_ids.add(name[:-len(HEADER_SUFFIX)])
+            elif name.endswith(LOG_SUFFIX):
+                session_ids.add(name[:-len(LOG_SUFFIX)])
+            elif name.endswith(LEGACY_SUFFIX):
+                session_ids.add(name[:-len(LEGACY_SUFFIX)])
+        return sorted(session_ids)
+
+    # --- Index ---
+    def rebuild_index(self) -> int:
+        """
+        Rebuild the session index from disk
+
+        Returns:
+            Number of sessions indexed
+        """
+        with self._lock:
+            self.index.clear()
+            count = 0
+            for session_id in self.list_session_ids():
+                header = self.get_header(session_id)
+                if header is None:
+                    continue
+                self.index.add_session(header, self.read_messages(session_id))
+                count += 1
+            self.index.ready = True
+        logger.info(f"Indexed {count} chat sessions")
+        return count
+
+    def _ensure_index(self):
+        if not self.index.ready:
+            self.rebuild_index()
+
+    def list_sessions(self, offset: int = 0, limit: int = 50) -> Tuple[List[Dict[str, Any]], int]:
+        """List sessions from the index, most recently updated first."""
+        self._ensure_index()
+        return self.index.list_sessions(offset, limit)
+
+    def search_sessions(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+        """Search session titles and message contents through the index."""
+        self._ensure_index()
+        return self.index.search(query, offset, limit)
+
+    # --- Migration ---
+    def migrate_legacy_sessions(self) -> int:
+        """
+        Convert every legacy {id}.json session into the JSONL log + header layout
+
+        Returns:
+            Number of sessions migrated
+        """
+        if not self.sessions_path.exists():
+            return 0
+        migrated = 0
+        with self._lock:
+            for path in sorted(self.sessions_path.glob(f"*{LEGACY_SUFFIX}")):
+                if path.name.endswith(HEADER_SUFFIX):
+                    continue
+                if self._migrate_legacy_file(path):
+                    migrated += 1
+        if migrated:
+            logger.info(f"Migrated {migrated} legacy chat sessions to JSONL storage")
+        return migrated
+
+    def _ensure_migrated(self, session_id: str):
+        legacy_path = self._legacy_path(session_id)
+        if legacy_path.name.endswith(HEADER_SUFFIX):
+            return  # Header of another session, never a legacy session file
+        if legacy_path.exists():
+            self._migrate_legacy_file(legacy_path)
+
+    def _migrate_legacy_file(self, legacy_path: Path) -> bool:
+        session_id = legacy_path.name[:-len(LEGACY_SUFFIX)]
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                session_data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"Cannot migrate chat session {legacy_path.name}: {e}")
+            return False
+        if not isinstance(session_data, dict):
+            logger.warning(f"Skipping chat session with unexpected format: {legacy_path.name}")
+            return False
+
+        messages = session_data.pop("messages", None) or []
+        header = self._new_header(session_id)
+        header.update({k: v for k, v in session_data.items() if k != "id"})
+        header["messageCount"] = len(messages)
+        if "created_at" not in session_data and messages:
+            header["created_at"] = messages[0].get("timestamp", header["created_at"])
+
+        # Write the log first so an interrupted migration never loses messages:
+        # the legacy file is only moved aside once both new files exist.
+        tmp_log = self._log_path(session_id).with_suffix(LOG_SUFFIX + ".tmp")
+        with open(tmp_log, "w", encoding="utf-8") as f:
+            for msg in messages:
+                f.write(json.dumps(msg, ensure_ascii=False) + "\n")
+        os.replace(tmp_log, self._log_path(session_id))
+        self._write_header(header)
+        os.replace(legacy_path, legacy_path.with_name(f"{session_id}{MIGRATED_SUFFIX}"))
+        logger.info(f"Migrated chat session {session_id} ({len(messages)} messages)")
+        return True
+
+    # --- Log reading helpers ---
+    @staticmethod
+    def _tail_lines(log_path: Path, limit: int) -> List[bytes]:
+        """Return the last `limit` non-empty raw lines of a file, reading backwards in blocks."""
+        with open(log_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            buffer = b""
+            # One extra line is needed because the first line in the buffer may be partial
+            while position > 0 and buffer.count(b"\n") <= limit:
+                read_size = min(TAIL_BLOCK_SIZE, position)
+                position -= read_size
+                f.seek(position)
+                buffer = f.read(read_size) + buffer
+        lines = [line for line in buffer.splitlines() if line.strip()]
+        return lines[-limit:]
+
+    @staticmethod
+    def _decode_lines(raw_lines: List[bytes], log_path: Path) -> List[Dict[str, Any]]:
+        messages = []
+        for raw in raw_lines:
+            if not raw.strip():
+                continue
+            try:
+                messages.append(json.loads(raw.decode("utf-8")))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # A torn final line from an interrupted append is skipped, not fatal
+                logger.warning(f"Skipping unreadable line in chat log {log_path.name}")
+        return messages
@@ -0,0 +1,207 @@
+"""
+Chat Summarizer Module
+
+This module keeps chat prompts bounded by compacting long sessions. Once the messages that
+are not yet covered by a session's running summary exceed a token threshold, the older
+ones are folded into the summary by a (small) model in the background. The summary is
+stored in the session header together with the number of messages it covers, and later
+turns send the summary plus only the uncovered recent messages.
+
+Token counts are estimated from character length; the estimate only has to be good enough
+to keep prompt size (and therefore prefill time) roughly flat.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from llm_scheduler import PRIORITY_BACKGROUND
+from prompt_layout import history_window_start
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Long messages are clipped in the summarization prompt so it stays bounded too
+MAX_CHARS_PER_MESSAGE = 2000
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and an assistant that "
+    "manages projects and tasks. Merge the existing summary with the new messages into one "
+    "updated summary. Keep facts, decisions, names, project and task ids, dates and open "
+    "questions; drop greetings and repetition. Write plain prose or short bullet points, at "
+    "most {max_words} words, and reply with the summary only."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def messages_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(estimate_tokens(m.get("content", "")) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+class ChatSummarizer:
+    """Builds bounded chat histories and compacts sessions into running summaries."""
+
+    def __init__(self, store, scheduler, model_id: Optional[str] = None,
+                 threshold_tokens: int = 3000, keep_recent_tokens: int = 1200,
+                 min_recent_messages: int = 4, max_summary_words: int = 250):
+        """
+        Initialize the summarizer
+
+        Args:
+            store: ChatSessionStore holding the sessions
+            scheduler: LLMScheduler used for summarization calls
+            model_id: Model used for summaries; defaults to the session's chat model
+            threshold_tokens: Uncovered history size that triggers compaction (0 disables it)
+            keep_recent_tokens: Approximate size of the recent messages left verbatim
+            min_recent_messages: Messages always left verbatim
+            max_summary_words: Length limit given to the summarizing model
+        """
+        self.store = store
+        self.scheduler = scheduler
+        self.model_id = model_id
+        self.threshold_tokens = threshold_tokens
+        self.keep_recent_tokens = keep_recent_tokens
+        self.min_recent_messages = min_recent_messages
+        self.max_summary_words = max_summary_words
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_tokens > 0
+
+    def build_history(self, session_id: str, fallback_messages: int = 10,
+                      fallback_step: int = 6) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Get the running summary and the messages it does not cover yet
+
+        If compaction is disabled or lagging behind and the uncovered messages exceed twice
+        the threshold, only a stepped window of recent messages is returned.
+
+        Args:
+            session_id: Session identifier
+            fallback_messages: Minimum messages kept by the fallback window
+            fallback_step: Step in which the fallback window drops old messages
+
+        Returns:
+            Tuple of (summary text or None, uncovered messages in order)
+        """
+        header = self.store.get_header(session_id)
+        if not header:
+            return None, []
+        message_count = header.get("messageCount", 0)
+        summary = header.get("summary") or {}
+        covered = min(summary.get("covers", 0), message_count)
+
+        uncovered = message_count - covered
+        hard_cap = self.threshold_tokens * 2 if self.enabled else 0
+        if not hard_cap:
+            # Without compaction only the fallback window is ever used, so read just that
+            start = history_window_start(uncovered, fallback_messages, fallback_step)
+            return summary.get("text") or None, self.store.read_recent(session_id, uncovered - start)
+
+        messages = self.store.read_recent(session_id, uncovered)
+        if messages_tokens(messages) > hard_cap:
+            messages = messages[history_window_start(len(messages), fallback_messages, fallback_step):]
+        return summary.get("text") or None, messages
+
+    def schedule(self, session_id: str, model_id: str):
+        """Start a background compaction of the session if it needs one and none is running."""
+        if not self.enabled or session_id in self._running:
+            return
+        self._running.add(session_id)
+        task = asyncio.create_task(self._compact_guarded(session_id, model_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _compact_guarded(self, session_id: str, model_id: str):
+        try:
+            await self.compact(session_id, model_id)
+        except Exception as e:
+            logger.error(f"Error compacting chat session {session_id}: {e}", exc_info=True)
+        finally:
+            self._running.discard(session_id)
+
+    async def compact(self, session_id: str, model_id: str) -> bool:
+        """
+        Fold older uncovered messages into the session's running summary
+
+        Args:
+            session_id: Session identifier
+            model_id: Chat model of the session (used if no summary model is configured)
+
+        Returns:
+            True if the summary was updated
+        """
+        header = self.store.get_header(session_id)
+        if not header:
+            return False
+        message_count = header.get("messageCount", 0)
+        summary = header.get("summary") or {}
+        covered = min(summary.get("covers", 0), message_count)
+        messages = self.store.read_recent(session_id, message_count - covered) if message_count > covered else []
+        if messages_tokens(messages) <= self.threshold_tokens:
+            return False
+
+        boundary = self._split_point(messages)
+        if boundary <= 0:
+            return False
+
+        summary_model = self.model_id or model_id
+        prompt = [
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS.format(max_words=self.max_summary_words)},
+            {"role": "user", "content": self._summary_input(summary.get("text"), messages[:boundary])},
+        ]
+        logger.info(f"Compacting chat session {session_id}: summarizing {boundary} messages with {summary_model}")
+        response = await self.scheduler.chat_completion_async(summary_model, prompt, temperature=0.2,
+                                                              priority=PRIORITY_BACKGROUND)
+        text = (response or {}).get("content", "").strip()
+        if not text or str(response.get("id", "")).startswith("error_"):
+            logger.warning(f"Chat session {session_id} was not compacted: summarization failed")
+            return False
+
+        self.store.update_header(session_id, {"summary": {
+            "text": text,
+            "covers": covered + boundary,
+            "model": summary_model,
+            "updated_at": datetime.now().isoformat(),
+        }})
+        logger.info(f"Chat session {session_id} summary now covers {covered + boundary} of {message_count} messages")
+        return True
+
+    async def wait_idle(self):
+        """Wait for running compactions (used on shutdown)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    # --- Helpers ---
+    def _split_point(self, messages: List[Dict[str, Any]]) -> int:
+        """Index of the first message left verbatim; older messages get summarized."""
+        kept_tokens = 0
+        boundary = len(messages)
+        while boundary > 0:
+            size = messages_tokens([messages[boundary - 1]])
+            if len(messages) - boundary >= self.min_recent_messages and kept_tokens + size > self.keep_recent_tokens:
+                break
+            kept_tokens += size
+            boundary -= 1
+        # Start the verbatim part on a user turn so question and answer stay together
+        while 0 < boundary < len(messages) and messages[boundary].get("role") != "user":
+            boundary -= 1
+        return boundary
+
+    @staticmethod
+    def _summary_input(previous_summary: Optional[str], messages: List[Dict[str, Any]]) -> str:
+        lines = [f"Existing summary:\n{previous_summary or '(none)'}", "", "New messages:"]
+        for message in messages:
+            content = message.get("content", "")
+            if len(content) > MAX_CHARS_PER_MESSAGE:
+                content = content[:MAX_CHARS_PER_MESSAGE] + " [...]"
+            lines.append(f"{message.get('role', 'user').capitalize()}: {content}")
+        return "\n".join(lines)
@@ -0,0 +1,130 @@
+"""
+Circuit Breaker Module
+
+This module provides a circuit breaker for calls to an unreliable upstream (Ollama). After
+a number of consecutive failures the breaker opens and calls fail fast instead of each one
+waiting for a connect timeout. While open, a background thread probes the upstream with a
+cheap request; the first successful probe closes the breaker again.
+
+States:
+    closed - calls go through; consecutive failures are counted
+    open   - calls are rejected immediately; the upstream is probed in the background
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a background recovery probe."""
+
+    def __init__(self, name: str, failure_threshold: int = 3, probe_interval: float = 5.0,
+                 probe: Optional[Callable[[], None]] = None):
+        """
+        Initialize the breaker
+
+        Args:
+            name: Name used in logs and status
+            failure_threshold: Consecutive failures that open the breaker
+            probe_interval: Seconds between recovery probes while open
+            probe: Callable that raises if the upstream is still unhealthy
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.probe_interval = probe_interval
+        self.probe = probe
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._last_failure_at: Optional[float] = None
+        self._last_probe_at: Optional[float] = None
+        self._probe_thread: Optional[threading.Thread] = None
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Check whether a call may be made; counts rejected calls."""
+        with self._lock:
+            if self._state == STATE_OPEN:
+                self.rejected += 1
+                return False
+            return True
+
+    def check(self):
+        """Raise CircuitOpenError if the breaker is open."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open since "
+                                   f"{time.strftime('%H:%M:%S', time.localtime(self._opened_at))}): {self._last_error}")
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+            if self._state == STATE_OPEN:
+                logger.info(f"Circuit for {self.name} closed after {time.time() - self._opened_at:.1f}s")
+            self._state = STATE_CLOSED
+            self._opened_at = None
+
+    def record_failure(self, error: Any):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._last_error = str(error)
+            self._last_failure_at = time.time()
+            if self._state == STATE_CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._state = STATE_OPEN
+                self._opened_at = time.time()
+                self.times_opened += 1
+                logger.warning(f"Circuit for {self.name} opened after {self._consecutive_failures} "
+                               f"consecutive failures: {error}")
+                self._start_probe_locked()
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "opened_at": self._opened_at,
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected,
+                "last_error": self._last_error,
+                "last_failure_at": self._last_failure_at,
+                "last_probe_at": self._last_probe_at,
+            }
+
+    # --- Probing ---
+    def _start_probe_locked(self):
+        if self.probe is None or (self._probe_thread and self._probe_thread.is_alive()):
+            return
+        self._probe_thread = threading.Thread(target=self._probe_loop, name=f"{self.name}-probe", daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        while self._state == STATE_OPEN:
+            time.sleep(self.probe_interval)
+            self._last_probe_at = time.time()
+            try:
+                self.probe()
+            except Exception as e:
+                with self._lock:
+                    self._last_error = str(e)
+                logger.debug(f"Probe of {self.name} failed: {e}")
+                continue
+            self.record_success()
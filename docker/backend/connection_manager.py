@@ -0,0 +1,410 @@
+"""
+WebSocket Connection Manager Module
+
+This module tracks the /ws connections and fans broadcast messages out to them. Clients
+may narrow what they receive by sending subscribe/unsubscribe frames for topics:
+
+    {"type": "subscribe", "topics": ["project:Project-A", "alarms"]}
+    {"type": "unsubscribe", "topics": ["alarms"]}
+
+Topics:
+    project:<id>   - task, project, document and asset changes of one project
+    alarms         - alarm/countdown changes
+    focus          - focus summaries and focus monitor status
+    meta           - pinned docs and workspace layout
+    *              - everything
+
+A connection that never subscribed receives everything, as do messages without a topic
+(LLM jobs, activity log). The manager keeps a topic -> connections index and the set of
+connections without subscriptions, so finding the recipients of a message costs the
+number of recipients, not the number of connections; each message is serialized once.
+A batch message is delivered whole to every connection subscribed to the topic of any
+of its changes, so subscribers have to skip the changes of resources they do not track.
+
+Every connection has its own bounded send queue drained by its own sender task, so a
+broadcast only enqueues and never waits for a slow client. When a queue is full, the
+overflow policy applies: "coalesce" replaces a queued notification of the same kind and
+resource with the new one (falling back to a resync if there is none), "resync" drops the
+queue and sends {"type": "resync"} so the client refetches. Heartbeat pings detect dead
+peers: clients that answer {"type": "pong"} are dropped after missing the heartbeat
+timeout, and any send that stalls past the send timeout closes the connection.
+
+With an EventLog attached, every broadcast gets an event id and is kept for replay; a
+connection opened with the last id it saw first receives the events it missed (or a
+resync if they are no longer buffered).
+"""
+
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+from event_log import EventLog
+
+logger = logging.getLogger(__name__)
+
+ALL_TOPICS = "*"
+
+RESOURCE_TOPICS = {
+    "alarms_updated": "alarms",
+    "focus_summary_updated": "focus",
+    "focus_status_changed": "focus",
+    "meta_updated": "meta",
+    "workspace_layout_updated": "meta",
+}
+
+OVERFLOW_COALESCE = "coalesce"
+OVERFLOW_RESYNC = "resync"
+
+# Notifications where only the latest message per resource matters; a newer one may
+# replace a queued one on overflow (deltas it carried are then detected as a revision gap)
+COALESCABLE_TYPES = {
+    "tasks_updated", "project_updated", "document_updated", "asset_updated", "alarms_updated",
+    "meta_updated", "focus_summary_updated", "workspace_layout_updated", "focus_status_changed",
+    "llm_job_updated", "ping",
+}
+
+
+def message_topics(message: Dict[str, Any]) -> Optional[Set[str]]:
+    """
+    Get the topics a message belongs to
+
+    Args:
+        message: Broadcast message
+
+    Returns:
+        Set of topics, or None if the message goes to every connection
+    """
+    message_type = message.get("type", "")
+    if message_type == "batch":
+        topics: Set[str] = set()
+        for change in message.get("changes", []):
+            change_topics = message_topics(change)
+            if change_topics is None:
+                return None
+            topics |= change_topics
+        return topics
+    if message_type in RESOURCE_TOPICS:
+        return {RESOURCE_TOPICS[message_type]}
+    project_ids = message.get("project_ids") or ([message["project_id"]] if message.get("project_id") else [])
+    if project_ids:
+        return {f"project:{project_id}" for project_id in project_ids}
+    return None
+
+
+def coalesce_key(message: Dict[str, Any]) -> Optional[Tuple]:
+    """Key under which a queued message may be replaced by a newer one (None: never replaced)."""
+    message_type = message.get("type")
+    if message_type not in COALESCABLE_TYPES:
+        return None
+    job_id = (message.get("job") or {}).get("id") if isinstance(message.get("job"), dict) else None
+    return (message_type, message.get("project_id"), tuple(message.get("project_ids") or ()),
+            message.get("path"), message.get("date"), job_id)
+
+
+def _peer(websocket: WebSocket) -> str:
+    client = websocket.client
+    return f"{client.host}:{client.port}" if client else "unknown"
+
+
+class _Client:
+    """A connection with its bounded send queue and sender task."""
+
+    def __init__(self, websocket: WebSocket, now: float):
+        self.websocket = websocket
+        self.queue: deque = deque()  # [coalesce key, message json] entries
+        self.queued_by_key: Dict[Tuple, list] = {}
+        self.wakeup = asyncio.Event()
+        self.sender: Optional[asyncio.Task] = None
+        self.last_seen = now
+        self.answers_pings = False
+        self.sent = 0
+        self.coalesced = 0
+        self.resyncs = 0
+
+    def push(self, key: Optional[Tuple], message_json: str):
+        entry = [key, message_json]
+        self.queue.append(entry)
+        if key is not None:
+            self.queued_by_key[key] = entry
+        self.wakeup.set()
+
+    def pop(self) -> list:
+        entry = self.queue.popleft()
+        if entry[0] is not None and self.queued_by_key.get(entry[0]) is entry:
+            del self.queued_by_key[entry[0]]
+        return entry
+
+    def clear(self) -> int:
+        dropped = len(self.queue)
+        self.queue.clear()
+        self.queued_by_key.clear()
+        return dropped
+
+
+class ConnectionManager:
+    def __init__(self, max_queue: int = 256, overflow_policy: str = OVERFLOW_COALESCE,
+                 heartbeat_interval: float = 20.0, heartbeat_timeout: float = 60.0,
+                 send_timeout: float = 10.0, event_log: Optional[EventLog] = None):
+        """
+        Initialize the manager
+
+        Args:
+            max_queue: Messages queued per connection before the overflow policy applies
+            overflow_policy: "coalesce" or "resync"
+            heartbeat_interval: Seconds between pings (0 disables heartbeats)
+            heartbeat_timeout: Seconds without any frame after which a connection that
+                answers pings is considered dead
+            send_timeout: Seconds a single send may take before the connection is closed
+            event_log: Log assigning event ids to broadcasts for replay on reconnect
+        """
+        self.max_queue = max(1, max_queue)
+        self.overflow_policy = overflow_policy if overflow_policy in (OVERFLOW_COALESCE, OVERFLOW_RESYNC) else OVERFLOW_COALESCE
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.send_timeout = send_timeout
+        self.event_log = event_log
+        self.clients: Dict[WebSocket, _Client] = {}
+        # Connections that subscribed to topics; all others receive every message
+        self.subscriptions: Dict[WebSocket, Set[str]] = {}
+        self.topic_index: Dict[str, Set[WebSocket]] = {}
+        self.unsubscribed: Set[WebSocket] = set()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.broadcasts = 0
+        self.enqueued = 0
+        self.coalesced = 0
+        self.resyncs = 0
+        self.send_timeouts = 0
+        self.send_errors = 0
+        self.heartbeat_timeouts = 0
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
+
+    async def start(self):
+        """Start the heartbeat task."""
+        if self._heartbeat_task is None and self.heartbeat_interval > 0:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        for client in list(self.clients.values()):
+            self._remove(client)
+
+    async def connect(self, websocket: WebSocket, last_event_id: Optional[str] = None):
+        """
+        Accept a connection
+
+        Args:
+            websocket: The connection
+            last_event_id: Last event id the client received before reconnecting; the
+                missed events are queued ahead of any new broadcast
+        """
+        await websocket.accept()
+        client = _Client(websocket, asyncio.get_running_loop().time())
+        self.clients[websocket] = client
+        self.unsubscribed.add(websocket)
+        client.sender = asyncio.create_task(self._sender(client))
+        logger.info(f"New WebSocket connection from {_peer(websocket)}. Total: {len(self.clients)}")
+        if last_event_id and self.event_log:
+            self._replay(client, last_event_id)
+
+    def _replay(self, client: _Client, last_event_id: str):
+        missed = self.event_log.since(last_event_id)
+        if missed is None:
+            client.push(None, json.dumps({"type": "resync", "reason": "replay_unavailable",
+                                          "last_event_id": self.event_log.last_event_id}))
+            client.resyncs += 1
+            self.resyncs += 1
+            logger.info(f"Cannot replay after {last_event_id} for {_peer(client.websocket)}; requested a resync")
+            return
+        for message in missed:
+            self._enqueue(client, coalesce_key(message), json.dumps(message, default=str))
+        logger.info(f"Replayed {len(missed)} events after {last_event_id} to {_peer(client.websocket)}")
+
+    async def disconnect(self, websocket: WebSocket):
+        client = self.clients.get(websocket)
+        if client:
+            self._remove(client)
+        logger.info(f"WebSocket disconnected from {_peer(websocket)}. Remaining: {len(self.clients)}")
+
+    async def subscribe(self, websocket: WebSocket, topics: List[str]) -> Set[str]:
+        """Add topics to a connection's subscriptions; returns its current topics."""
+        current = self.subscriptions.setdefault(websocket, set())
+        self.unsubscribed.discard(websocket)
+        for topic in topics:
+            if isinstance(topic, str) and topic:
+                current.add(topic)
+                self.topic_index.setdefault(topic, set()).add(websocket)
+        return set(current)
+
+    async def unsubscribe(self, websocket: WebSocket, topics: List[str]) -> Set[str]:
+        """Remove topics from a connection's subscriptions; returns its remaining topics."""
+        current = self.subscriptions.setdefault(websocket, set())
+        self.unsubscribed.discard(websocket)
+        for topic in topics:
+            current.discard(topic)
+            self._unindex(websocket, topic)
+        return set(current)
+
+    async def handle_client_message(self, websocket: WebSocket, data: str):
+        """Handle a frame sent by a client (pong, subscribe/unsubscribe); other frames are ignored."""
+        client = self.clients.get(websocket)
+        if client:
+            client.last_seen = asyncio.get_running_loop().time()
+        try:
+            frame = json.loads(data)
+        except json.JSONDecodeError:
+            return
+        if not isinstance(frame, dict):
+            return
+        if frame.get("type") == "pong":
+            if client:
+                client.answers_pings = True
+            return
+        if frame.get("type") not in ("subscribe", "unsubscribe"):
+            return
+        topics = frame.get("topics") or []
+        if isinstance(topics, str):
+            topics = [topics]
+        if frame["type"] == "subscribe":
+            current = await self.subscribe(websocket, topics)
+        else:
+            current = await self.unsubscribe(websocket, topics)
+        if client:
+            client.push(None, json.dumps({"type": "subscriptions", "topics": sorted(current)}))
+
+    def _recipients(self, message: Dict[str, Any]) -> List[_Client]:
+        topics = message_topics(message)
+        if topics is None:
+            return list(self.clients.values())
+        selected = self.unsubscribed | self.topic_index.get(ALL_TOPICS, set())
+        for topic in topics:
+            selected |= self.topic_index.get(topic, set())
+        return [self.clients[ws] for ws in selected if ws in self.clients]
+
+    def _unindex(self, websocket: WebSocket, topic: str):
+        subscribers = self.topic_index.get(topic)
+        if subscribers is not None:
+            subscribers.discard(websocket)
+            if not subscribers:
+                del self.topic_index[topic]
+
+    def _remove(self, client: _Client):
+        websocket = client.websocket
+        if self.clients.get(websocket) is client:
+            del self.clients[websocket]
+        self.unsubscribed.discard(websocket)
+        for topic in self.subscriptions.pop(websocket, set()):
+            self._unindex(websocket, topic)
+        if client.sender and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+        client.clear()
+
+    async def broadcast(self, message: Dict[str, Any]):
+        """Queue a message for every interested connection; never waits for the sends."""
+        if self.event_log:
+            message = self.event_log.append(message)  # Logged even without recipients, for replay
+        recipients = self._recipients(message)
+        if not recipients:
+            logger.debug(f"No subscribers for message of type '{message.get('type')}'")
+            return
+
+        # Convert message to JSON just once for better performance
+        message_json = json.dumps(message, default=str)  # Task bodies may hold YAML dates
+        key = coalesce_key(message)
+        self.broadcasts += 1
+        for client in recipients:
+            self._enqueue(client, key, message_json)
+        logger.debug(f"Queued message of type '{message.get('type')}' for {len(recipients)} clients")
+
+    def _enqueue(self, client: _Client, key: Optional[Tuple], message_json: str):
+        if len(client.queue) < self.max_queue:
+            client.push(key, message_json)
+            self.enqueued += 1
+            return
+        # Slow consumer: apply the overflow policy
+        if self.overflow_policy == OVERFLOW_COALESCE and key is not None and key in client.queued_by_key:
+            client.queued_by_key[key][1] = message_json
+            client.coalesced += 1
+            self.coalesced += 1
+            return
+        dropped = client.clear()
+        resync = {"type": "resync", "reason": "slow_consumer", "dropped": dropped + 1}
+        if self.event_log:
+            resync["last_event_id"] = self.event_log.last_event_id
+        client.push(None, json.dumps(resync))
+        client.resyncs += 1
+        self.resyncs += 1
+        logger.warning(f"Send queue of {_peer(client.websocket)} overflowed; dropped {dropped + 1} messages and requested a resync")
+
+    async def _sender(self, client: _Client):
+        try:
+            while True:
+                if not client.queue:
+                    client.wakeup.clear()
+                    await client.wakeup.wait()
+                    continue
+                _, message_json = client.pop()
+                await asyncio.wait_for(client.websocket.send_text(message_json), self.send_timeout)
+                client.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.send_timeouts += 1
+            logger.warning(f"Send to {_peer(client.websocket)} stalled for {self.send_timeout}s; closing the connection")
+            await self._close(client)
+        except Exception as e:
+            self.send_errors += 1
+            logger.warning(f"Error sending message to websocket {_peer(client.websocket)}: {e}")
+            await self._close(client)
+
+    async def _close(self, client: _Client):
+        self._remove(client)
+        try:
+            await asyncio.wait_for(client.websocket.close(code=1011), 1.0)
+        except Exception:
+            pass
+
+    async def _heartbeat_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = loop.time()
+            ping = json.dumps({"type": "ping", "ts": time.time()})
+            for client in list(self.clients.values()):
+                # Only clients known to answer pings can be judged by their silence
+                if client.answers_pings and now - client.last_seen > self.heartbeat_timeout:
+                    self.heartbeat_timeouts += 1
+                    logger.warning(f"No heartbeat from {_peer(client.websocket)} for {now - client.last_seen:.1f}s; closing")
+                    await self._close(client)
+                    continue
+                self._enqueue(client, ("ping",), ping)
+
+    def get_stats(self) -> Dict[str, Any]:
+        depths = [len(client.queue) for client in self.clients.values()]
+        return {
+            "connections": len(self.clients),
+            "subscribed_connections": len(self.subscriptions),
+            "topics": {topic: len(subscribers) for topic, subscribers in self.topic_index.items()},
+            "max_queue": self.max_queue,
+            "overflow_policy": self.overflow_policy,
+            "queued": sum(depths),
+            "max_queue_depth": max(depths) if depths else 0,
+            "broadcasts": self.broadcasts,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "resyncs": self.resyncs,
+            "send_timeouts": self.send_timeouts,
+            "send_errors": self.send_errors,
+            "heartbeat_timeouts": self.heartbeat_timeouts,
+            "event_log": self.event_log.get_stats() if self.event_log else None,
+        }
@@ -0,0 +1,131 @@
+"""
+Debouncer Module
+
+This module debounces file events per path with trailing-edge delivery. A burst of events
+for one path is merged into one event that is emitted once the path has been quiet for
+the quiet period (or, for a path that keeps changing, after max_delay), so the final
+write of a burst is always delivered. Pending paths are bounded: when max_entries is
+reached the oldest pending path is emitted early instead of growing without limit, and
+an entry is forgotten as soon as it has been emitted.
+
+Event merging:
+    created  + modified -> created
+    created  + deleted  -> nothing (the file never became visible)
+    deleted  + created  -> modified
+    anything + other    -> the later event
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending:
+    __slots__ = ("event_type", "first_at", "handle")
+
+    def __init__(self, event_type: str, first_at: float):
+        self.event_type = event_type
+        self.first_at = first_at
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+
+def merge_event_types(previous: str, latest: str) -> Optional[str]:
+    """Combine two events for the same path; None means they cancel out."""
+    if previous == "created" and latest == "deleted":
+        return None
+    if previous == "created" and latest == "modified":
+        return "created"
+    if previous == "deleted" and latest == "created":
+        return "modified"
+    return latest
+
+
+class TrailingDebouncer:
+    """Per-key trailing-edge debouncer running on the event loop."""
+
+    def __init__(self, emit: Callable[[str, str], None], quiet_period: float = 0.3,
+                 max_delay: float = 2.0, max_entries: int = 10000):
+        """
+        Initialize the debouncer
+
+        Args:
+            emit: Called on the event loop with (key, event_type) for each delivered event
+            quiet_period: Seconds without events after which a key's event is delivered
+            max_delay: Longest a key's event is held back while events keep arriving
+            max_entries: Maximum number of pending keys
+        """
+        self.emit = emit
+        self.quiet_period = quiet_period
+        self.max_delay = max(max_delay, quiet_period)
+        self.max_entries = max(1, max_entries)
+        self._pending: "OrderedDict[str, _Pending]" = OrderedDict()
+        self.received = 0
+        self.merged = 0
+        self.dropped = 0  # created + deleted bursts that cancelled out
+        self.evicted = 0
+        self.emitted = 0
+
+    def add(self, key: str, event_type: str):
+        """
+        Record an event; must be called on the event loop
+
+        (From other threads use loop.call_soon_threadsafe(debouncer.add, key, event_type).)
+        """
+        self.received += 1
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        entry = self._pending.get(key)
+        if entry is not None:
+            self.merged += 1
+            merged_type = merge_event_types(entry.event_type, event_type)
+            if merged_type is None:
+                self.dropped += 1
+                self._discard(key)
+                return
+            entry.event_type = merged_type
+            entry.handle.cancel()
+        else:
+            while len(self._pending) >= self.max_entries:
+                self.evicted += 1
+                self._fire(next(iter(self._pending)))
+            entry = self._pending[key] = _Pending(event_type, now)
+        due = min(now + self.quiet_period, entry.first_at + self.max_delay)
+        entry.handle = loop.call_at(due, self._fire, key)
+
+    def flush(self):
+        """Deliver every pending event now (used on shutdown)."""
+        for key in list(self._pending):
+            self._fire(key)
+
+    def _discard(self, key: str):
+        entry = self._pending.pop(key, None)
+        if entry is not None and entry.handle is not None:
+            entry.handle.cancel()
+
+    def _fire(self, key: str):
+        entry = self._pending.pop(key, None)
+        if entry is None:
+            return
+        if entry.handle is not None:
+            entry.handle.cancel()
+        self.emitted += 1
+        try:
+            self.emit(key, entry.event_type)
+        except Exception as e:
+            logger.error(f"Error delivering debounced event for {key}: {e}", exc_info=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "quiet_period_seconds": self.quiet_period,
+            "max_delay_seconds": self.max_delay,
+            "max_entries": self.max_entries,
+            "pending": len(self._pending),
+            "received": self.received,
+            "merged": self.merged,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+            "emitted": self.emitted,
+        }
@@ -0,0 +1,128 @@
+"""
+Event Log Module
+
+This module keeps the most recent broadcast events in an in-memory ring buffer so a
+client that reconnects can catch up instead of refetching everything. Every broadcast
+message gets an "event_id" of the form "<epoch>-<sequence>"; the epoch changes when the
+backend restarts. A client passes the last id it saw (the WebSocket handshake parameter
+?last_event_id=, or the standard Last-Event-ID header of the /events SSE stream) and
+receives every event after it. Only when that id has been pushed out of the buffer, or
+belongs to another epoch, is a full resync needed.
+"""
+
+import json
+import uuid
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def sse_format(message: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    """Encode a message as a Server-Sent Events frame (the id defaults to its event_id)."""
+    event_id = event_id or message.get("event_id")
+    frame = f"id: {event_id}\n" if event_id else ""
+    return f"{frame}data: {json.dumps(message, default=str)}\n\n"
+
+
+class EventLog:
+    """Ring buffer of broadcast events with sequence ids."""
+
+    def __init__(self, capacity: int = 1000):
+        """
+        Initialize the log
+
+        Args:
+            capacity: Number of recent events kept for replay
+        """
+        self.capacity = max(1, capacity)
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events: deque = deque(maxlen=self.capacity)  # (sequence, message)
+        self._sequence = 0
+        self._changed: Optional[asyncio.Event] = None
+        self.replays = 0
+        self.replayed_events = 0
+        self.overruns = 0
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    @property
+    def last_event_id(self) -> str:
+        return f"{self.epoch}-{self._sequence}"
+
+    def append(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Assign the next event id to a message and store it; must be called on the event loop."""
+        self._sequence += 1
+        message = {**message, "event_id": f"{self.epoch}-{self._sequence}"}
+        self._events.append((self._sequence, message))
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+        return message
+
+    def parse_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Get the sequence of an event id from this epoch (None for unknown or foreign ids)."""
+        if not event_id:
+            return None
+        epoch, _, sequence = str(event_id).rpartition("-")
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def since(self, event_id: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the events after event_id
+
+        Args:
+            event_id: Last event id the client received
+
+        Returns:
+            Events in order (possibly empty), or None if the client has to resync
+            because the id is unknown or already overwritten
+        """
+        result = self.events_after(self.parse_id(event_id))
+        self.replays += 1
+        if result is None:
+            self.overruns += 1
+            return None
+        self.replayed_events += len(result)
+        return result
+
+    def events_after(self, sequence: Optional[int]) -> Optional[List[Dict[str, Any]]]:
+        """Get the events after a sequence of this epoch; None if some were already overwritten."""
+        if sequence is None or sequence > self._sequence:
+            return None
+        if sequence == self._sequence:
+            return []
+        oldest = self._events[0][0] if self._events else self._sequence + 1
+        if sequence + 1 < oldest:
+            return None
+        return [message for seq, message in self._events if seq > sequence]
+
+    async def wait(self, sequence: int, timeout: float) -> bool:
+        """Wait until an event after sequence exists; returns False on timeout."""
+        if self._sequence > sequence:
+            return True
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "epoch": self.epoch,
+            "capacity": self.capacity,
+            "buffered": len(self._events),
+            "last_event_id": self.last_event_id,
+            "oldest_event_id": f"{self.epoch}-{self._events[0][0]}" if self._events else None,
+            "replays": self.replays,
+            "replayed_events": self.replayed_events,
+            "overruns": self.overruns,
+        }
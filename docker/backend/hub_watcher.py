@@ -0,0 +1,421 @@
+"""
+Hub Watcher Module
+
+This module provides the file watcher backends feeding HubChangeHandler. The native
+backend is watchdog's Observer (inotify in the container). It sees nothing when the hub
+is a bind mount from a Windows or macOS host, where host-side writes produce no inotify
+events, so there is also a polling backend: PollingWatcher walks the tree with
+os.scandir, keeps a snapshot of path -> (inode, mtime_ns, size) and diffs consecutive
+snapshots into the same watchdog events (created/modified/deleted/moved) the native
+observer would dispatch.
+
+The polling interval adapts: it drops to min_interval after a scan that found changes,
+grows by backoff while the tree is idle, and never goes below scan_cost_factor times the
+duration of the last scan, so scanning a large tree uses a bounded share of a core.
+
+HubWatcher selects the backend:
+    native   - watchdog Observer only
+    polling  - PollingWatcher only
+    auto     - the Observer, plus a slow verifying poller that compares the changes it
+               finds with the paths the Observer reported. If a change is not reported
+               natively within the grace period, native events are not arriving: the
+               Observer is stopped and the poller takes over (dispatching the missed
+               changes). Verification keeps running: inside a container the backend's own
+               writes are seen natively even when the host's are not.
+
+Both backends skip the subtrees a PathFilter ignores: the poller does not descend into
+them, and the Observer watches the hub with a layout of recursive watches that leaves
+them out (directories containing ignored subtrees are watched non-recursively, and new
+directories appearing in them get their own watches).
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Tuple, Callable, Set
+
+from watchdog.observers import Observer
+from watchdog.events import (
+    FileSystemEvent, FileSystemEventHandler, FileCreatedEvent, FileModifiedEvent, FileDeletedEvent, FileMovedEvent,
+)
+
+from path_filter import PathFilter
+
+logger = logging.getLogger(__name__)
+
+BACKEND_NATIVE = "native"
+BACKEND_POLLING = "polling"
+BACKEND_AUTO = "auto"
+
+FileState = Tuple[int, int, int]  # (inode, mtime_ns, size)
+
+
+def _relative(root_prefix: str, path: str) -> str:
+    return path[len(root_prefix):].replace("\\", "/")
+
+
+def scan_tree(root: str, path_filter: Optional[PathFilter] = None) -> Dict[str, FileState]:
+    """
+    Snapshot the files below root
+
+    Args:
+        root: Directory to scan
+        path_filter: Directories it ignores are not descended into
+
+    Returns:
+        Mapping of file path to (inode, mtime_ns, size)
+    """
+    snapshot: Dict[str, FileState] = {}
+    root_prefix = os.path.join(root, "")
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue  # Removed or unreadable since it was listed
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if path_filter is None or not path_filter.is_ignored(_relative(root_prefix, entry.path), is_dir=True):
+                            stack.append(entry.path)
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                snapshot[entry.path] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def diff_snapshots(old: Dict[str, FileState], new: Dict[str, FileState]) -> List[FileSystemEvent]:
+    """
+    Turn the difference between two snapshots into watchdog file events
+
+    A deleted and a created path with the same (non-zero) inode are reported as a move.
+    """
+    created = [path for path in new if path not in old]
+    deleted = [path for path in old if path not in new]
+    events: List[FileSystemEvent] = []
+
+    if created and deleted:
+        created_by_inode = {new[path][0]: path for path in created if new[path][0]}
+        for path in list(deleted):
+            dest = created_by_inode.pop(old[path][0], None) if old[path][0] else None
+            if dest is not None:
+                events.append(FileMovedEvent(path, dest))
+                deleted.remove(path)
+                created.remove(dest)
+
+    events.extend(FileDeletedEvent(path) for path in deleted)
+    events.extend(FileCreatedEvent(path) for path in created)
+    events.extend(FileModifiedEvent(path) for path, state in new.items()
+                  if path in old and old[path] != state)
+    return events
+
+
+def watch_layout(root: str, path_filter: Optional[PathFilter] = None,
+                 start: Optional[str] = None) -> List[Tuple[str, bool]]:
+    """
+    Plan native watches that cover root (or its subdirectory start) except ignored subtrees
+
+    Returns:
+        (directory, recursive) pairs: a directory without ignored subtrees is watched
+        recursively, others non-recursively with their children planned separately
+    """
+    root_prefix = os.path.join(root, "")
+
+    def plan(directory: str) -> Tuple[List[Tuple[str, bool]], bool]:
+        children: List[List[Tuple[str, bool]]] = []
+        pruned = False
+        try:
+            with os.scandir(directory) as entries:
+                subdirectories = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            return [(directory, True)], False
+        for subdirectory in subdirectories:
+            if path_filter is not None and path_filter.is_ignored(_relative(root_prefix, subdirectory), is_dir=True):
+                pruned = True
+                continue
+            child_plan, child_pruned = plan(subdirectory)
+            children.append(child_plan)
+            pruned = pruned or child_pruned
+        if not pruned:
+            return [(directory, True)], False
+        return [(directory, False)] + [watch for child in children for watch in child], True
+
+    return plan(start or root)[0]
+
+
+def event_paths(event: FileSystemEvent) -> List[str]:
+    dest = getattr(event, "dest_path", None)
+    return [event.src_path, dest] if dest else [event.src_path]
+
+
+class PollingWatcher(threading.Thread):
+    """Stat-based watcher thread dispatching snapshot differences to a watchdog handler."""
+
+    def __init__(self, handler: FileSystemEventHandler, path: str, path_filter: Optional[PathFilter] = None,
+                 min_interval: float = 1.0, max_interval: float = 10.0, backoff: float = 1.5,
+                 scan_cost_factor: float = 10.0, on_changes: Optional[Callable[[List[FileSystemEvent]], None]] = None):
+        """
+        Initialize the watcher
+
+        Args:
+            handler: Receives the events (handler.dispatch) unless on_changes is given
+            path: Directory to watch
+            path_filter: Ignored directories are not scanned
+            min_interval: Seconds between scans right after a change
+            max_interval: Longest time between scans while idle
+            backoff: Factor the interval grows by after each idle scan
+            scan_cost_factor: The interval is at least this many times the last scan's duration
+            on_changes: Called with each scan's events (possibly none) instead of dispatching them
+        """
+        super().__init__(name="hub-polling-watcher", daemon=True)
+        self.handler = handler
+        self.path = path
+        self.path_filter = path_filter
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = max(1.0, backoff)
+        self.scan_cost_factor = scan_cost_factor
+        self.on_changes = on_changes
+        self.interval = min_interval
+        self._stop_event = threading.Event()
+        self._snapshot: Dict[str, FileState] = {}
+        self.scans = 0
+        self.events = 0
+        self.last_scan_seconds = 0.0
+        self.total_scan_seconds = 0.0
+
+    def run(self):
+        self._snapshot = self._scan()
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Polling watcher scan failed: {e}", exc_info=True)
+
+    def poll(self) -> List[FileSystemEvent]:
+        """Scan once, deliver the changes and adapt the interval."""
+        snapshot = self._scan()
+        events = diff_snapshots(self._snapshot, snapshot)
+        self._snapshot = snapshot
+        if events:
+            self.events += len(events)
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        if self.on_changes:
+            self.on_changes(events)
+        else:
+            for event in events:
+                self.handler.dispatch(event)
+        self.interval = max(self.interval, self.last_scan_seconds * self.scan_cost_factor)
+        return events
+
+    def _scan(self) -> Dict[str, FileState]:
+        started = time.perf_counter()
+        snapshot = scan_tree(self.path, self.path_filter)
+        self.last_scan_seconds = time.perf_counter() - started
+        self.total_scan_seconds += self.last_scan_seconds
+        self.scans += 1
+        return snapshot
+
+    def stop(self):
+        self._stop_event.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "files": len(self._snapshot),
+            "scans": self.scans,
+            "events": self.events,
+            "interval_seconds": round(self.interval, 3),
+            "last_scan_ms": round(self.last_scan_seconds * 1000, 2),
+            "avg_scan_ms": round(self.total_scan_seconds / self.scans * 1000, 2) if self.scans else 0.0,
+        }
+
+
+class _NativeEvents(FileSystemEventHandler):
+    """Forwards the native observer's events, noting which paths it reported."""
+
+    def __init__(self, watcher: "HubWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def dispatch(self, event: FileSystemEvent):
+        for path in event_paths(event):
+            self.watcher.note_native_event(path)
+        if event.is_directory and event.event_type in ("created", "moved"):
+            self.watcher.watch_new_directory(getattr(event, "dest_path", None) or event.src_path)
+        self.watcher.handler.dispatch(event)
+
+
+class HubWatcher:
+    """Runs the configured watcher backend; same start/stop/join/is_alive surface as an Observer."""
+
+    def __init__(self, handler: FileSystemEventHandler, path: str, backend: str = BACKEND_AUTO,
+                 path_filter: Optional[PathFilter] = None, min_interval: float = 1.0, max_interval: float = 10.0,
+                 verify_interval: float = 15.0, grace_period: float = 3.0):
+        """
+        Initialize the watcher
+
+        Args:
+            handler: Event handler (HubChangeHandler)
+            path: Directory to watch
+            backend: "native", "polling" or "auto"
+            path_filter: Ignored subtrees are neither watched nor scanned
+            min_interval: Polling interval right after a change
+            max_interval: Longest polling interval while idle
+            verify_interval: Scan interval of the verifying poller in auto mode
+            grace_period: Seconds a native event may lag behind the change found by polling
+        """
+        self.handler = handler
+        self.path = path
+        self.requested_backend = backend if backend in (BACKEND_NATIVE, BACKEND_POLLING, BACKEND_AUTO) else BACKEND_AUTO
+        self.backend = self.requested_backend
+        self.path_filter = path_filter
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.verify_interval = verify_interval
+        self.grace_period = grace_period
+        self.observer: Optional[Observer] = None
+        self.poller: Optional[PollingWatcher] = None
+        self._native_handler = _NativeEvents(self)
+        self._shallow_watches: Set[str] = set()  # Directories watched non-recursively
+        self._lock = threading.Lock()
+        self._native_seen: Dict[str, float] = {}  # path -> monotonic time of the last native event
+        self._suspects: List[Tuple[float, float, FileSystemEvent]] = []  # (found at, window start, event)
+        self._last_verify_scan = time.monotonic()
+        self.confirmed = 0
+        self.missed = 0
+        self.switched_at: Optional[float] = None
+
+    def start(self):
+        if self.backend == BACKEND_POLLING:
+            self._start_poller()
+            return
+        try:
+            self.observer = Observer()
+            for directory, recursive in watch_layout(self.path, self.path_filter):
+                self.observer.schedule(self._native_handler, directory, recursive=recursive)
+                if not recursive:
+                    self._shallow_watches.add(directory)
+            self.observer.start()
+        except Exception as e:
+            if self.backend == BACKEND_NATIVE:
+                raise
+            logger.warning(f"Native file watcher unavailable ({e}); using the polling watcher")
+            self.observer = None
+            self.backend = BACKEND_POLLING
+            self._start_poller()
+            return
+        if self.backend == BACKEND_AUTO:
+            # Slow poller that only checks whether native events arrive
+            self.poller = PollingWatcher(self.handler, self.path, self.path_filter, min_interval=self.verify_interval,
+                                         max_interval=self.verify_interval, on_changes=self._verify)
+            self.poller.start()
+
+    def _start_poller(self):
+        self.poller = PollingWatcher(self.handler, self.path, self.path_filter,
+                                     min_interval=self.min_interval, max_interval=self.max_interval)
+        self.poller.start()
+
+    def watch_new_directory(self, directory: str):
+        """Watch a directory created inside a non-recursively watched one (observer thread)."""
+        if os.path.dirname(directory) not in self._shallow_watches or not self.observer:
+            return  # Covered by a recursive watch, or the Observer was replaced by polling
+        relative = _relative(os.path.join(self.path, ""), directory)
+        if self.path_filter is not None and self.path_filter.is_ignored(relative, is_dir=True):
+            return
+        try:
+            for watch_dir, recursive in watch_layout(self.path, self.path_filter, start=directory):
+                self.observer.schedule(self._native_handler, watch_dir, recursive=recursive)
+                if not recursive:
+                    self._shallow_watches.add(watch_dir)
+        except Exception as e:
+            logger.warning(f"Could not watch new directory {directory}: {e}")
+
+    def note_native_event(self, path: str):
+        """Record a path reported by the native observer (called from the observer thread)."""
+        if self.backend == BACKEND_AUTO:
+            with self._lock:
+                self._native_seen[path] = time.monotonic()
+
+    def _verify(self, events: List[FileSystemEvent]):
+        # Runs on the verifying poller's thread after each scan
+        now = time.monotonic()
+        window_start = self._last_verify_scan - self.grace_period
+        self._last_verify_scan = now
+        with self._lock:
+            self._suspects.extend((now, window_start, event) for event in events)
+        self.check_suspects(now)
+
+    def check_suspects(self, now: Optional[float] = None):
+        """Settle suspects whose grace period is over; switch to polling on a missed change."""
+        now = now if now is not None else time.monotonic()
+        missed: List[FileSystemEvent] = []
+        with self._lock:
+            pending = []
+            for found_at, window_start, event in self._suspects:
+                if now - found_at < self.grace_period:
+                    pending.append((found_at, window_start, event))
+                elif any(self._native_seen.get(path, float("-inf")) >= window_start for path in event_paths(event)):
+                    self.confirmed += 1
+                else:
+                    missed.append(event)
+            self.missed += len(missed)
+            if missed:
+                # Switching to polling: changes still within their grace period are delivered too
+                missed.extend(event for _, _, event in pending)
+                pending = []
+            self._suspects = pending
+            # Forget native sightings no current or future suspect can refer to
+            horizon = min([window_start for _, window_start, _ in pending] + [self._last_verify_scan - self.grace_period])
+            self._native_seen = {path: seen for path, seen in self._native_seen.items() if seen >= horizon}
+        if missed:
+            self._switch_to_polling(missed)
+
+    def _switch_to_polling(self, missed: List[FileSystemEvent]):
+        if self.backend != BACKEND_AUTO:
+            return
+        logger.warning(f"Native file watcher missed {len(missed)} changes (e.g. {missed[0].src_path}); "
+                       f"switching to the polling watcher")
+        self.backend = BACKEND_POLLING
+        self.switched_at = time.time()
+        if self.observer:
+            self.observer.stop()
+        # The verifying poller keeps its snapshot and becomes the event source
+        self.poller.on_changes = None
+        self.poller.min_interval = self.min_interval
+        self.poller.max_interval = max(self.max_interval, self.min_interval)
+        self.poller.interval = self.min_interval
+        for event in missed:
+            self.handler.dispatch(event)
+
+    def stop(self):
+        if self.observer:
+            self.observer.stop()
+        if self.poller:
+            self.poller.stop()
+
+    def join(self, timeout: Optional[float] = None):
+        for thread in (self.observer, self.poller):
+            if thread and thread.ident is not None:
+                thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return any(thread is not None and thread.is_alive() for thread in (self.observer, self.poller))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requested_backend": self.requested_backend,
+            "backend": self.backend,
+            "native_running": bool(self.observer and self.observer.is_alive()),
+            "native_watches": len(self.observer.emitters) if self.observer else 0,
+            "poller": self.poller.get_stats() if self.poller else None,
+            "confirmed_native_changes": self.confirmed,
+            "missed_native_changes": self.missed,
+            "switched_to_polling_at": self.switched_at,
+        }
@@ -0,0 +1,259 @@
+"""
+JSON Extractor Benchmark
+
+This module fuzzes and times llm_json_extractor. The fuzzer generates randomized LLM-style
+responses (prose with balanced braces, quotes and inline code, decoy code blocks and
+non-action objects, and one action object that may be nested, pretty-printed, fenced or
+inline) and checks that extract_json_from_llm_response and a StreamingActionExtractor fed
+in random chunk sizes (down to single characters) both return the action. The regex
+extractor the scanner replaced is run on the same responses as a reference.
+
+The timing cases cover a typical ~3 KB response, the same response streamed in small
+chunks, and ~800 KB responses full of brace-shaped prose with and without an action.
+
+Usage:
+    python json_extractor_benchmark.py
+    python json_extractor_benchmark.py --cases 20000 --repeat 500 --json results.json
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+from typing import Dict, List, Any, Callable, Optional
+
+from llm_benchmark import percentiles
+from llm_json_extractor import StreamingActionExtractor, extract_json_from_llm_response
+
+WORDS = ["the", "task", "project", "deadline", "review", "update", "I", "will", "create", "a", "new",
+         "for", "you", "here", "is", "action", "JSON", "done", "status", "priority", "note", "sure"]
+# Prose fragments that look like JSON to a naive scanner but are balanced and quote-free
+PROSE_DECOYS = ["{name}", "{ }", "{{double}}", "{x: 1, y: 2}", "`inline {code}`", "a \"quoted\" word",
+                "C:\\path\\file", "``not a fence``", "{status} -> {next}"]
+TRICKY_TITLES = ["Fix {braces} in titles", "Say \"hello\"", "Back\\slash", "Line\nbreak", "Tab\there",
+                 "Ünïcödé ✓", "```fence in a string```", "}{ reversed", "Plain title"]
+CHUNK_SIZES = [1, 2, 3, 7, 16, 64]
+
+
+def regex_extract(llm_response: str) -> Optional[str]:
+    """The regex extractor replaced by JSONObjectScanner (without its logging), for reference."""
+    if not llm_response:
+        return None
+    for potential_json in re.findall(r'```(?:json)?\s*([\s\S]*?)\s*```', llm_response):
+        try:
+            if "action" in json.loads(potential_json.strip()):
+                return potential_json.strip()
+        except json.JSONDecodeError:
+            continue
+    for potential_json in re.findall(r'(\{[\s\S]*?\})', llm_response):
+        try:
+            if "action" in json.loads(potential_json):
+                return potential_json
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def make_prose(rng: random.Random, words: int) -> str:
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(PROSE_DECOYS) if rng.random() < 0.08 else rng.choice(WORDS))
+        if rng.random() < 0.1:
+            parts[-1] += rng.choice([".", ",", ":", ".\n\n"])
+    return " ".join(parts)
+
+
+def make_action(rng: random.Random) -> Dict[str, Any]:
+    kind = rng.choice(["create_task", "update_task", "delete_task", "get_projects", "plan"])
+    if kind == "create_task":
+        return {"action": "create_task", "project_id": f"Project-{rng.randint(1, 50)}",
+                "task": {"title": rng.choice(TRICKY_TITLES), "priority": rng.choice(["low", "high"]),
+                         "tags": rng.sample(["ui", "api", "docs", "bug"], rng.randint(0, 3)),
+                         "meta": {"estimate": rng.randint(1, 8), "blocked_by": None}}}
+    if kind == "update_task":
+        return {"action": "update_task", "project_id": "Project-A", "task_id": f"task-{rng.randint(1, 999)}",
+                "updates": {"status": rng.choice(["todo", "done"]), "description": rng.choice(TRICKY_TITLES)}}
+    if kind == "delete_task":
+        return {"action": "delete_task", "project_id": "Project-B", "task_id": f"task-{rng.randint(1, 999)}"}
+    if kind == "get_projects":
+        return {"action": "get_projects"}
+    return {"actions": [make_action(rng) for _ in range(rng.randint(2, 4))]}
+
+
+def make_response(rng: random.Random, prose_words: int = 40) -> Dict[str, Any]:
+    """Build a randomized response with exactly one action object; returns text and expected action."""
+    action = make_action(rng)
+    encoded = json.dumps(action, indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5)
+    placement = rng.choice(["json_fence", "plain_fence", "inline"])
+    if placement == "json_fence":
+        body = f"```json\n{encoded}\n```"
+    elif placement == "plain_fence":
+        body = f"```\n{encoded}\n```"
+    else:
+        body = encoded
+    pieces = [make_prose(rng, rng.randint(0, prose_words))]
+    if rng.random() < 0.3:
+        pieces.append(f"```python\nprint({{\"note\": {rng.randint(1, 9)}}})\n```")
+    if rng.random() < 0.3:
+        pieces.append(json.dumps({"note": rng.choice(TRICKY_TITLES), "status": "ok"}))
+    pieces.append(body)
+    pieces.append(make_prose(rng, rng.randint(0, prose_words)))
+    return {"text": "\n\n".join(piece for piece in pieces if piece), "action": action, "placement": placement}
+
+
+def _matches(result: Optional[str], action: Dict[str, Any]) -> bool:
+    if result is None:
+        return False
+    try:
+        return json.loads(result) == action
+    except json.JSONDecodeError:
+        return False
+
+
+def split_chunks(rng: random.Random, text: str) -> List[str]:
+    size = rng.choice(CHUNK_SIZES + [rng.randint(1, 200)])
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def run_fuzz(cases: int, seed: int, show_failures: int = 5) -> Dict[str, Any]:
+    """Check the extractor, the chunk-fed streaming extractor and the regex reference on random responses."""
+    rng = random.Random(seed)
+    failures = {"extract": 0, "streaming": 0, "streaming_early": 0}
+    regex_correct = 0
+    samples = []
+    for index in range(cases):
+        case = make_response(rng)
+        text, action = case["text"], case["action"]
+        if not _matches(extract_json_from_llm_response(text), action):
+            failures["extract"] += 1
+            if len(samples) < show_failures:
+                samples.append({"case": index, "check": "extract", "text": text})
+        extractor = StreamingActionExtractor()
+        early = None
+        for chunk in split_chunks(rng, text):
+            early = extractor.feed(chunk) or early
+        if not _matches(extractor.finish(), action):
+            failures["streaming"] += 1
+            if len(samples) < show_failures:
+                samples.append({"case": index, "check": "streaming", "text": text})
+        if not _matches(early, action):
+            failures["streaming_early"] += 1
+        if _matches(regex_extract(text), action):
+            regex_correct += 1
+    return {
+        "cases": cases,
+        "seed": seed,
+        "failures": failures,
+        "regex_reference_correct": round(regex_correct / cases * 100, 2) if cases else 0.0,
+        "failure_samples": samples,
+    }
+
+
+def _long_prose(rng: random.Random, size: int) -> str:
+    parts = []
+    total = 0
+    while total < size:
+        part = make_prose(rng, 50)
+        parts.append(part)
+        total += len(part) + 2
+    return "\n\n".join(parts)
+
+
+def timing_texts(seed: int) -> Dict[str, str]:
+    rng = random.Random(seed)
+    action = json.dumps({"action": "create_task", "project_id": "Project-A",
+                         "task": {"title": "Write the release notes", "priority": "high", "tags": ["docs"]}}, indent=2)
+    prose = _long_prose(rng, 1400)
+    typical = f"{prose[:1400]}\n\n```json\n{action}\n```\n\n{prose[:1400]}"
+    long_prose = _long_prose(rng, 800 * 1024)
+    return {
+        "3kb_fenced": typical,
+        "800kb_prose_inline_action": f"{long_prose}\n\n{action}",
+        "800kb_prose_no_action": long_prose,
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    samples = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def _streamed(text: str, chunk_size: int) -> Callable[[], Any]:
+    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+    def run():
+        extractor = StreamingActionExtractor()
+        for chunk in chunks:
+            extractor.feed(chunk)
+        return extractor.finish()
+    return run
+
+
+def run_timing(repeat: int, seed: int, chunk_size: int) -> Dict[str, Any]:
+    """Time the scanner and the regex reference on fixed responses (large ones get fewer runs)."""
+    results = {}
+    for name, text in timing_texts(seed).items():
+        runs = repeat if len(text) <= 10 * 1024 else max(3, repeat // 20)
+        results[name] = {
+            "size_kb": round(len(text) / 1024, 1),
+            "runs": runs,
+            "scanner": measure(lambda: extract_json_from_llm_response(text), runs),
+            "regex": measure(lambda: regex_extract(text), runs),
+        }
+        if len(text) <= 10 * 1024:
+            results[f"{name}_streamed_{chunk_size}"] = {
+                "size_kb": round(len(text) / 1024, 1),
+                "runs": runs,
+                "scanner": measure(_streamed(text, chunk_size), runs),
+                "regex": None,
+            }
+    return results
+
+
+def print_report(summary: Dict[str, Any]):
+    fuzz = summary["fuzz"]
+    failures = fuzz["failures"]
+    print(f"\nfuzz: {fuzz['cases']} responses (seed {fuzz['seed']}), failures: extract {failures['extract']}, "
+          f"streamed {failures['streaming']}, streamed early detection {failures['streaming_early']}; "
+          f"regex reference correct on {fuzz['regex_reference_correct']}%")
+    for sample in fuzz["failure_samples"]:
+        print(f"failed {sample['check']} on case {sample['case']}: {sample['text'][:200]!r}")
+    print(f"\n{'case':<32}{'size':>10}{'scanner p50':>14}{'p99':>10}{'regex p50':>12}{'p99':>10}  (ms)")
+    for name, result in summary["timing"].items():
+        scanner, regex = result["scanner"], result["regex"]
+        regex_columns = f"{regex['p50_ms']:>12.3f}{regex['p99_ms']:>10.3f}" if regex else f"{'-':>12}{'-':>10}"
+        print(f"{name:<32}{result['size_kb']:>8.1f}KB{scanner['p50_ms']:>14.3f}{scanner['p99_ms']:>10.3f}{regex_columns}")
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fuzz and benchmark the LLM JSON extractor.")
+    parser.add_argument("--cases", type=int, default=5000, help="Randomized responses checked by the fuzzer")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed runs per small case (large cases run 1/20 as often)")
+    parser.add_argument("--chunk-size", type=int, default=16, help="Chunk size of the streamed timing case")
+    parser.add_argument("--show-failures", type=int, default=5, help="Failing responses printed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write the summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    summary = {
+        "fuzz": run_fuzz(args.cases, args.seed, args.show_failures),
+        "timing": run_timing(args.repeat, args.seed, args.chunk_size),
+    }
+    print_report(summary)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    failures = summary["fuzz"]["failures"]
+    return 1 if failures["extract"] or failures["streaming"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,399 @@
+"""
+LLM Pipeline Benchmark
+
+This module benchmarks /llm/tasks/process end to end without a real Ollama server or any
+network access. It generates a synthetic hub of configurable size, starts an in-process
+fake Ollama (a local HTTP server returning canned task actions after a latency shaped
+like prefill + generation), runs the FastAPI app in-process and reports per-stage timing
+percentiles.
+
+Stages (nested stages are also part of their parent):
+    context_build    - build_task_context()
+    llm_call         - scheduler queue + HTTP round trip to the fake Ollama
+    extract_json     - extract_json_from_llm_response()
+    execute          - LLMTaskController.process_llm_response() (validated structured
+                       output: execute_task_action_data())
+    task_write       - TasksService create/update (read-modify-write of tasks.yaml), nested
+                       in execute
+    broadcast        - broadcast_task_result()
+    other            - everything else in the request (routing, cache lookup, serialization)
+
+Usage:
+    python llm_benchmark.py --projects 20 --tasks 50 --requests 200 --concurrency 4
+    python llm_benchmark.py --prefill-ms 0 --generate-ms 0 --json results.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+import contextvars
+from functools import wraps
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+import yaml
+
+STAGES = ["context_build", "llm_call", "extract_json", "execute", "task_write", "broadcast"]
+TOP_LEVEL_STAGES = ["context_build", "llm_call", "extract_json", "execute", "broadcast"]
+
+STATUSES = ["todo", "in-progress", "done"]
+PRIORITIES = ["low", "medium", "high"]
+PEOPLE = ["Jane Smith", "Bob Johnson", "John Doe", "Alex Kim"]
+
+
+def percentiles(samples: List[float]) -> Dict[str, Any]:
+    """Count and p50/p90/p99/max (in ms) of timing samples given in seconds."""
+    if not samples:
+        return {"count": 0, "avg_ms": 0.0, "p50_ms": 0.0, "p90_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "avg_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(pick(0.50) * 1000, 3),
+        "p90_ms": round(pick(0.90) * 1000, 3),
+        "p99_ms": round(pick(0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+# --- Synthetic hub ---
+def generate_hub(path: Path, projects: int, tasks_per_project: int, seed: int = 0) -> Dict[str, int]:
+    """
+    Write a synthetic hub (project.yaml + tasks.yaml per project)
+
+    Args:
+        path: Hub directory (created if missing)
+        projects: Number of projects
+        tasks_per_project: Tasks in each project
+        seed: Random seed, so runs are comparable
+
+    Returns:
+        Mapping of project id to its number of tasks
+    """
+    rng = random.Random(seed)
+    path.mkdir(parents=True, exist_ok=True)
+    layout = {}
+    for p in range(1, projects + 1):
+        project_id = f"Project-{p:03d}"
+        project_dir = path / project_id
+        project_dir.mkdir(exist_ok=True)
+        project = {
+            "title": f"Synthetic project {p}",
+            "status": "active",
+            "tags": ["benchmark"],
+            "description": f"Generated project {p} used to benchmark the LLM task pipeline.",
+        }
+        tasks = [{
+            "id": f"task-{t}",
+            "title": f"Task {t} of project {p}",
+            "description": "Generated task " * rng.randint(1, 8),
+            "status": rng.choice(STATUSES),
+            "priority": rng.choice(PRIORITIES),
+            "due": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "assigned_to": rng.choice(PEOPLE),
+        } for t in range(1, tasks_per_project + 1)]
+        (project_dir / "project.yaml").write_text(yaml.dump(project, sort_keys=False), encoding="utf-8")
+        (project_dir / "tasks.yaml").write_text(yaml.dump(tasks, sort_keys=False), encoding="utf-8")
+        layout[project_id] = tasks_per_project
+    return layout
+
+
+# --- Fake Ollama ---
+class FakeOllama:
+    """
+    In-process Ollama stand-in serving /api/chat, /api/tags, /api/ps, /api/version and
+    /api/generate on 127.0.0.1
+
+    /api/chat sleeps for prefill_ms per 1000 prompt characters plus generate_ms, scaled by
+    log-normal jitter, and answers with a task action for the synthetic hub: fenced JSON in
+    prose, or the bare object when the request carries a `format` constraint.
+    """
+
+    def __init__(self, layout: Dict[str, int], prefill_ms: float = 20.0, generate_ms: float = 150.0,
+                 jitter: float = 0.3, create_ratio: float = 0.2, seed: int = 0):
+        self.layout = layout
+        self.prefill_ms = prefill_ms
+        self.generate_ms = generate_ms
+        self.jitter = jitter
+        self.create_ratio = create_ratio
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake._handle(self, None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                fake._handle(self, json.loads(self.rfile.read(length) or b"{}"))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="fake-ollama", daemon=True).start()
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def _handle(self, handler: BaseHTTPRequestHandler, payload: Optional[Dict[str, Any]]):
+        if handler.path == "/api/chat":
+            body = self._chat(payload or {})
+        elif handler.path == "/api/tags":
+            body = {"models": [{"name": "llama3", "size": 0, "details": {"family": "llama"}}]}
+        elif handler.path == "/api/ps":
+            body = {"models": [{"name": "llama3"}]}
+        elif handler.path == "/api/version":
+            body = {"version": "fake"}
+        elif handler.path == "/api/generate":
+            body = {"done": True, "load_duration": 0}
+        else:
+            handler.send_error(404)
+            return
+        data = json.dumps(body).encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        prompt_chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+        with self._lock:
+            self.requests += 1
+            scale = self._rng.lognormvariate(0, self.jitter) if self.jitter else 1.0
+            action = self._next_action()
+        prefill = self.prefill_ms * prompt_chars / 1000 * scale
+        generate = self.generate_ms * scale
+        time.sleep((prefill + generate) / 1000)
+
+        if payload.get("format") is not None:
+            content = json.dumps(action)
+        else:
+            content = f"Sure, here is the action.\n\n```json\n{json.dumps(action, indent=4)}\n```\n\nLet me know if you need anything else."
+        return {
+            "model": payload.get("model"),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "prompt_eval_count": prompt_chars // 4,
+            "eval_count": len(content) // 4,
+            "prompt_eval_duration": int(prefill * 1e6),
+            "eval_duration": int(generate * 1e6),
+            "total_duration": int((prefill + generate) * 1e6),
+        }
+
+    def _next_action(self) -> Dict[str, Any]:
+        project_id = self._rng.choice(list(self.layout))
+        if self._rng.random() < self.create_ratio:
+            return {"action": "create_task", "project_id": project_id,
+                    "task": {"title": f"Benchmark task {self.requests}", "description": "Created by the benchmark",
+                             "status": "todo", "priority": self._rng.choice(PRIORITIES)}}
+        return {"action": "update_task", "project_id": project_id,
+                "task_id": f"task-{self._rng.randint(1, self.layout[project_id])}",
+                "updates": {"status": self._rng.choice(STATUSES)}}
+
+
+# --- Stage timing ---
+_current_timings: contextvars.ContextVar = contextvars.ContextVar("benchmark_timings", default=None)
+
+
+def _record(stage: str, seconds: float):
+    timings = _current_timings.get()
+    if timings is not None:
+        timings[stage] += seconds
+
+
+def _timed(stage: str, func):
+    if asyncio.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _record(stage, time.perf_counter() - started)
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(stage, time.perf_counter() - started)
+    return wrapper
+
+
+def instrument(main):
+    """Wrap the pipeline stages of the imported main module with timers."""
+    main.build_task_context = _timed("context_build", main.build_task_context)
+    main.extract_json_from_llm_response = _timed("extract_json", main.extract_json_from_llm_response)
+    main.broadcast_task_result = _timed("broadcast", main.broadcast_task_result)
+    main.llm_scheduler.chat_completion_async = _timed("llm_call", main.llm_scheduler.chat_completion_async)
+    main.execute_task_action_data = _timed("execute", main.execute_task_action_data)
+    main.llm_task_controller.process_llm_response = _timed(
+        "execute", main.llm_task_controller.process_llm_response)
+    for method in ("create_task", "update_task", "delete_task"):
+        setattr(main.tasks_service, method, _timed("task_write", getattr(main.tasks_service, method)))
+
+
+# --- Runner ---
+async def run_benchmark(main, requests: int, concurrency: int, structured: bool,
+                        warmup: int = 5) -> Dict[str, Any]:
+    """
+    Send task commands through the app and collect per-stage timings
+
+    Args:
+        main: The imported (and instrumented) backend main module
+        requests: Number of measured requests
+        concurrency: Requests in flight at once
+        structured: Use structured output instead of free-form JSON extraction
+        warmup: Unmeasured requests sent first
+
+    Returns:
+        Summary with per-stage percentiles, throughput and error count
+    """
+    import httpx
+
+    samples = defaultdict(list)
+    errors: List[str] = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        async def one(index: int, measured: bool):
+            timings = defaultdict(float)
+            _current_timings.set(timings)
+            body = {"command": f"Benchmark command {index}: update a task", "fast_path": False,
+                    "structured_output": structured}
+            started = time.perf_counter()
+            response = await client.post("/llm/tasks/process", json=body)
+            total = time.perf_counter() - started
+            result = response.json()
+            if not measured:
+                return
+            if response.status_code != 200 or not result.get("success"):
+                errors.append(str(result.get("error") or response.status_code))
+                return
+            samples["total"].append(total)
+            for stage in STAGES:
+                samples[stage].append(timings[stage])
+            samples["other"].append(max(0.0, total - sum(timings[s] for s in TOP_LEVEL_STAGES)))
+
+        for index in range(warmup):
+            await one(index, measured=False)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(index: int):
+            async with semaphore:
+                # Each request runs in its own task, so its context holds its own timings
+                await one(index, measured=True)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(asyncio.create_task(limited(i)) for i in range(warmup, warmup + requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "structured_output": structured,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "stages": {stage: percentiles(samples[stage]) for stage in ["total"] + STAGES + ["other"]},
+    }
+
+
+def print_report(summary: Dict[str, Any]):
+    print(f"\n{summary['requests']} requests, concurrency {summary['concurrency']}, "
+          f"{summary['throughput_rps']} req/s, {summary['errors']} errors")
+    print(f"{'stage':<18}{'avg':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  (ms)")
+    for stage, stats in summary["stages"].items():
+        print(f"{stage:<18}{stats['avg_ms']:>10.2f}{stats['p50_ms']:>10.2f}{stats['p90_ms']:>10.2f}"
+              f"{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+    for error in summary["error_samples"]:
+        print(f"error: {error}")
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark /llm/tasks/process against a fake Ollama server.")
+    parser.add_argument("--projects", type=int, default=10, help="Synthetic projects")
+    parser.add_argument("--tasks", type=int, default=30, help="Tasks per project")
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight at once")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests sent first")
+    parser.add_argument("--prefill-ms", type=float, default=20.0, help="Fake prefill time per 1000 prompt chars")
+    parser.add_argument("--generate-ms", type=float, default=150.0, help="Fake generation time per response")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Sigma of the log-normal latency jitter (0 = none)")
+    parser.add_argument("--create-ratio", type=float, default=0.2, help="Share of responses that create tasks")
+    parser.add_argument("--structured", action="store_true", help="Use structured output requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hub", help="Directory for the synthetic hub (default: a temporary directory)")
+    parser.add_argument("--json", dest="json_path", help="Also write the summary to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the backend's INFO logging")
+    args = parser.parse_args(argv)
+
+    hub = Path(args.hub) if args.hub else Path(tempfile.mkdtemp(prefix="hub-benchmark-"))
+    layout = generate_hub(hub, args.projects, args.tasks, args.seed)
+    fake = FakeOllama(layout, args.prefill_ms, args.generate_ms, args.jitter, args.create_ratio, args.seed)
+    fake.start()
+
+    # main reads its configuration at import time
+    os.environ["HUB_DATA_PATH"] = str(hub)
+    os.environ.setdefault("OLLAMA_WARMUP_MODELS", "")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.ERROR)
+    main.ollama_client.base_url = fake.url
+    instrument(main)
+
+    async def run():
+        await main.app.router.startup()
+        try:
+            return await run_benchmark(main, args.requests, args.concurrency, args.structured, args.warmup)
+        finally:
+            await main.app.router.shutdown()
+
+    try:
+        summary = asyncio.run(run())
+    finally:
+        fake.stop()
+        if not args.hub:
+            shutil.rmtree(hub, ignore_errors=True)
+
+    summary["hub"] = {"projects": args.projects, "tasks_per_project": args.tasks}
+    summary["fake_ollama"] = {"prefill_ms_per_1k_chars": args.prefill_ms, "generate_ms": args.generate_ms,
+                              "jitter": args.jitter, "chat_requests": fake.requests}
+    print_report(summary)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
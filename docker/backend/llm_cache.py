@@ -0,0 +1,159 @@
+"""
+LLM Response Cache Module
+
+This module provides a content-addressed cache for deterministic LLM calls. Entries are
+keyed by a hash of (model, messages, temperature, workspace version), so a cached answer
+is only reused while the workspace it was generated against is unchanged.
+
+The cache is bounded by entry count (least recently used entries are evicted first),
+entries expire after a TTL, and the contents are persisted as JSON so they survive restarts.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """LRU + TTL cache of LLM responses persisted to a JSON file."""
+
+    def __init__(self, cache_file: Path, ttl_seconds: float = 3600, max_entries: int = 256):
+        """
+        Initialize the cache and load any persisted entries
+
+        Args:
+            cache_file: JSON file the cache is persisted to
+            ttl_seconds: Lifetime of an entry in seconds
+            max_entries: Maximum number of entries kept
+        """
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._load()
+
+    @staticmethod
+    def make_key(model_id: str, messages: List[Dict[str, Any]], temperature: float,
+                 workspace_version: str, format: Optional[Any] = None) -> str:
+        """Build the cache key for a request (format is the structured-output constraint, if any)."""
+        payload = json.dumps(
+            {
+                "model": model_id,
+                "messages": [{"role": m.get("role"), "content": m.get("content")} for m in messages],
+                "temperature": temperature,
+                "workspace_version": workspace_version,
+                "format": format,
+            },
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_cacheable(temperature: Optional[float], cacheable: bool = False) -> bool:
+        """Only deterministic (temperature 0) or explicitly cacheable requests are cached."""
+        return cacheable or temperature == 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            A copy of the cached response or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if time.time() - entry["stored_at"] > self.ttl_seconds:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return json.loads(json.dumps(entry["response"]))
+
+    def put(self, key: str, response: Dict[str, Any]):
+        """
+        Store a response and persist the cache
+
+        Args:
+            key: Cache key from make_key
+            response: Response dictionary (must be JSON serializable)
+        """
+        with self._lock:
+            self._entries[key] = {"stored_at": time.time(), "response": response}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            snapshot = dict(self._entries)
+        self._save(snapshot)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self._save({})
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    # --- Persistence ---
+    def _load(self):
+        if not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Ignoring unreadable LLM response cache {self.cache_file}: {e}")
+            return
+        now = time.time()
+        entries = sorted(
+            ((key, entry) for key, entry in data.get("entries", {}).items()
+             if now - entry.get("stored_at", 0) <= self.ttl_seconds),
+            key=lambda item: item[1]["stored_at"]
+        )
+        for key, entry in entries[-self.max_entries:]:
+            self._entries[key] = entry
+        logger.info(f"Loaded {len(self._entries)} cached LLM responses")
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]):
+        with self._save_lock:
+            try:
+                self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.cache_file.with_name(self.cache_file.name + ".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"entries": entries}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.cache_file)
+            except Exception as e:
+                logger.error(f"Error persisting LLM response cache: {e}")
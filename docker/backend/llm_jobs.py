@@ -0,0 +1,256 @@
+"""
+LLM Job Queue Module
+
+This module runs LLM requests (task commands, chat completions) as background jobs so that
+the HTTP request only has to enqueue them. Each job gets an id; workers on the main event
+loop run generation, extraction and execution, and every state change is pushed to a
+notify callback (the WebSocket broadcast). Finished jobs keep their result for a while so
+a client that reloaded or timed out can still fetch it.
+
+Jobs can be cancelled while queued or generating. Once a job has started executing its
+task action it runs to completion, so an action is never left half applied. Cancelling a
+job that is generating stops waiting for the model; the upstream call itself finishes in
+the scheduler's thread pool and its result is discarded.
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+# Stages after which a job can no longer be cancelled
+NON_CANCELLABLE_STAGES = ("executing",)
+
+ReportFn = Callable[..., Awaitable[None]]
+RunnerFn = Callable[[ReportFn], Awaitable[Any]]
+
+
+def _reports_failure(result: Any) -> bool:
+    """Whether a runner's result describes a failure rather than a finished job."""
+    if not isinstance(result, dict):
+        return False
+    if "success" in result:
+        return result["success"] is False
+    return bool(result.get("error"))
+
+
+class LLMJob:
+    """State of one background LLM job."""
+
+    def __init__(self, kind: str, runner: RunnerFn, params: Optional[Dict[str, Any]] = None):
+        self.id = f"job_{uuid.uuid4().hex[:12]}"
+        self.kind = kind
+        self.params = params or {}
+        self.runner = runner
+        self.status = JOB_QUEUED
+        self.stage = "queued"
+        self.details: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+
+    @property
+    def cancellable(self) -> bool:
+        return self.status not in FINISHED_STATES and self.stage not in NON_CANCELLABLE_STAGES
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "stage": self.stage,
+            "details": self.details,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "cancellable": self.cancellable,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class LLMJobManager:
+    """In-process queue of LLM jobs served by a fixed number of asyncio workers."""
+
+    def __init__(self, notify: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+                 workers: int = 2, max_finished: int = 200, retention_seconds: float = 3600):
+        """
+        Initialize the job manager
+
+        Args:
+            notify: Coroutine called with an event message on every job state change
+            workers: Number of jobs run concurrently (generation is further limited by the scheduler)
+            max_finished: Maximum number of finished jobs kept for lookup
+            retention_seconds: How long finished jobs are kept
+        """
+        self.notify = notify
+        self.worker_count = max(1, workers)
+        self.max_finished = max_finished
+        self.retention_seconds = retention_seconds
+        self._jobs: "OrderedDict[str, LLMJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start the workers on the running event loop."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        logger.info(f"Started {self.worker_count} LLM job workers")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in self._jobs.values():
+            if job.task and not job.task.done():
+                job.task.cancel()
+
+    async def submit(self, kind: str, runner: RunnerFn, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Queue a job
+
+        Args:
+            kind: Job type, e.g. "task_command" or "chat"
+            runner: Coroutine function taking a report(stage, **details) callback and
+                returning the job result; a result with "success": False, or with an
+                "error" and no "success" key, fails the job
+            params: Request summary stored with the job
+
+        Returns:
+            The job as a dictionary
+        """
+        if self._queue is None:
+            await self.start()
+        self._prune()
+        job = LLMJob(kind, runner, params)
+        self._jobs[job.id] = job
+        snapshot = job.to_dict()
+        await self._notify(job)
+        await self._queue.put(job)
+        logger.info(f"Queued LLM job {job.id} ({kind})")
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """List jobs, newest first, without their results."""
+        jobs = [job for job in reversed(self._jobs.values()) if status is None or job.status == status]
+        return [job.to_dict(include_result=False) for job in jobs[:limit]]
+
+    async def cancel(self, job_id: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Cancel a queued or generating job
+
+        Args:
+            job_id: Job identifier
+
+        Returns:
+            Tuple of (job dictionary or None if unknown, message)
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None, "Job not found"
+        if not job.cancellable:
+            return job.to_dict(), f"Job is {job.status} ({job.stage}) and can no longer be cancelled"
+
+        job.cancel_requested = True
+        if job.status == JOB_QUEUED:
+            # The worker skips it when it is dequeued
+            await self._finish(job, JOB_CANCELLED)
+        elif job.task:
+            job.task.cancel()
+        return job.to_dict(), "Cancellation requested"
+
+    # --- Internals ---
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status != JOB_QUEUED:
+                    continue
+                job.status = JOB_RUNNING
+                job.stage = "starting"
+                job.started_at = time.time()
+                await self._notify(job)
+                if job.cancel_requested:
+                    await self._finish(job, JOB_CANCELLED)
+                    continue
+                # Run in a separate task so cancelling the job does not cancel the worker
+                job.task = asyncio.create_task(job.runner(self._reporter(job)))
+                await asyncio.wait({job.task})
+                if job.task.cancelled():
+                    await self._finish(job, JOB_CANCELLED)
+                elif job.task.exception() is not None:
+                    error = job.task.exception()
+                    logger.error(f"LLM job {job.id} failed: {error}", exc_info=error)
+                    job.error = str(error)
+                    await self._finish(job, JOB_FAILED)
+                else:
+                    job.result = job.task.result()
+                    if _reports_failure(job.result):
+                        job.error = str(job.result.get("error") or "Job reported failure")
+                        await self._finish(job, JOB_FAILED)
+                    else:
+                        await self._finish(job, JOB_COMPLETED)
+            except Exception as e:
+                logger.error(f"LLM job worker {index} error: {e}", exc_info=True)
+            finally:
+                job.task = None
+                self._queue.task_done()
+
+    def _reporter(self, job: LLMJob) -> ReportFn:
+        async def report(stage: str, **details):
+            job.stage = stage
+            job.details.update(details)
+            await self._notify(job)
+        return report
+
+    async def _finish(self, job: LLMJob, status: str):
+        job.status = status
+        job.stage = status
+        job.finished_at = time.time()
+        logger.info(f"LLM job {job.id} {status}")
+        await self._notify(job)
+
+    async def _notify(self, job: LLMJob):
+        if self.notify is None:
+            return
+        try:
+            await self.notify({"type": "llm_job_updated",
+                               "job": job.to_dict(include_result=job.status in FINISHED_STATES)})
+        except Exception as e:
+            logger.warning(f"Failed to publish update for LLM job {job.id}: {e}")
+
+    def _prune(self):
+        """Drop finished jobs past the retention period or beyond max_finished."""
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.status in FINISHED_STATES]
+        for job in finished:
+            if now - (job.finished_at or now) > self.retention_seconds:
+                del self._jobs[job.id]
+        finished = [job for job in self._jobs.values() if job.status in FINISHED_STATES]
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
@@ -3,63 +3,235 @@ LLM JSON Extractor
 
 This module extracts valid JSON from mixed text responses generated by language models.
 It supports various formats including code blocks, inline JSON, and other common patterns.
+
+Extraction is done by a single-pass scanner that tracks braces, strings, escapes and
+code fences, so nested objects are found whole and every candidate is parsed at most once.
+The scanner is incremental: it can be fed a streamed response chunk by chunk and reports
+each balanced object as soon as its closing brace arrives.
 """
 
 import re
 import json
 import logging
+from typing import List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Keys that mark a JSON object as a task action or a multi-action plan
+ACTION_KEYS = ("action", "actions")
+
+# Characters the scanner has to look at in each state; everything else is skipped in bulk
+_PROSE_CHARS = re.compile(r'[{`]')
+_OBJECT_CHARS = re.compile(r'[{}"`]')
+_STRING_CHARS = re.compile(r'["\\\n]')
+
+# Cheap shape check run before json.loads so braces in prose are not parsed
+_LIKELY_OBJECT = re.compile(r'\{\s*["}]')
+
+
+class JSONObjectScanner:
+    """
+    Incremental scanner that finds balanced top-level JSON objects in free text
+
+    Feed it text in any number of chunks; each call returns the objects completed by
+    that chunk as (json_text, fenced) tuples, where fenced tells whether the object
+    started inside a ``` code block. Opening or closing a fence, or a raw newline inside
+    a string, abandons any partially scanned object, so stray braces and quotes in prose
+    cannot swallow a following code block.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape_next = False   # The next character is escaped by a backslash
+        self._in_fence = False
+        self._object_fenced = False
+        self._backtick_run = 0      # Consecutive backticks seen so far (may span chunks)
+        self._pending = ""          # Text of the current object carried over from earlier chunks
+
+    def feed(self, chunk: str) -> List[Tuple[str, bool]]:
+        """
+        Scan the next piece of text
+
+        Args:
+            chunk: Next piece of the response
+
+        Returns:
+            List of (json_text, fenced) tuples for objects completed within this chunk
+        """
+        found = []
+        if not chunk:
+            return found
+
+        segment_start = 0 if self._depth > 0 else None
+        i = 0
+        length = len(chunk)
+
+        if self._escape_next:
+            self._escape_next = False
+            i = 1
+
+        while i < length:
+            if self._in_string:
+                match = _STRING_CHARS.search(chunk, i)
+                if match is None:
+                    break
+                i = match.start()
+                char = chunk[i]
+                if char == "\\":
+                    if i + 1 >= length:
+                        self._escape_next = True
+                    i += 2
+                    continue
+                if char == '"':
+                    self._in_string = False
+                else:
+                    # JSON strings cannot contain raw newlines, so this was not JSON after all
+                    self._reset_object()
+                    segment_start = None
+                i += 1
+                continue
+
+            pattern = _OBJECT_CHARS if self._depth > 0 else _PROSE_CHARS
+            match = pattern.search(chunk, i)
+            if match is None:
+                self._backtick_run = 0
+                break
+            if match.start() != i:
+                self._backtick_run = 0
+            i = match.start()
+            char = chunk[i]
+
+            if char == "`":
+                self._backtick_run += 1
+                if self._backtick_run == 3:
+                    self._backtick_run = 0
+                    self._in_fence = not self._in_fence
+                    if self._depth > 0:
+                        self._reset_object()
+                        segment_start = None
+                i += 1
+                continue
+
+            self._backtick_run = 0
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    segment_start = i
+                    self._object_fenced = self._in_fence
+                self._depth += 1
+            else:  # "}"
+                self._depth -= 1
+                if self._depth == 0:
+                    found.append((self._pending + chunk[segment_start:i + 1], self._object_fenced))
+                    self._pending = ""
+                    segment_start = None
+            i += 1
+
+        if self._depth > 0 and segment_start is not None:
+            self._pending += chunk[segment_start:]
+        return found
+
+    def _reset_object(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape_next = False
+        self._pending = ""
+
+
+def _parse_action(candidate: str, required_keys=ACTION_KEYS) -> Optional[dict]:
+    if not _LIKELY_OBJECT.match(candidate):
+        return None
+    if not any(f'"{key}"' in candidate for key in required_keys):
+        return None
+    try:
+        parsed = json.loads(candidate)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(parsed, dict) and any(key in parsed for key in required_keys):
+        return parsed
+    return None
+
+
+class StreamingActionExtractor:
+    """
+    Detects a JSON action object while an LLM response is still being streamed
+
+    feed() returns the first complete action object the moment it closes, so the
+    action can be executed before generation finishes. finish() applies the same
+    preference as extract_json_from_llm_response (code blocks over inline JSON)
+    once the full response has been seen.
+    """
+
+    def __init__(self, required_keys=ACTION_KEYS):
+        self.required_keys = required_keys
+        self._scanner = JSONObjectScanner()
+        self.first_fenced: Optional[str] = None
+        self.first_inline: Optional[str] = None
+        self._reported = False
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Scan the next streamed chunk
+
+        Args:
+            chunk: Next piece of the response
+
+        Returns:
+            The first complete action JSON string, returned once; None otherwise
+        """
+        for candidate, fenced in self._scanner.feed(chunk):
+            candidate = candidate.strip()
+            if _parse_action(candidate, self.required_keys) is None:
+                continue
+            if fenced and self.first_fenced is None:
+                self.first_fenced = candidate
+            elif not fenced and self.first_inline is None:
+                self.first_inline = candidate
+            if not self._reported:
+                self._reported = True
+                return candidate
+        return None
+
+    def finish(self) -> Optional[str]:
+        """Get the preferred action JSON after the whole response has been fed."""
+        return self.first_fenced or self.first_inline
+
+
 def extract_json_from_llm_response(llm_response: str) -> str:
     """
     Extract valid JSON from a mixed-text LLM response
-    
+
     This function attempts to find JSON in various formats within an LLM response:
-    1. JSON in code blocks with json tag
-    2. JSON in generic code blocks
-    3. JSON directly in the text
-    
+    1. JSON in code blocks (with or without a json tag)
+    2. JSON directly in the text
+
+    Both are found in a single pass; an action inside a code block is preferred
+    over one written inline.
+
     Args:
         llm_response: The raw text response from an LLM
-        
+
     Returns:
         The extracted JSON string or None if no valid JSON is found
     """
     if not llm_response:
         return None
-    
-    # First try to find JSON in code blocks with 'json' tag (preferred format)
-    json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-    json_matches = re.findall(json_pattern, llm_response)
-    
-    if json_matches:
-        for potential_json in json_matches:
-            # Check if this block contains valid JSON
-            try:
-                # Try to parse it to validate
-                parsed = json.loads(potential_json.strip())
-                if "action" in parsed:  # Ensure it has the action field we need
-                    logger.info(f"Found valid JSON in code block with action field")
-                    return potential_json.strip()
-            except json.JSONDecodeError:
-                continue
-    
-    # If no valid JSON in code blocks, try to find JSON directly in the text
-    json_pattern = r'(\{[\s\S]*?\})'
-    json_matches = re.findall(json_pattern, llm_response)
-    
-    if json_matches:
-        for potential_json in json_matches:
-            # Try each match until we find valid JSON
-            try:
-                # Needs to have at least action field to be our JSON
-                parsed = json.loads(potential_json)
-                if "action" in parsed:
-                    logger.info(f"Found valid JSON directly in text with action field")
-                    return potential_json
-            except json.JSONDecodeError:
-                continue
-    
+
+    if not any(f'"{key}"' in llm_response for key in ACTION_KEYS):
+        logger.warning(f"No valid JSON found in LLM response")
+        return None
+
+    extractor = StreamingActionExtractor()
+    extractor.feed(llm_response)
+
+    if extractor.first_fenced:
+        logger.info(f"Found valid JSON in code block with action field")
+        return extractor.first_fenced
+    if extractor.first_inline:
+        logger.info(f"Found valid JSON directly in text with action field")
+        return extractor.first_inline
+
     logger.warning(f"No valid JSON found in LLM response")
     return None
@@ -0,0 +1,264 @@
+"""
+LLM Scheduler Module
+
+This module provides a request scheduler in front of the OllamaClient. A single local
+Ollama instance serves every generation, so the scheduler:
+
+1. Limits how many generations run concurrently per model
+2. Queues waiting requests by priority (interactive chat ahead of background jobs)
+3. Coalesces byte-identical in-flight requests onto one upstream call
+4. Records queue-time, run-time and Ollama prefill (prompt_eval) metrics
+
+Requests are submitted without blocking and resolve to a concurrent.futures.Future, so the
+scheduler can be used from both request handlers (via chat_completion_async) and worker threads.
+"""
+
+import copy
+import json
+import heapq
+import time
+import hashlib
+import logging
+import asyncio
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 5
+PRIORITY_BACKGROUND = 10
+
+# Number of recent samples kept for percentile metrics
+METRICS_WINDOW = 500
+
+
+class _Request:
+    """A queued upstream call shared by every caller that coalesced onto it."""
+
+    def __init__(self, key: str, model_id: str, messages: List[Dict[str, Any]],
+                 temperature: float, options: Dict[str, Any], priority: int):
+        self.key = key
+        self.model_id = model_id
+        self.messages = messages
+        self.temperature = temperature
+        self.options = options
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.dispatched = False
+        self.waiters = 1
+        self.future: Future = Future()
+
+
+def latency_summary(samples) -> Dict[str, Any]:
+    """Count, average and percentiles (in ms) of timing samples given in seconds."""
+    if not samples:
+        return {"count": 0, "avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(pick(0.50) * 1000, 2),
+        "p95_ms": round(pick(0.95) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+class _ModelStats:
+    """Counters and recent timing samples for one model."""
+
+    def __init__(self):
+        self.submitted = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.queue_times = deque(maxlen=METRICS_WINDOW)
+        self.run_times = deque(maxlen=METRICS_WINDOW)
+        self.prefill_times = deque(maxlen=METRICS_WINDOW)
+        self.prefill_tokens = deque(maxlen=METRICS_WINDOW)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "completed": self.completed,
+            "failed": self.failed,
+            "queue_time": latency_summary(self.queue_times),
+            "run_time": latency_summary(self.run_times),
+            "prefill_time": latency_summary(self.prefill_times),
+            "avg_prefill_tokens": round(sum(self.prefill_tokens) / len(self.prefill_tokens), 1)
+                                  if self.prefill_tokens else 0.0,
+        }
+
+
+class LLMScheduler:
+    """Priority- and concurrency-aware front end for OllamaClient.chat_completion."""
+
+    def __init__(self, client, default_concurrency: int = 1,
+                 model_concurrency: Optional[Dict[str, int]] = None,
+                 max_workers: int = 8):
+        """
+        Initialize the scheduler
+
+        Args:
+            client: The OllamaClient that performs the upstream calls
+            default_concurrency: Concurrent generations allowed per model
+            model_concurrency: Per-model overrides of default_concurrency
+            max_workers: Size of the thread pool running upstream calls
+        """
+        self.client = client
+        self.default_concurrency = max(1, default_concurrency)
+        self.model_concurrency = {k: max(1, v) for k, v in (model_concurrency or {}).items()}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-scheduler")
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._queues: Dict[str, List] = {}
+        self._running: Dict[str, int] = {}
+        self._in_flight: Dict[str, _Request] = {}
+        self._stats: Dict[str, _ModelStats] = {}
+        logger.info(f"Initialized LLMScheduler (default concurrency {self.default_concurrency}, "
+                    f"overrides {self.model_concurrency})")
+
+    # --- Public API ---
+    def submit(self, model_id: str, messages: List[Dict[str, Any]], temperature: float = 0.7,
+               priority: int = PRIORITY_DEFAULT, **options) -> Future:
+        """
+        Queue a chat completion without blocking
+
+        Args:
+            model_id: Ollama model name
+            messages: Chat messages ({"role", "content"})
+            temperature: Sampling temperature
+            priority: Queue priority, lower values run first
+            **options: Extra keyword arguments passed through to the client
+
+        Returns:
+            Future resolving to the client's response dictionary
+        """
+        key = self.request_key(model_id, messages, temperature, options)
+        caller_future: Future = Future()
+        with self._lock:
+            stats = self._stats.setdefault(model_id, _ModelStats())
+            stats.submitted += 1
+            request = self._in_flight.get(key)
+            if request is not None:
+                stats.coalesced += 1
+                request.waiters += 1
+                if not request.dispatched and priority < request.priority:
+                    # Re-queue with the better priority; the stale heap entry is skipped later
+                    request.priority = priority
+                    heapq.heappush(self._queues[model_id], (priority, next(self._counter), request))
+                logger.info(f"Coalesced LLM request for {model_id} onto in-flight call "
+                            f"({request.waiters} waiters)")
+            else:
+                request = _Request(key, model_id, messages, temperature, options, priority)
+                self._in_flight[key] = request
+                heapq.heappush(self._queues.setdefault(model_id, []), (priority, next(self._counter), request))
+            self._chain(request.future, caller_future)
+            self._dispatch_locked(model_id)
+        return caller_future
+
+    def chat_completion(self, model_id: str, messages: List[Dict[str, Any]], temperature: float = 0.7,
+                        priority: int = PRIORITY_DEFAULT, **options) -> Dict[str, Any]:
+        """Blocking equivalent of OllamaClient.chat_completion routed through the scheduler."""
+        return self.submit(model_id, messages, temperature, priority, **options).result()
+
+    async def chat_completion_async(self, model_id: str, messages: List[Dict[str, Any]],
+                                    temperature: float = 0.7, priority: int = PRIORITY_INTERACTIVE,
+                                    **options) -> Dict[str, Any]:
+        """Awaitable chat completion that never blocks the event loop while queued or running."""
+        future = self.submit(model_id, messages, temperature, priority, **options)
+        return await asyncio.wrap_future(future)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get per-model queue depth, concurrency and timing metrics."""
+        with self._lock:
+            models = {}
+            for model_id, stats in self._stats.items():
+                entry = stats.to_dict()
+                entry["queued"] = len({id(r) for _, _, r in self._queues.get(model_id, []) if not r.dispatched})
+                entry["running"] = self._running.get(model_id, 0)
+                entry["concurrency_limit"] = self._limit(model_id)
+                models[model_id] = entry
+            return {
+                "default_concurrency": self.default_concurrency,
+                "in_flight_requests": len(self._in_flight),
+                "models": models,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def request_key(model_id: str, messages: List[Dict[str, Any]], temperature: float,
+                    options: Optional[Dict[str, Any]] = None) -> str:
+        """Hash identifying byte-identical requests."""
+        payload = json.dumps(
+            {"model": model_id, "messages": messages, "temperature": temperature, "options": options or {}},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- Internals ---
+    def _limit(self, model_id: str) -> int:
+        return self.model_concurrency.get(model_id, self.default_concurrency)
+
+    def _dispatch_locked(self, model_id: str):
+        """Start queued requests while the model has free slots. Caller holds the lock."""
+        queue = self._queues.get(model_id, [])
+        while queue and self._running.get(model_id, 0) < self._limit(model_id):
+            _, _, request = heapq.heappop(queue)
+            if request.dispatched:
+                continue
+            request.dispatched = True
+            self._running[model_id] = self._running.get(model_id, 0) + 1
+            self._stats[model_id].queue_times.append(time.monotonic() - request.enqueued_at)
+            self._executor.submit(self._run, request)
+
+    def _run(self, request: _Request):
+        started = time.monotonic()
+        try:
+            result = self.client.chat_completion(request.model_id, request.messages,
+                                                 request.temperature, **request.options)
+        except BaseException as e:
+            self._finish(request, started, failed=True)
+            request.future.set_exception(e)
+            return
+        metrics = result.get("metrics") if isinstance(result, dict) else None
+        self._finish(request, started, failed=False, metrics=metrics)
+        request.future.set_result(result)
+
+    def _finish(self, request: _Request, started: float, failed: bool,
+                metrics: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            stats = self._stats[request.model_id]
+            stats.run_times.append(time.monotonic() - started)
+            if metrics and "prompt_eval_ms" in metrics:
+                stats.prefill_times.append(metrics["prompt_eval_ms"] / 1000)
+                stats.prefill_tokens.append(metrics.get("prompt_eval_count", 0))
+            if failed:
+                stats.failed += 1
+            else:
+                stats.completed += 1
+            self._running[request.model_id] -= 1
+            if self._in_flight.get(request.key) is request:
+                del self._in_flight[request.key]
+            self._dispatch_locked(request.model_id)
+
+    @staticmethod
+    def _chain(source: Future, target: Future):
+        """Resolve target from source, giving each caller its own copy of the result."""
+        def _copy_result(done: Future):
+            if target.done():
+                return
+            exception = done.exception()
+            if exception is not None:
+                target.set_exception(exception)
+            else:
+                target.set_result(copy.deepcopy(done.result()))
+        source.add_done_callback(_copy_result)
@@ -11,16 +11,14 @@ import datetime
 from typing import Dict, List, Optional, Union, Any
 from pathlib import Path
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("/hub_data/llm_task_controller.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
+logger = logging.getLogger(__name__)  # Handlers are configured by the application (log_setup)
+
+# Actions that modify tasks.yaml and can be batched per project
+MUTATING_ACTIONS = ("create_task", "update_task", "delete_task")
+READ_ACTIONS = ("get_projects", "get_tasks")
+
+# Upper bound on the number of steps in a single action plan
+MAX_PLAN_STEPS = 50
 
 class LLMTaskController:
     """
@@ -124,7 +122,8 @@ class LLMTaskController:
             
             if created_task:
                 logger.info(f"Created task {created_task.get('id')} in {project_id}")
-                return {"success": True, "task_id": created_task.get('id'), "project_id": project_id, "action": "create_task"}
+                return {"success": True, "task_id": created_task.get('id'), "project_id": project_id, "action": "create_task",
+                        "task": dict(created_task, project_id=project_id)}
             else:
                 return {"success": False, "error": "Failed to create task"}
                 
@@ -161,7 +160,8 @@ class LLMTaskController:
             
             if updated_task:
                 logger.info(f"Updated task {task_id} in {project_id}")
-                return {"success": True, "project_id": project_id, "action": "update_task"}
+                return {"success": True, "task_id": task_id, "project_id": project_id, "action": "update_task",
+                        "task": dict(updated_task, project_id=project_id)}
             else:
                 return {"success": False, "error": "Failed to update task"}
                 
@@ -186,7 +186,7 @@ class LLMTaskController:
             
             if success:
                 logger.info(f"Deleted task {task_id} from {project_id}")
-                return {"success": True, "project_id": project_id, "action": "delete_task"}
+                return {"success": True, "task_id": task_id, "project_id": project_id, "action": "delete_task"}
             else:
                 return {"success": False, "error": f"Failed to delete task {task_id}"}
                 
@@ -194,6 +194,172 @@ class LLMTaskController:
             logger.error(f"Error deleting task {task_id} from {project_id}: {e}")
             return {"success": False, "error": str(e)}
     
+    def validate_plan(self, steps: Any) -> List[str]:
+        """
+        Validate a multi-action plan before anything is executed
+        
+        Args:
+            steps: Value of the "actions" field from the language model
+            
+        Returns:
+            List of error messages (empty if the plan is valid)
+        """
+        if not isinstance(steps, list) or not steps:
+            return ["'actions' must be a non-empty list"]
+        if len(steps) > MAX_PLAN_STEPS:
+            return [f"Plan has {len(steps)} steps, the maximum is {MAX_PLAN_STEPS}"]
+        
+        errors = []
+        for i, step in enumerate(steps):
+            prefix = f"Step {i + 1}"
+            if not isinstance(step, dict) or 'action' not in step:
+                errors.append(f"{prefix}: missing 'action' field")
+                continue
+            action = step['action']
+            if action not in MUTATING_ACTIONS and action not in READ_ACTIONS:
+                errors.append(f"{prefix}: unknown action: {action}")
+                continue
+            if action == 'get_projects':
+                continue
+            
+            project_id = step.get('project_id')
+            if not project_id or not isinstance(project_id, str):
+                errors.append(f"{prefix}: missing 'project_id' field")
+                continue
+            if '/' in project_id or '\\' in project_id or project_id.startswith(('.', '_')) \
+               or not (self.tasks_service.data_path / project_id).is_dir():
+                errors.append(f"{prefix}: unknown project: {project_id}")
+                continue
+            
+            if action == 'create_task':
+                task = step.get('task')
+                if not isinstance(task, dict):
+                    errors.append(f"{prefix}: missing 'task' object")
+                else:
+                    for field in ('title', 'description'):
+                        if field not in task:
+                            errors.append(f"{prefix}: missing required task field: {field}")
+            elif action == 'update_task':
+                if 'task_id' not in step:
+                    errors.append(f"{prefix}: missing 'task_id' field")
+                if not isinstance(step.get('updates'), dict):
+                    errors.append(f"{prefix}: missing 'updates' object")
+            elif action == 'delete_task':
+                if 'task_id' not in step:
+                    errors.append(f"{prefix}: missing 'task_id' field")
+        return errors
+    
+    def execute_plan(self, steps: List[Dict]) -> Dict:
+        """
+        Validate and execute a multi-action plan
+        
+        Mutating steps are grouped by project so that each tasks.yaml is read and
+        written once, keeping the plan's order within each project. Read-only steps
+        run after all writes so they reflect the plan's outcome.
+        
+        Args:
+            steps: List of action dictionaries
+            
+        Returns:
+            Dictionary with overall success, per-step results and the changed project ids
+        """
+        errors = self.validate_plan(steps)
+        if errors:
+            logger.warning(f"Rejected action plan: {errors}")
+            return {"success": False, "action": "plan", "error": "Invalid action plan", "errors": errors}
+        
+        results: List[Optional[Dict]] = [None] * len(steps)
+        
+        # Group mutating steps by project, remembering their position in the plan
+        by_project: Dict[str, List[int]] = {}
+        for i, step in enumerate(steps):
+            if step['action'] in MUTATING_ACTIONS:
+                by_project.setdefault(step['project_id'], []).append(i)
+        
+        changed_projects = []
+        for project_id, indices in by_project.items():
+            operations = []
+            for i in indices:
+                operation = dict(steps[i])
+                if operation['action'] == 'create_task':
+                    task = dict(operation['task'])
+                    task.setdefault('status', 'todo')
+                    task.setdefault('priority', 'medium')
+                    operation['task'] = task
+                elif 'task_id' in operation:
+                    operation['task_id'] = str(operation['task_id'])
+                operations.append(operation)
+            try:
+                project_results = self.tasks_service.apply_task_operations(project_id, operations)
+            except Exception as e:
+                logger.error(f"Error applying plan steps to {project_id}: {e}")
+                project_results = [{"success": False, "action": op['action'], "project_id": project_id,
+                                    "error": str(e)} for op in operations]
+            for i, result in zip(indices, project_results):
+                results[i] = result
+            if any(r.get("success") for r in project_results):
+                changed_projects.append(project_id)
+            logger.info(f"Applied {len(operations)} plan steps to {project_id} in one write")
+        
+        for i, step in enumerate(steps):
+            if step['action'] in READ_ACTIONS:
+                results[i] = self.process_action(step)
+        
+        for i, result in enumerate(results):
+            result["step"] = i + 1
+        
+        return {
+            "success": all(r.get("success") for r in results),
+            "action": "plan",
+            "results": results,
+            "project_ids": changed_projects,
+        }
+    
+    def process_action(self, action_data: Dict) -> Dict:
+        """
+        Execute a single parsed action
+        
+        Args:
+            action_data: Action dictionary with an 'action' field
+            
+        Returns:
+            Dictionary with result of the executed action
+        """
+        # Validate action format
+        if 'action' not in action_data:
+            return {"success": False, "error": "Missing 'action' field in response"}
+            
+        action = action_data['action']
+        
+        # Execute the appropriate action
+        if action == 'get_projects':
+            projects = self.get_all_projects()
+            return {"success": True, "data": projects, "action": action}
+            
+        elif action == 'get_tasks':
+            if 'project_id' not in action_data:
+                return {"success": False, "error": "Missing 'project_id' field"}
+            tasks = self.get_project_tasks(action_data['project_id'])
+            return {"success": True, "data": tasks, "project_id": action_data['project_id'], "action": action}
+            
+        elif action == 'create_task':
+            if 'project_id' not in action_data or 'task' not in action_data:
+                return {"success": False, "error": "Missing required fields (project_id or task)"}
+            return self.create_task(action_data['project_id'], action_data['task'])
+            
+        elif action == 'update_task':
+            if 'project_id' not in action_data or 'task_id' not in action_data or 'updates' not in action_data:
+                return {"success": False, "error": "Missing required fields (project_id, task_id, or updates)"}
+            return self.update_task(action_data['project_id'], action_data['task_id'], action_data['updates'])
+            
+        elif action == 'delete_task':
+            if 'project_id' not in action_data or 'task_id' not in action_data:
+                return {"success": False, "error": "Missing required fields (project_id or task_id)"}
+            return self.delete_task(action_data['project_id'], action_data['task_id'])
+            
+        else:
+            return {"success": False, "error": f"Unknown action: {action}"}
+    
     def process_llm_response(self, llm_response: str) -> Dict:
         """
         Process JSON response from language model and execute the requested action
@@ -218,40 +384,13 @@ class LLMTaskController:
                     "attempted_json": llm_response
                 }
             
-            # Validate action format
-            if 'action' not in action_data:
-                return {"success": False, "error": "Missing 'action' field in response"}
-                
-            action = action_data['action']
+            # Multi-action plans: {"actions": [...]}
+            if isinstance(action_data, dict) and 'actions' in action_data:
+                return self.execute_plan(action_data['actions'])
             
-            # Execute the appropriate action
-            if action == 'get_projects':
-                projects = self.get_all_projects()
-                return {"success": True, "data": projects, "action": action}
-                
-            elif action == 'get_tasks':
-                if 'project_id' not in action_data:
-                    return {"success": False, "error": "Missing 'project_id' field"}
-                tasks = self.get_project_tasks(action_data['project_id'])
-                return {"success": True, "data": tasks, "project_id": action_data['project_id'], "action": action}
-                
-            elif action == 'create_task':
-                if 'project_id' not in action_data or 'task' not in action_data:
-                    return {"success": False, "error": "Missing required fields (project_id or task)"}
-                return self.create_task(action_data['project_id'], action_data['task'])
-                
-            elif action == 'update_task':
-                if 'project_id' not in action_data or 'task_id' not in action_data or 'updates' not in action_data:
-                    return {"success": False, "error": "Missing required fields (project_id, task_id, or updates)"}
-                return self.update_task(action_data['project_id'], action_data['task_id'], action_data['updates'])
-                
-            elif action == 'delete_task':
-                if 'project_id' not in action_data or 'task_id' not in action_data:
-                    return {"success": False, "error": "Missing required fields (project_id or task_id)"}
-                return self.delete_task(action_data['project_id'], action_data['task_id'])
-                
-            else:
-                return {"success": False, "error": f"Unknown action: {action}"}
+            if not isinstance(action_data, dict):
+                return {"success": False, "error": "Missing 'action' field in response"}
+            return self.process_action(action_data)
                 
         except Exception as e:
             logger.error(f"Error processing LLM response: {e}")
@@ -0,0 +1,221 @@
+"""
+Log Setup Module
+
+This module configures the backend's logging pipeline. Loggers only put records on a
+queue (QueueHandler), so request handlers never wait for disk or console I/O; a
+QueueListener thread writes them to a size-rotated file and the console. The log file
+lives in LOG_DIR, outside the hub directory, so writing it never triggers the file
+watcher. The queue is bounded: if the writer falls behind, records are dropped and
+counted instead of blocking the caller.
+
+Hot paths log through RateLimitedLog, which emits structured "message key=value" records
+at most burst times per key and interval, and reports how many were suppressed with the
+next record that gets through.
+"""
+
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Any, Optional
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+LOG_FILE = "backend.log"
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """The queue handler installed on the root logger and the writer thread behind it."""
+
+    def __init__(self, handler: _DroppingQueueHandler, listener: QueueListener, file_path: Optional[str],
+                 max_bytes: int, backup_count: int):
+        self.handler = handler
+        self.listener = listener
+        self.file_path = file_path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._stopped = False
+
+    def stop(self):
+        """Write out queued records and stop the writer thread."""
+        if not self._stopped:
+            self._stopped = True
+            self.listener.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "file": self.file_path,
+            "max_bytes": self.max_bytes,
+            "backup_count": self.backup_count,
+            "queued": self.handler.queue.qsize(),
+            "queue_size": self.handler.queue.maxsize,
+            "dropped": self.handler.dropped,
+        }
+
+
+_pipeline: Optional[LogPipeline] = None
+
+
+def setup_logging(log_dir: str, level: str = "INFO", max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3,
+                  queue_size: int = 10000, console: bool = True) -> LogPipeline:
+    """
+    Route all logging through a queue to a rotating file and the console
+
+    Calling it again returns the pipeline already installed.
+
+    Args:
+        log_dir: Directory for the log file (must be outside the watched hub)
+        level: Root log level
+        max_bytes: Size at which the log file is rotated
+        backup_count: Rotated files kept
+        queue_size: Records buffered for the writer thread before new ones are dropped
+        console: Also write to stderr
+
+    Returns:
+        The installed pipeline
+    """
+    global _pipeline
+    if _pipeline is not None:
+        return _pipeline
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    file_path = None
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        file_path = os.path.join(log_dir, LOG_FILE)
+        file_handler = RotatingFileHandler(file_path, maxBytes=max_bytes, backupCount=backup_count,
+                                           encoding="utf-8", delay=True)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    except OSError as e:
+        file_path = None
+        console = True
+        sys.stderr.write(f"Could not open log directory {log_dir}: {e}; logging to the console only\n")
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        handlers.append(stream_handler)
+
+    queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=max(1, queue_size)))
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    _pipeline = LogPipeline(queue_handler, listener, file_path, max_bytes, backup_count)
+    atexit.register(_pipeline.stop)
+    return _pipeline
+
+
+def get_pipeline() -> Optional[LogPipeline]:
+    return _pipeline
+
+
+def parse_level(level: str) -> int:
+    """Get the numeric value of a level name; raises ValueError for unknown names."""
+    value = logging.getLevelName(str(level).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level: {level}")
+    return value
+
+
+def get_levels() -> Dict[str, str]:
+    """Levels of the root logger and of every logger with an explicitly set level."""
+    levels = {"root": logging.getLevelName(logging.getLogger().level)}
+    for name, candidate in sorted(logging.Logger.manager.loggerDict.items()):
+        if isinstance(candidate, logging.Logger) and candidate.level != logging.NOTSET:
+            levels[name] = logging.getLevelName(candidate.level)
+    return levels
+
+
+def set_level(level: str, logger_name: Optional[str] = None) -> Dict[str, str]:
+    """
+    Change a logger's level at runtime
+
+    Args:
+        level: Level name (DEBUG, INFO, ...), or NOTSET to inherit from the parent
+        logger_name: Logger to change; the root logger if omitted
+
+    Returns:
+        The levels after the change
+    """
+    value = parse_level(level)
+    target = logging.getLogger(logger_name) if logger_name and logger_name != "root" else logging.getLogger()
+    target.setLevel(value)
+    return get_levels()
+
+
+class RateLimitedLog:
+    """Structured, per-key rate-limited logging for hot paths."""
+
+    def __init__(self, logger: logging.Logger, interval: float = 10.0, burst: int = 20):
+        """
+        Initialize the limiter
+
+        Args:
+            logger: Logger the records go to
+            interval: Length of a rate-limiting window in seconds
+            burst: Records per key emitted in one window; the rest are counted
+        """
+        self.logger = logger
+        self.interval = interval
+        self.burst = max(1, burst)
+        self._lock = threading.Lock()
+        self._windows: Dict[str, list] = {}  # key -> [window start, emitted, suppressed]
+        self.suppressed = 0
+
+    def log(self, level: int, key: str, message: str, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            carried = 0
+            if window is None or now - window[0] >= self.interval:
+                carried = window[2] if window else 0
+                window = self._windows[key] = [now, 0, 0]
+            if window[1] >= self.burst:
+                window[2] += 1
+                self.suppressed += 1
+                return
+            window[1] += 1
+        if carried:
+            fields["suppressed"] = carried
+        text = " ".join(f"{name}={value}" for name, value in fields.items())
+        self.logger.log(level, f"{message} {text}" if text else message, extra={"fields": fields}, stacklevel=3)
+
+    def debug(self, key: str, message: str, **fields):
+        self.log(logging.DEBUG, key, message, **fields)
+
+    def info(self, key: str, message: str, **fields):
+        self.log(logging.INFO, key, message, **fields)
+
+    def warning(self, key: str, message: str, **fields):
+        self.log(logging.WARNING, key, message, **fields)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"interval_seconds": self.interval, "burst": self.burst, "suppressed": self.suppressed,
+                    "keys": {key: {"emitted": window[1], "suppressed": window[2]} for key, window in self._windows.items()}}
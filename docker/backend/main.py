@@ -1,6 +1,6 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, Path as FastAPIPath, Depends
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, Path as FastAPIPath, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import os
 import json
@@ -11,7 +11,6 @@ from datetime import datetime, timezone, timedelta
 import logging
 from pathlib import Path as FilePath
 import time
-from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileModifiedEvent, FileCreatedEvent, FileDeletedEvent, FileMovedEvent
 import requests
 from contextlib import suppress
@@ -20,8 +19,26 @@ import re
 
 from update_alarm_legacy import update_alarm_legacy
 
-# Import the Ollama client
+# Import the Ollama client and request scheduler
 from ollama_client import OllamaClient
+from llm_scheduler import LLMScheduler, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from llm_cache import LLMResponseCache
+from llm_jobs import LLMJobManager
+from change_batcher import ChangeBatcher
+from debouncer import TrailingDebouncer
+from write_tokens import WriteTokens
+from hub_watcher import HubWatcher
+from path_filter import PathFilter, HUBIGNORE_FILE
+from log_setup import setup_logging, get_levels, set_level, RateLimitedLog
+from connection_manager import ConnectionManager, message_topics
+from event_log import EventLog, sse_format
+from revisions import RevisionTracker, task_changes, task_delta, tasks_stream
+from model_catalog import ModelCatalog
+from model_router import ModelRouter, parse_rules, ROUTE_SMALL, ROUTE_LARGE, ROUTE_ESCALATED
+from prompt_layout import (
+    PromptLayout, PrefixTracker,
+    STABILITY_STATIC, STABILITY_WORKSPACE, STABILITY_SESSION, STABILITY_REQUEST
+)
 
 # Import task models and service
 from task_models import (
@@ -30,20 +47,32 @@ from task_models import (
 )
 from tasks_service import TasksService
 
+# Import chat session storage
+from chat_store import ChatSessionStore, RESERVED_ID_SUFFIX
+from chat_summarizer import ChatSummarizer
+
 # Import LLM Task Controller
 from llm_task_controller import LLMTaskController
 from llm_json_extractor import extract_json_from_llm_response
+from task_command_parser import TaskCommandParser
+from task_models import task_action_json_schema, validate_task_action
 
 # --- Logging Setup ---
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.FileHandler("/hub_data/backend.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+# Records go through a queue to a writer thread; the rotating log file lives outside the watched hub
+log_pipeline = setup_logging(
+    os.environ.get("LOG_DIR", "/var/log/projects-hub"),
+    level=os.environ.get("LOG_LEVEL", "INFO"),
+    max_bytes=int(os.environ.get("LOG_MAX_BYTES", str(5 * 1024 * 1024))),
+    backup_count=int(os.environ.get("LOG_BACKUP_COUNT", "3")),
+    queue_size=int(os.environ.get("LOG_QUEUE_SIZE", "10000")),
 )
 logger = logging.getLogger(__name__)
+# Per-event and per-write messages: at most LOG_HOT_BURST per kind every LOG_HOT_INTERVAL seconds
+hot_log = RateLimitedLog(
+    logger,
+    interval=float(os.environ.get("LOG_HOT_INTERVAL", "10")),
+    burst=int(os.environ.get("LOG_HOT_BURST", "20")),
+)
 
 # --- FastAPI App and CORS ---
 app = FastAPI(
@@ -60,103 +89,129 @@ app.add_middleware(
 )
 
 # --- Constants and Global State ---
-HUB_DATA_PATH = FilePath("/hub_data").resolve()
+HUB_DATA_PATH = FilePath(os.environ.get("HUB_DATA_PATH", "/hub_data")).resolve()
 FOCUS_TIMER_PATH = FilePath(r"C:\Users\admin\Desktop\FocusTimer\focus_logs").resolve()
 focus_monitor_active = True
 main_event_loop: Optional[asyncio.AbstractEventLoop] = None
 
 # Initialize services
-ollama_client = OllamaClient(base_url="http://host.docker.internal:11434")
-tasks_service = TasksService(HUB_DATA_PATH)
+ollama_client = OllamaClient(
+    base_url="http://host.docker.internal:11434",
+    keep_alive=os.environ.get("OLLAMA_KEEP_ALIVE", "30m"),  # Keep models (and their prompt cache) loaded
+    connect_timeout=float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "3")),
+    chat_timeout=float(os.environ.get("OLLAMA_CHAT_TIMEOUT", "180")),
+    max_retries=int(os.environ.get("OLLAMA_MAX_RETRIES", "2")),
+    failure_threshold=int(os.environ.get("OLLAMA_BREAKER_THRESHOLD", "3")),
+    probe_interval=float(os.environ.get("OLLAMA_PROBE_INTERVAL", "5")),
+)
+prompt_prefix_tracker = PrefixTracker()
+model_catalog = ModelCatalog(
+    ollama_client,
+    ttl_seconds=float(os.environ.get("OLLAMA_MODELS_TTL", "300")),
+    warmup_models=[m.strip() for m in os.environ.get("OLLAMA_WARMUP_MODELS", "").split(",")],
+    warmup_interval=float(os.environ.get("OLLAMA_WARMUP_INTERVAL", "0")),
+)
+
+# Without a usable summary, chat prompts keep at least this many history messages,
+# dropping older ones in steps
+CHAT_HISTORY_MESSAGES = 10
+CHAT_HISTORY_STEP = 6
+
+def _parse_model_limits(value: str) -> Dict[str, int]:
+    """Parse "model=limit,model=limit" into a dict, ignoring malformed entries."""
+    limits = {}
+    for item in value.split(","):
+        model, _, limit = item.strip().partition("=")
+        if model and limit.isdigit():
+            limits[model] = int(limit)
+    return limits
+
+llm_scheduler = LLMScheduler(
+    ollama_client,
+    default_concurrency=int(os.environ.get("OLLAMA_MAX_CONCURRENCY", "1")),
+    model_concurrency=_parse_model_limits(os.environ.get("OLLAMA_MODEL_CONCURRENCY", "")),
+)
+model_router = ModelRouter(
+    llm_scheduler,
+    small_model=os.environ.get("LLM_ROUTER_SMALL_MODEL") or None,  # Routing is off unless a small model is set
+    rules=parse_rules(os.environ.get("LLM_ROUTER_RULES", "")),
+)
+write_tokens = WriteTokens()  # Recognizes watcher events caused by our own writes
+tasks_service = TasksService(HUB_DATA_PATH, on_write=write_tokens.register)  # Task writes are always broadcast by the caller
+llm_response_cache = LLMResponseCache(
+    HUB_DATA_PATH / ".cache" / "llm_response_cache.json",
+    ttl_seconds=float(os.environ.get("LLM_CACHE_TTL", "3600")),
+    max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "256")),
+)
 llm_task_controller = LLMTaskController(tasks_service)
+task_command_parser = TaskCommandParser(tasks_service)
+chat_store = ChatSessionStore(HUB_DATA_PATH / "chat_sessions")
+chat_summarizer = ChatSummarizer(
+    chat_store,
+    llm_scheduler,
+    model_id=os.environ.get("CHAT_SUMMARY_MODEL") or None,  # e.g. a small model; defaults to the chat model
+    threshold_tokens=int(os.environ.get("CHAT_SUMMARY_THRESHOLD_TOKENS", "3000")),
+    keep_recent_tokens=int(os.environ.get("CHAT_SUMMARY_KEEP_TOKENS", "1200")),
+)
 
 # Service dependencies
 def get_tasks_service() -> TasksService:
     return tasks_service
 
 # --- WebSocket Connection Manager ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.connections_lock = asyncio.Lock()
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        async with self.connections_lock: self.active_connections.append(websocket)
-        logger.info(f"New WebSocket connection from {websocket.client.host}:{websocket.client.port}. Total: {len(self.active_connections)}")
-
-    async def disconnect(self, websocket: WebSocket):
-        async with self.connections_lock:
-            if websocket in self.active_connections: self.active_connections.remove(websocket)
-        logger.info(f"WebSocket disconnected from {websocket.client.host}:{websocket.client.port}. Remaining: {len(self.active_connections)}")
-
-    async def broadcast(self, message: Dict[str, Any]):
-        async with self.connections_lock: connections_to_send = list(self.active_connections)
-        
-        if not connections_to_send:
-            logger.warning(f"Cannot broadcast message of type '{message.get('type')}': No active connections")
-            return
-            
-        logger.info(f"Broadcasting message of type '{message.get('type')}' to {len(connections_to_send)} clients")
-        
-        # Convert message to JSON just once for better performance
-        message_json = json.dumps(message)
-        
-        results = await asyncio.gather(*[self._send_message(connection, message_json) for connection in connections_to_send], return_exceptions=True)
-        
-        # Log successful deliveries and handle disconnected sockets
-        success_count = sum(1 for r in results if not isinstance(r, Exception))
-        logger.info(f"Message broadcast successful to {success_count}/{len(connections_to_send)} clients")
-        
-        disconnected_sockets = [connections_to_send[i] for i, result in enumerate(results) if isinstance(result, Exception)]
-        if disconnected_sockets:
-            logger.warning(f"Detected {len(disconnected_sockets)} disconnected websockets during broadcast")
-            async with self.connections_lock:
-                for socket in disconnected_sockets:
-                    if socket in self.active_connections: 
-                        self.active_connections.remove(socket)
-                        logger.info(f"Removed disconnected socket from active connections. Remaining: {len(self.active_connections)}")
-
-    async def _send_message(self, websocket: WebSocket, message_json: str):
-        try: 
-            await websocket.send_text(message_json)
-            return True
-        except Exception as e: 
-            logger.error(f"Error sending message to websocket: {str(e)}")
-            raise e
-
-manager = ConnectionManager()
+event_log = EventLog(capacity=int(os.environ.get("EVENT_LOG_SIZE", "1000")))  # Recent broadcasts kept for replay on reconnect
+SSE_KEEPALIVE_SECONDS = float(os.environ.get("SSE_KEEPALIVE_SECONDS", "15"))
+manager = ConnectionManager(
+    max_queue=int(os.environ.get("WS_QUEUE_SIZE", "256")),  # Messages queued per client before the overflow policy applies
+    overflow_policy=os.environ.get("WS_OVERFLOW_POLICY", "coalesce"),  # "coalesce" or "resync"
+    heartbeat_interval=float(os.environ.get("WS_HEARTBEAT_INTERVAL", "20")),
+    heartbeat_timeout=float(os.environ.get("WS_HEARTBEAT_TIMEOUT", "60")),
+    send_timeout=float(os.environ.get("WS_SEND_TIMEOUT", "10")),
+    event_log=event_log,
+)
+revisions = RevisionTracker()  # Revision numbers of task/project change events
+change_batcher = ChangeBatcher(
+    manager.broadcast,
+    window=float(os.environ.get("WATCHER_BATCH_WINDOW", "0.25")),  # Seconds file changes are collected per broadcast
+)
+llm_jobs = LLMJobManager(
+    notify=manager.broadcast,
+    workers=int(os.environ.get("LLM_JOB_WORKERS", "2")),
+)
 
 # --- File System Watcher ---
+
 class HubChangeHandler(FileSystemEventHandler):
-    def __init__(self, ws_manager: ConnectionManager, loop: asyncio.AbstractEventLoop):
+    def __init__(self, batcher: ChangeBatcher, loop: asyncio.AbstractEventLoop):
         super().__init__()
-        self.ws_manager = ws_manager
+        self.batcher = batcher
         self.loop = loop
-        self.debounce_cache: Dict[str, float] = {}
-        self.debounce_interval: float = 1.0
+        self.hub_prefix = str(HUB_DATA_PATH) + os.sep
+        self.hubignore_path = str(HUB_DATA_PATH / HUBIGNORE_FILE)
+        # Built-in ignore rules plus the hub's .hubignore, compiled once (reloaded when it changes)
+        self.path_filter = PathFilter(hub_path=HUB_DATA_PATH)
+        # Bursts of events per path are merged and delivered after the path goes quiet
+        self.debouncer = TrailingDebouncer(
+            self._emit,
+            quiet_period=float(os.environ.get("WATCHER_QUIET_PERIOD", "0.3")),
+            max_delay=float(os.environ.get("WATCHER_MAX_DELAY", "2.0")),
+            max_entries=int(os.environ.get("WATCHER_MAX_PENDING", "10000")),
+        )
+        self.filtered = 0
 
     def _should_process(self, path_str: str) -> bool:
-        try:
-            path_obj = FilePath(path_str).resolve()
-            if not path_obj.is_relative_to(HUB_DATA_PATH): return False
-            ignored_dirs = {".git", ".vscode", ".idea", "__pycache__", "node_modules"}
-            ignored_files = {".DS_Store", "backend.log"}
-            if any(part in ignored_dirs for part in path_obj.parts) or path_obj.name in ignored_files: return False
-            now = time.monotonic()
-            last_event = self.debounce_cache.get(path_str)
-            if last_event and (now - last_event) < self.debounce_interval: return False
-            self.debounce_cache[path_str] = now
-            return True
-        except Exception: return False
+        # The observer reports paths below the (resolved) hub path as given; rules see them hub-relative
+        if not path_str.startswith(self.hub_prefix): return False
+        return not self.path_filter.is_ignored(path_str[len(self.hub_prefix):].replace("\\", "/"))
 
-    async def broadcast_change(self, event_type: str, src_path: str):
+    def classify_change(self, event_type: str, src_path: str) -> Optional[Dict[str, Any]]:
+        """Map a file event to the change message clients understand (None if irrelevant)."""
         try: 
             relative_path = str(FilePath(src_path).relative_to(HUB_DATA_PATH)).replace("\\", "/")
         except ValueError: 
-            return
+            return None
             
-        logger.info(f"File Watcher: Processing '{event_type}' for '{relative_path}'")
+        hot_log.info("watcher.event", "File Watcher: Processing", event=event_type, path=relative_path)
         message: Optional[Dict[str, Any]] = None
         path_parts = FilePath(relative_path).parts
         
@@ -172,34 +227,47 @@ class HubChangeHandler(FileSystemEventHandler):
                 date_str = path_parts[-1].replace("daily_summary_", "").replace(".json", "")
                 message = {"type": "focus_summary_updated", "date": date_str}
             else: 
-                return
+                return None
         elif len(path_parts) > 1:
             project_id = path_parts[0]
             if project_id.startswith(('.', '_')) or '/' in project_id or '\\' in project_id: 
-                return
+                return None
                 
             filename = path_parts[-1]
             if filename == "tasks.yaml": 
-                message = {"type": "tasks_updated", "project_id": project_id, "path": relative_path}
+                message = revisions.tasks_event(project_id, path=relative_path)
             elif filename == "project.yaml": 
-                message = {"type": "project_updated", "project_id": project_id, "path": relative_path}
+                message = revisions.project_event(project_id, path=relative_path)
             elif len(path_parts) > 2 and path_parts[1] == "docs" and filename.endswith(".md"):
                 message = {"type": "document_updated", "project_id": project_id, "path": relative_path, "event": event_type}
             elif len(path_parts) > 2 and path_parts[1] == "assets":
                 message = {"type": "asset_updated", "project_id": project_id, "path": relative_path, "event": event_type}
                 
-        if message: 
-            await self.ws_manager.broadcast(message)
+        return message
 
     def schedule_broadcast(self, event_type: str, src_path: str):
         if not self.loop.is_running(): 
             return
             
         if not self._should_process(src_path): 
+            self.filtered += 1
             return
             
-        coro = self.broadcast_change(event_type, src_path)
-        asyncio.run_coroutine_threadsafe(coro, self.loop)
+        self.loop.call_soon_threadsafe(self.debouncer.add, src_path, event_type)
+
+    def _emit(self, src_path: str, event_type: str):
+        # Runs on the event loop once the path has gone quiet; changes are then coalesced into batches
+        if src_path == self.hubignore_path:
+            self.path_filter.load()  # Applies per event and to polling; native watches follow on restart
+            return
+        if event_type != "deleted" and write_tokens.is_own_write(src_path):
+            return  # Echo of a write whose change the backend already broadcast
+        message = self.classify_change(event_type, src_path)
+        if message:
+            self.batcher.add(message)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"filtered": self.filtered, "path_filter": self.path_filter.get_stats(), "debouncer": self.debouncer.get_stats()}
 
     def on_modified(self, event: FileModifiedEvent):
         if not event.is_directory: 
@@ -213,6 +281,12 @@ class HubChangeHandler(FileSystemEventHandler):
         if not event.is_directory: 
             self.schedule_broadcast("deleted", event.src_path)
 
+    def on_moved(self, event: FileMovedEvent):
+        # Editors often save by writing a temporary file and renaming it over the original
+        if not event.is_directory:
+            self.schedule_broadcast("deleted", event.src_path)
+            self.schedule_broadcast("created", event.dest_path)
+
 # --- Data Models ---
 class Project(BaseModel): 
     title: str
@@ -254,6 +328,10 @@ class TaskUpdate(BaseModel):
     id: str
     status: str
     
+class LogLevelUpdate(BaseModel):
+    level: str
+    logger: Optional[str] = None  # Root logger if omitted
+
 class DocumentUpdate(BaseModel): 
     content: str
     
@@ -282,6 +360,16 @@ class ChatSession(BaseModel):
     lastUpdated: str
     messages: List[ChatMessage] = []
 
+class ChatSessionCreate(BaseModel):
+    id: Optional[str] = None
+    title: Optional[str] = None
+    created_at: Optional[Any] = None
+    lastMessage: Optional[str] = None
+    lastUpdated: Optional[str] = None
+
+class ChatSessionUpdate(BaseModel):
+    title: str
+
 class ChatModel(BaseModel):
     id: str
     name: str
@@ -294,6 +382,7 @@ class ChatRequest(BaseModel):
     model_id: str
     session_id: str
     context_data: Optional[Dict[str, Any]] = None
+    background: bool = False  # Return a job id at once and deliver the reply via /ws and /llm/jobs
     
     model_config = {
         'protected_namespaces': ()
@@ -303,6 +392,16 @@ class LLMTaskRequest(BaseModel):
     command: str
     model_id: str = "llama3"
     system_prompt: Optional[str] = None
+    temperature: float = 0.7
+    cacheable: bool = False  # Reuse a cached response even when temperature > 0
+    fast_path: bool = True  # Execute simple, unambiguous commands without calling the LLM
+    structured_output: bool = False  # Constrain the LLM to the action JSON schema (Ollama `format`)
+    background: bool = False  # Return a job id at once and deliver the result via /ws and /llm/jobs
+    route: Optional[str] = None  # "small" or "large" to bypass the routing rules
+    
+    model_config = {
+        'protected_namespaces': ()
+    }
 
 # --- Helper Functions ---
 def read_yaml_file(file_path: FilePath) -> Any:
@@ -342,12 +441,15 @@ def read_text_file(file_path: FilePath) -> str:
     except Exception as e: 
         raise HTTPException(500, f"Read error: {e}")
         
-def write_yaml_file(file_path: FilePath, data: Any):
+def write_yaml_file(file_path: FilePath, data: Any, echo: bool = True):
+    """Write YAML; pass echo=False when the caller broadcasts the change itself (drops the watcher's event)."""
     try:
         file_path.parent.mkdir(parents=True, exist_ok=True)
         with open(file_path, "w", encoding="utf-8") as f: 
             yaml.dump(data, f, allow_unicode=True, default_flow_style=False, sort_keys=False, indent=2)
-        logger.info(f"Wrote YAML: {file_path}")
+        if not echo:
+            write_tokens.register(file_path)
+        hot_log.info("file.write", "Wrote YAML", path=file_path)
     except Exception as e: 
         raise HTTPException(500, f"Write error: {e}")
         
@@ -356,10 +458,28 @@ def write_text_file(file_path: FilePath, content: str):
         file_path.parent.mkdir(parents=True, exist_ok=True)
         with open(file_path, "w", encoding="utf-8") as f: 
             f.write(content)
-        logger.info(f"Wrote text: {file_path}")
+        hot_log.info("file.write", "Wrote text", path=file_path)
     except Exception as e: 
         raise HTTPException(500, f"Write error: {e}")
         
+async def broadcast_task_result(result: Dict[str, Any]):
+    """Send tasks_updated deltas for the outcome of a task action or action plan."""
+    # Plans may partially succeed; every written project gets one message with its deltas
+    steps = (result.get("results") or []) if result.get("action") == "plan" else [result]
+    changes = task_changes(steps)
+    if not changes:
+        return
+    messages = [revisions.tasks_event(project_id, deltas) for project_id, deltas in changes.items()]
+    if len(messages) == 1:
+        await manager.broadcast(messages[0])
+    else:
+        await manager.broadcast({"type": "batch", "project_ids": list(changes),
+                                 "resources": ["tasks_updated"], "changes": messages})
+
+def _is_safe_session_id(session_id: str) -> bool:
+    return (bool(session_id) and re.match(r'^[A-Za-z0-9_.-]+$', session_id) is not None and ".." not in session_id
+            and not session_id.endswith(RESERVED_ID_SUFFIX))
+
 def _is_safe_path(relative_path: str) -> bool:
     if not relative_path: 
         return False
@@ -671,7 +791,7 @@ async def update_alarm_countdowns():
         
         # If any alarm was updated, write changes and broadcast
         if updated:
-            write_yaml_file(alarms_file, alarms_data)
+            write_yaml_file(alarms_file, alarms_data, echo=False)
             await manager.broadcast({"type": "alarms_updated"})
         
         return {"status": "success", "message": "Alarms updated", "updated_count": len(alarms)}
@@ -875,16 +995,91 @@ async def toggle_focus_status():
 
 # --- WebSocket Endpoint ---
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """Handle WebSocket connections for real-time updates."""
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, last_event_id: Optional[str] = Query(None)):
+    """Handle WebSocket connections for real-time updates (?last_event_id= replays missed events)."""
+    await manager.connect(websocket, last_event_id)
     try:
         while True:
             data = await websocket.receive_text()
-            # Handle any incoming messages if needed
+            await manager.handle_client_message(websocket, data)  # Pongs and topic subscribe/unsubscribe frames
     except WebSocketDisconnect:
         await manager.disconnect(websocket)
 
+@app.get("/events")
+async def stream_events(request: Request, last_event_id: Optional[str] = Query(None), topics: Optional[str] = Query(None)):
+    """
+    Server-Sent Events stream of broadcast messages.
+
+    Resumes after the Last-Event-ID header (sent by EventSource on reconnect) or the
+    last_event_id parameter; a {"type": "resync"} event is sent when the missed events
+    are no longer buffered. topics is a comma-separated list as used by /ws subscriptions.
+    """
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    wanted = {topic for topic in topics.split(",") if topic} if topics else None
+
+    def selected(message: Dict[str, Any]) -> bool:
+        if wanted is None or "*" in wanted:
+            return True
+        message_topic_set = message_topics(message)
+        return message_topic_set is None or bool(message_topic_set & wanted)
+
+    def resync(reason: str) -> str:
+        # The id moves the client's Last-Event-ID to the present, so it is not asked to resync again
+        return sse_format({"type": "resync", "reason": reason}, event_log.last_event_id)
+
+    async def stream():
+        sequence = event_log.sequence
+        if resume_from:
+            missed = event_log.since(resume_from)
+            if missed is None:
+                yield resync("replay_unavailable")
+            else:
+                for message in missed:
+                    if selected(message):
+                        yield sse_format(message)
+        while not await request.is_disconnected():
+            if not await event_log.wait(sequence, SSE_KEEPALIVE_SECONDS):
+                yield ": keepalive\n\n"
+                continue
+            events = event_log.events_after(sequence)
+            sequence = event_log.sequence
+            if events is None:  # This stream fell behind by more than the buffer
+                yield resync("overrun")
+                continue
+            for message in events:
+                if selected(message):
+                    yield sse_format(message)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/admin/logging")
+async def get_logging_config():
+    """Get log levels, the log pipeline's queue counters and hot-path rate limiting."""
+    return {"levels": get_levels(), "pipeline": log_pipeline.get_stats(), "rate_limited": hot_log.get_stats()}
+
+@app.put("/admin/logging")
+async def update_logging_config(update: LogLevelUpdate):
+    """Change a logger's level (or the root level) at runtime."""
+    try:
+        levels = set_level(update.level, update.logger)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.warning(f"Log level of {update.logger or 'root'} set to {update.level.upper()}")
+    return {"levels": levels}
+
+@app.get("/watcher/stats")
+async def get_watcher_stats():
+    """Get file watcher filtering, debouncing and change coalescing counters."""
+    hub_handler = getattr(app.state, "hub_handler", None)
+    return {
+        "watcher": hub_handler.get_stats() if hub_handler else None,
+        "backend": app.state.observer.get_stats() if getattr(app.state, "observer", None) else None,
+        "write_tokens": write_tokens.get_stats(),
+        "batcher": change_batcher.get_stats(),
+        "connections": manager.get_stats(),
+    }
+
 # --- Focus Logs File Access Endpoints ---
 @app.get("/focus_logs/{filename}")
 async def get_focus_log_file(filename: str):
@@ -904,7 +1099,7 @@ async def get_focus_log_file(filename: str):
 # --- Focus Summary Endpoint ---
 @app.get("/focus/summary")
 async def get_focus_summary(date: str):
-    """
+    r"""
     Get focus summary for a specific date.
     Always reads directly from C:\Users\admin\Desktop\FocusTimer\focus_logs.
     If no pre-generated summary is found, calculates it on-the-fly from the JSONL log file.
@@ -1037,7 +1232,8 @@ async def update_project(project_id: str, project: Project):
     
     try:
         project_data = project.dict()
-        write_yaml_file(project_file, project_data)
+        write_yaml_file(project_file, project_data, echo=False)
+        await manager.broadcast(revisions.project_event(project_id, {"id": project_id, **project_data}))
         return {"id": project_id, **project_data}
     except Exception as e:
         logger.error(f"Error updating project: {e}", exc_info=True)
@@ -1062,118 +1258,241 @@ async def delete_project(project_id: str):
         raise HTTPException(status_code=500, detail=f"Error deleting project: {e}")
 
 # --- LLM Task Controller Routes ---
+# Task-command instructions contain no request or workspace data so they form a stable prompt prefix
+TASK_COMMAND_INSTRUCTIONS = """You are an AI assistant that helps manage tasks in a local dashboard.
+You can perform actions on tasks by responding with specific JSON formatted commands.
+The current projects and tasks are listed at the end of these instructions.
+
+When I ask you to perform an action on tasks, you should:
+1. Provide a brief natural language explanation of what you understand and what you're going to do
+2. Include a valid JSON object that I can parse to execute the action
+3. Add any additional advice or context after the JSON
+
+It's perfectly fine to have normal text before and after the JSON, but make sure the JSON itself is properly formatted.
+Ideally, place the JSON in a code block like this:
+
+```json
+{
+    "action": "create_task",
+    "project_id": "Project-A",
+    "task": {
+        "title": "Task title",
+        "description": "Task description",
+        "status": "todo",
+        "priority": "medium",
+        "due": "YYYY-MM-DD",
+        "assigned_to": "Person Name"
+    }
+}
+```
+
+For updating a task:
+```json
+{
+    "action": "update_task",
+    "project_id": "Project-A",
+    "task_id": "task-1",
+    "updates": {
+        "status": "in-progress"
+        // Add any other fields you want to update
+    }
+}
+```
+
+For deleting a task:
+```json
+{
+    "action": "delete_task",
+    "project_id": "Project-A",
+    "task_id": "task-1"
+}
+```
+
+For getting tasks in a project:
+```json
+{
+    "action": "get_tasks",
+    "project_id": "Project-A"
+}
+```
+
+For getting all projects:
+```json
+{
+    "action": "get_projects"
+}
+```
+
+When a request needs several changes, send them together as one plan
+instead of one action at a time:
+```json
+{
+    "actions": [
+        {"action": "update_task", "project_id": "Project-A", "task_id": "task-1", "updates": {"status": "done"}},
+        {"action": "create_task", "project_id": "Project-A", "task": {"title": "Follow-up", "description": "..."}}
+    ]
+}
+```
+
+Task status options: "todo", "in-progress", "done"
+Priority options: "low", "medium", "high"
+
+Make sure your JSON is properly formatted and contains all required fields for the action."""
+
+STRUCTURED_TASK_INSTRUCTIONS = """You manage tasks in a local dashboard. Reply with exactly one JSON object and nothing else.
+Use {"action": ...} for a single action (create_task, update_task, delete_task, get_tasks, get_projects)
+or {"actions": [...]} when the request needs several changes. Only use project and task ids listed below."""
+
+def build_task_context() -> str:
+    """Describe the current projects and tasks for the task-command system prompt."""
+    context = "CURRENT PROJECTS AND TASKS:\n\n"
+    # Sorted so an unchanged workspace always renders to the same text
+    for project in sorted(llm_task_controller.get_all_projects(), key=lambda p: p.get('id', '')):
+        project_id = project.get('id')
+        context += f"Project: {project.get('title')} ({project_id})\n"
+        context += f"Description: {project.get('description', 'No description')}\n"
+        context += f"Status: {project.get('status', 'Unknown')}\n"
+        
+        tasks = llm_task_controller.get_project_tasks(project_id)
+        context += "Tasks:\n"
+        for task in tasks:
+            context += f"- [{task.get('status', 'unknown')}] {task.get('id')}: {task.get('title')} " \
+                      f"(Priority: {task.get('priority', 'unknown')}, " \
+                      f"Due: {task.get('due', 'not set')}, " \
+                      f"Assigned to: {task.get('assigned_to', 'unassigned')})\n"
+        context += "\n"
+    return context
+
+def execute_task_action_data(action_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a validated action or {"actions": [...]} plan."""
+    if "actions" in action_data:
+        return llm_task_controller.execute_plan(action_data["actions"])
+    return llm_task_controller.process_action(action_data)
+
+async def _no_report(stage: str, **details):
+    """Progress callback used when a request is served inline rather than as a job."""
+
 @app.post("/llm/tasks/process")
 async def process_llm_task_command(request: LLMTaskRequest):
     """Process a natural language command for task management with LLM."""
+    if request.background:
+        job = await llm_jobs.submit("task_command",
+                                    lambda report: run_task_command(request, report, PRIORITY_BACKGROUND),
+                                    {"command": request.command, "model_id": request.model_id})
+        return JSONResponse(status_code=202, content=job)
+    return await run_task_command(request)
+
+async def run_task_command(request: LLMTaskRequest, report=_no_report,
+                           priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+    """Generate, extract and execute a task command, reporting progress stages to report()."""
     try:
-        # Prepare system prompt with project and task context
-        projects = llm_task_controller.get_all_projects()
-        
-        # Build context section with current projects and tasks
-        context = "CURRENT PROJECTS AND TASKS:\n\n"
-        for project in projects:
-            project_id = project.get('id')
-            context += f"Project: {project.get('title')} ({project_id})\n"
-            context += f"Description: {project.get('description', 'No description')}\n"
-            context += f"Status: {project.get('status', 'Unknown')}\n"
-            
-            tasks = llm_task_controller.get_project_tasks(project_id)
-            context += "Tasks:\n"
-            for task in tasks:
-                context += f"- [{task.get('status', 'unknown')}] {task.get('id')}: {task.get('title')} " \
-                          f"(Priority: {task.get('priority', 'unknown')}, " \
-                          f"Due: {task.get('due', 'not set')}, " \
-                          f"Assigned to: {task.get('assigned_to', 'unassigned')})\n"
-            context += "\n"
+        # Simple commands ("mark task-3 in Project-A as done") are parsed deterministically
+        if request.fast_path and not request.system_prompt:
+            action = task_command_parser.parse(request.command)
+            if action:
+                logger.info(f"Executing task command via fast path: {request.command}")
+                await report("executing", fast_path=True)
+                result = llm_task_controller.process_action(action)
+                await broadcast_task_result(result)
+                result["llm_response"] = None
+                result["parsed_action"] = action
+                result["fast_path"] = True
+                result["cached"] = False
+                return result
+        
+        # Try the small model first unless the routing rules send the command to the large model
+        started = time.monotonic()
+        route, small_seconds = ROUTE_LARGE, None
+        if model_router.enabled and not request.system_prompt and request.route != ROUTE_LARGE:
+            route = ROUTE_SMALL if request.route == ROUTE_SMALL else model_router.choose(request.command)[0]
+        if route == ROUTE_SMALL:
+            await report("routing", model=model_router.small_model)
+            action_data = await model_router.classify_task_command(request.command, build_task_context(), priority)
+            small_seconds = time.monotonic() - started
+            if action_data:
+                await report("executing", route=ROUTE_SMALL)
+                result = execute_task_action_data(action_data)
+                await broadcast_task_result(result)
+                model_router.record(ROUTE_SMALL, time.monotonic() - started, small_seconds)
+                result["llm_response"] = json.dumps(action_data)
+                result["fast_path"] = False
+                result["cached"] = False
+                result["route"] = ROUTE_SMALL
+                result["model"] = model_router.small_model
+                return result
+            route = ROUTE_ESCALATED
         
         # Use custom system prompt if provided, otherwise use default
         system_prompt = request.system_prompt
-        if not system_prompt:
-            system_prompt = f"""You are an AI assistant that helps manage tasks in a local dashboard. 
-            You can perform actions on tasks by responding with specific JSON formatted commands.
-
-            {context}
-
-            When I ask you to perform an action on tasks, you should:
-            1. Provide a brief natural language explanation of what you understand and what you're going to do
-            2. Include a valid JSON object that I can parse to execute the action
-            3. Add any additional advice or context after the JSON
-
-            It's perfectly fine to have normal text before and after the JSON, but make sure the JSON itself is properly formatted.
-            Ideally, place the JSON in a code block like this:
-
-            ```json
-            {{
-                "action": "create_task",
-                "project_id": "Project-A",
-                "task": {{
-                    "title": "Task title",
-                    "description": "Task description",
-                    "status": "todo",
-                    "priority": "medium",
-                    "due": "YYYY-MM-DD",
-                    "assigned_to": "Person Name"
-                }}
-            }}
-            ```
-
-            For updating a task:
-            ```json
-            {{
-                "action": "update_task",
-                "project_id": "Project-A",
-                "task_id": "task-1",
-                "updates": {{
-                    "status": "in-progress"
-                    // Add any other fields you want to update
-                }}
-            }}
-            ```
-
-            For deleting a task:
-            ```json
-            {{
-                "action": "delete_task",
-                "project_id": "Project-A",
-                "task_id": "task-1"
-            }}
-            ```
-
-            For getting tasks in a project:
-            ```json
-            {{
-                "action": "get_tasks",
-                "project_id": "Project-A"
-            }}
-            ```
-
-            For getting all projects:
-            ```json
-            {{
-                "action": "get_projects"
-            }}
-            ```
-
-            Task status options: "todo", "in-progress", "done"
-            Priority options: "low", "medium", "high"
-
-            Make sure your JSON is properly formatted and contains all required fields for the action."""
-
-        # Generate LLM response
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": request.command}
-        ]
-        
-        logger.info(f"Sending task command to LLM: {request.command}")
-        llm_response = ollama_client.chat_completion(request.model_id, messages)
+        if not system_prompt and request.structured_output:
+            system_prompt = STRUCTURED_TASK_INSTRUCTIONS
+        elif not system_prompt:
+            system_prompt = TASK_COMMAND_INSTRUCTIONS
+
+        # Fixed instructions first, then the workspace context, then the command, so the
+        # instruction prefix stays in Ollama's KV cache across workspace changes
+        layout = PromptLayout()
+        layout.add_text("instructions", system_prompt, STABILITY_STATIC)
+        if not request.system_prompt:
+            layout.add_text("workspace", build_task_context(), STABILITY_WORKSPACE)
+        layout.add_text("command", request.command, STABILITY_REQUEST, role="user")
+        messages = layout.build()
+        
+        # Deterministic or explicitly cacheable commands may be answered from the response cache
+        options = {"format": task_action_json_schema()} if request.structured_output else {}
+        cache_key = None
+        llm_response = None
+        if LLMResponseCache.is_cacheable(request.temperature, request.cacheable):
+            cache_key = LLMResponseCache.make_key(request.model_id, messages, request.temperature,
+                                                  tasks_service.get_workspace_version(), options.get("format"))
+            llm_response = llm_response_cache.get(cache_key)
+            if llm_response:
+                logger.info(f"Serving task command from LLM response cache: {request.command}")
+        
+        cached = llm_response is not None
+        if not cached:
+            logger.info(f"Sending task command to LLM: {request.command}")
+            prompt_prefix_tracker.observe(request.model_id, layout)
+            await report("generating")
+            llm_response = await llm_scheduler.chat_completion_async(request.model_id, messages, request.temperature,
+                                                                     priority=priority, **options)
         
         if not llm_response or "content" not in llm_response:
             logger.error("Failed to get response from LLM")
             return {"success": False, "error": "Failed to get response from LLM"}
         
-        # Extract JSON from the response
         content = llm_response.get("content", "")
+        
+        # Structured output is the action object itself: parse and validate it in one pass
+        if request.structured_output:
+            try:
+                action_data = validate_task_action(json.loads(content))
+            except ValueError as e:  # Covers JSONDecodeError and pydantic ValidationError
+                logger.warning(f"Structured LLM output failed validation: {e}")
+                return {
+                    "success": False,
+                    "error": "LLM output did not match the task action schema",
+                    "details": str(e),
+                    "llm_response": content
+                }
+            # Only responses that produced a valid action are worth serving again
+            if cache_key and not cached:
+                llm_response_cache.put(cache_key, llm_response)
+            await report("executing")
+            result = execute_task_action_data(action_data)
+            await broadcast_task_result(result)
+            if not cached:
+                model_router.record(route, time.monotonic() - started, small_seconds)
+            result["llm_response"] = content
+            result["fast_path"] = False
+            result["structured"] = True
+            result["cached"] = cached
+            result["route"] = route
+            result["model"] = request.model_id
+            result["llm_metrics"] = llm_response.get("metrics")
+            return result
+        
+        # Extract JSON from the response
         logger.info(f"Received LLM response, extracting JSON")
         extracted_json = extract_json_from_llm_response(content)
         
@@ -1184,23 +1503,78 @@ async def process_llm_task_command(request: LLMTaskRequest):
                 "error": "Could not extract JSON command from LLM response",
                 "llm_response": content
             }
+        if cache_key and not cached:
+            llm_response_cache.put(cache_key, llm_response)
         
         # Process the command
+        await report("executing")
         result = llm_task_controller.process_llm_response(extracted_json)
         
         # If successful, broadcast task update if applicable
-        if result.get("success") and result.get("action") in ["create_task", "update_task", "delete_task"] \
-           and result.get("project_id"):
-            await manager.broadcast({"type": "tasks_updated", "project_id": result.get("project_id")})
+        await broadcast_task_result(result)
+        
+        if not cached:
+            model_router.record(route, time.monotonic() - started, small_seconds)
         
         # Add LLM response to the result
         result["llm_response"] = content
+        result["fast_path"] = False
+        result["cached"] = cached
+        result["route"] = route
+        result["model"] = request.model_id
+        result["llm_metrics"] = llm_response.get("metrics")
         return result
         
     except Exception as e:
         logger.error(f"Error processing LLM task command: {e}", exc_info=True)
         return {"success": False, "error": str(e)}
 
+@app.get("/llm/scheduler/stats")
+async def get_llm_scheduler_stats():
+    """Get LLM scheduler queue depth, coalescing, queue-time and prefill metrics."""
+    stats = llm_scheduler.get_metrics()
+    stats["prompt_prefix"] = prompt_prefix_tracker.get_stats()
+    return stats
+
+@app.get("/llm/jobs")
+async def list_llm_jobs(status: Optional[str] = Query(None), limit: int = Query(50, ge=1, le=200)):
+    """List background LLM jobs, newest first (results omitted)."""
+    return llm_jobs.list_jobs(status=status, limit=limit)
+
+@app.get("/llm/jobs/{job_id}")
+async def get_llm_job(job_id: str):
+    """Get the state and, once finished, the result of a background LLM job."""
+    job = llm_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+@app.post("/llm/jobs/{job_id}/cancel")
+async def cancel_llm_job(job_id: str):
+    """Cancel a queued or generating LLM job."""
+    job, message = await llm_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    if not job["cancellable"] and job["status"] != "cancelled":
+        raise HTTPException(status_code=409, detail=message)
+    return {"status": "success", "message": message, "job": job}
+
+@app.get("/llm/router/stats")
+async def get_llm_router_stats():
+    """Get routing rules, rule hits and per-route latency."""
+    return model_router.get_stats()
+
+@app.get("/llm/cache/stats")
+async def get_llm_cache_stats():
+    """Get LLM response cache hit/miss counters."""
+    return llm_response_cache.get_stats()
+
+@app.delete("/llm/cache")
+async def clear_llm_cache():
+    """Drop every cached LLM response."""
+    llm_response_cache.clear()
+    return {"status": "success", "message": "LLM response cache cleared"}
+
 @app.post("/llm/tasks/direct-json")
 async def process_direct_json(json_data: Dict[str, Any]):
     """Process JSON actions directly without LLM interpretation."""
@@ -1209,9 +1583,7 @@ async def process_direct_json(json_data: Dict[str, Any]):
         result = llm_task_controller.process_llm_response(json_str)
         
         # If successful, broadcast task update if applicable
-        if result.get("success") and result.get("action") in ["create_task", "update_task", "delete_task"] \
-           and result.get("project_id"):
-            await manager.broadcast({"type": "tasks_updated", "project_id": result.get("project_id")})
+        await broadcast_task_result(result)
             
         return result
     except Exception as e:
@@ -1256,13 +1628,15 @@ async def get_tasks_for_project(project_id: str):
     if not _is_safe_path(project_id):
         raise HTTPException(status_code=400, detail="Invalid project ID")
     
+    # Taken before reading so later deltas are never older than the returned list
+    revision = revisions.get_state(tasks_stream(project_id))
     tasks_file = HUB_DATA_PATH / project_id / "tasks.yaml"
     if not tasks_file.exists():
-        return {"tasks": []}
+        return {"tasks": [], **revision}
     
     tasks_data = read_yaml_file(tasks_file)
     if not tasks_data:
-        return {"tasks": []}
+        return {"tasks": [], **revision}
         
     # Handle different formats
     if isinstance(tasks_data, list):
@@ -1276,7 +1650,7 @@ async def get_tasks_for_project(project_id: str):
     for task in tasks:
         task["project_id"] = project_id
         
-    return {"tasks": tasks}
+    return {"tasks": tasks, **revision}
 
 @app.post("/tasks/{project_id}")
 async def create_project_task(project_id: str, task: Task):
@@ -1318,14 +1692,14 @@ async def create_project_task(project_id: str, task: Task):
         tasks_data["tasks"].append(task_dict)
         
         # Write back to file
-        write_yaml_file(tasks_file, tasks_data)
-        
-        # Broadcast task update via WebSocket
-        await manager.broadcast({"type": "tasks_updated", "project_id": project_id})
+        write_yaml_file(tasks_file, tasks_data, echo=False)
         
         # Add project_id for the response
         task_dict["project_id"] = project_id
         
+        # Broadcast the new task via WebSocket
+        await manager.broadcast(revisions.tasks_event(project_id, [task_delta("create_task", task_dict)]))
+        
         return task_dict
     except Exception as e:
         logger.error(f"Error creating task: {e}", exc_info=True)
@@ -1376,17 +1750,17 @@ async def update_project_task(project_id: str, task_id: str, task: Task):
             
         # Write back to file
         if tasks_list_format:
-            write_yaml_file(tasks_file, tasks)
+            write_yaml_file(tasks_file, tasks, echo=False)
         else:
             tasks_data["tasks"] = tasks
-            write_yaml_file(tasks_file, tasks_data)
-        
-        # Broadcast task update via WebSocket
-        await manager.broadcast({"type": "tasks_updated", "project_id": project_id})
+            write_yaml_file(tasks_file, tasks_data, echo=False)
         
         # Add project_id for the response
         task_dict["project_id"] = project_id
         
+        # Broadcast the updated task via WebSocket
+        await manager.broadcast(revisions.tasks_event(project_id, [task_delta("update_task", task_dict)]))
+        
         return task_dict
     except HTTPException:
         raise
@@ -1433,13 +1807,13 @@ async def delete_project_task(project_id: str, task_id: str):
             
         # Write back to file
         if tasks_list_format:
-            write_yaml_file(tasks_file, tasks)
+            write_yaml_file(tasks_file, tasks, echo=False)
         else:
             tasks_data["tasks"] = tasks
-            write_yaml_file(tasks_file, tasks_data)
+            write_yaml_file(tasks_file, tasks_data, echo=False)
         
-        # Broadcast task update via WebSocket
-        await manager.broadcast({"type": "tasks_updated", "project_id": project_id})
+        # Broadcast the deletion via WebSocket
+        await manager.broadcast(revisions.tasks_event(project_id, [task_delta("delete_task", task_id=task_id)]))
         
         return {"status": "success", "message": f"Task deleted: {task_id}"}
     except HTTPException:
@@ -1481,13 +1855,22 @@ async def startup_event():
 
     # Start file watcher
     if main_event_loop:
-        event_handler = HubChangeHandler(manager, main_event_loop)
-        observer = Observer()
+        event_handler = HubChangeHandler(change_batcher, main_event_loop)
+        observer = HubWatcher(
+            event_handler,
+            str(HUB_DATA_PATH),
+            backend=os.environ.get("WATCHER_BACKEND", "auto"),  # "native", "polling" or "auto" (polling if native events are missed)
+            path_filter=event_handler.path_filter,
+            min_interval=float(os.environ.get("WATCHER_POLL_MIN_INTERVAL", "1.0")),
+            max_interval=float(os.environ.get("WATCHER_POLL_MAX_INTERVAL", "10.0")),
+            verify_interval=float(os.environ.get("WATCHER_VERIFY_INTERVAL", "15.0")),
+            grace_period=float(os.environ.get("WATCHER_GRACE_PERIOD", "3.0")),
+        )
         try:
-            observer.schedule(event_handler, str(HUB_DATA_PATH), recursive=True)
             observer.start()
             app.state.observer = observer
-            logger.info(f"File system watcher started successfully.")
+            app.state.hub_handler = event_handler
+            logger.info(f"File system watcher started successfully (backend: {observer.backend}).")
         except Exception as e:
             logger.error(f"Failed to start file observer: {e}. Realtime updates disabled.", exc_info=True)
             app.state.observer = None
@@ -1495,6 +1878,17 @@ async def startup_event():
         logger.error("Could not get main event loop. File watcher disabled.")
         app.state.observer = None
 
+    await manager.start()  # WebSocket heartbeats
+    await llm_jobs.start()
+    await model_catalog.start()  # Loads the model list and warms up configured models in the background
+
+    # Convert legacy single-file chat sessions to the append-only layout
+    try:
+        chat_store.migrate_legacy_sessions()
+        chat_store.rebuild_index()
+    except Exception as e:
+        logger.error(f"Failed to prepare chat sessions: {e}", exc_info=True)
+
     # Initialize workspace state file if it doesn't exist
     workspace_file = HUB_DATA_PATH / "workspace_state.json"
     if not workspace_file.exists():
@@ -1518,6 +1912,14 @@ async def shutdown_event():
              logger.info("File system watcher stopped.")
         except Exception as e:
              logger.warning(f"Error joining observer thread: {e}")
+    if getattr(app.state, "hub_handler", None):
+        app.state.hub_handler.debouncer.flush()
+    await change_batcher.close()
+    await manager.stop()
+    await llm_jobs.stop()
+    await model_catalog.stop()
+    await chat_summarizer.wait_idle()
+    llm_scheduler.shutdown()
 
 # --- Meta API Endpoints ---
 @app.get("/meta/pinned_docs")
@@ -1593,7 +1995,7 @@ async def pin_document(doc_path: str):
         # Add if not already pinned
         if doc_path not in meta_data["pinned_docs"]:
             meta_data["pinned_docs"].append(doc_path)
-            write_yaml_file(meta_file, meta_data)
+            write_yaml_file(meta_file, meta_data, echo=False)
             await manager.broadcast({"type": "meta_updated", "action": "pin_added", "path": doc_path})
         
         return {"status": "success", "message": f"Document pinned: {doc_path}"}
@@ -1622,7 +2024,7 @@ async def unpin_document(doc_path: str):
         # Remove if exists
         if doc_path in meta_data["pinned_docs"]:
             meta_data["pinned_docs"].remove(doc_path)
-            write_yaml_file(meta_file, meta_data)
+            write_yaml_file(meta_file, meta_data, echo=False)
             await manager.broadcast({"type": "meta_updated", "action": "pin_removed", "path": doc_path})
         
         return {"status": "success", "message": f"Document unpinned: {doc_path}"}
@@ -1649,7 +2051,7 @@ async def reorder_pinned_docs(pinned_docs: List[str]):
         
         # Update pinned_docs order
         meta_data["pinned_docs"] = pinned_docs
-        write_yaml_file(meta_file, meta_data)
+        write_yaml_file(meta_file, meta_data, echo=False)
         await manager.broadcast({"type": "meta_updated", "action": "pins_reordered"})
         
         return {"status": "success", "message": "Pinned documents reordered", "pinned_docs": pinned_docs}
@@ -1657,16 +2059,106 @@ async def reorder_pinned_docs(pinned_docs: List[str]):
         logger.error(f"Error reordering pinned documents: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error reordering pinned documents: {e}")
 
+# --- Chat Sessions API ---
+@app.get("/chat/models")
+async def get_chat_models(refresh: bool = Query(False)):
+    """List available chat models from the in-memory model catalog."""
+    if refresh or not model_catalog.loaded:
+        await asyncio.to_thread(model_catalog.refresh)
+    return model_catalog.get_models()
+
+@app.get("/llm/health")
+async def get_llm_health():
+    """Report Ollama reachability as seen by the client's circuit breaker."""
+    breaker = ollama_client.breaker.get_status()
+    return {
+        "status": "ok" if breaker["state"] == "closed" else "unavailable",
+        "base_url": ollama_client.base_url,
+        "connect_timeout": ollama_client.connect_timeout,
+        "chat_timeout": ollama_client.chat_timeout,
+        "max_retries": ollama_client.max_retries,
+        "circuit_breaker": breaker,
+    }
+
+@app.get("/llm/models/status")
+async def get_model_catalog_status():
+    """Get model catalog freshness and warm-up results."""
+    return model_catalog.get_status()
+
+@app.get("/chat/sessions")
+async def list_chat_sessions(response: Response, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500)):
+    """List chat sessions from the in-memory index, most recently updated first."""
+    sessions, total = chat_store.list_sessions(offset, limit)
+    response.headers["X-Total-Count"] = str(total)
+    return sessions
+
+@app.get("/chat/sessions/search")
+async def search_chat_sessions(q: str, offset: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100)):
+    """Full-text search across chat session titles and messages."""
+    results, total = chat_store.search_sessions(q, offset, limit)
+    return {"query": q, "total": total, "offset": offset, "limit": limit, "results": results}
+
+@app.post("/chat/sessions")
+async def create_chat_session(session: ChatSessionCreate):
+    """Create a new (empty) chat session."""
+    session_id = session.id or f"chat-{int(time.time() * 1000)}"
+    if not _is_safe_session_id(session_id):
+        raise HTTPException(status_code=400, detail="Invalid session ID")
+    try:
+        extra = session.dict(exclude_none=True, exclude={"id", "title"})
+        return chat_store.create_session(session_id, session.title, extra=extra)
+    except Exception as e:
+        logger.error(f"Error creating chat session: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error creating chat session: {e}")
+
+@app.get("/chat/sessions/{session_id}")
+async def get_chat_session(session_id: str):
+    """Get a chat session with all of its messages."""
+    if not _is_safe_session_id(session_id):
+        raise HTTPException(status_code=400, detail="Invalid session ID")
+    session = chat_store.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Chat session not found: {session_id}")
+    return session
+
+@app.put("/chat/sessions/{session_id}")
+async def update_chat_session(session_id: str, update: ChatSessionUpdate):
+    """Rename a chat session."""
+    if not _is_safe_session_id(session_id):
+        raise HTTPException(status_code=400, detail="Invalid session ID")
+    header = chat_store.update_header(session_id, {"title": update.title})
+    if header is None:
+        raise HTTPException(status_code=404, detail=f"Chat session not found: {session_id}")
+    return header
+
+@app.delete("/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """Delete a chat session."""
+    if not _is_safe_session_id(session_id):
+        raise HTTPException(status_code=400, detail="Invalid session ID")
+    if not chat_store.delete_session(session_id):
+        raise HTTPException(status_code=404, detail=f"Chat session not found: {session_id}")
+    return {"status": "success", "message": f"Chat session deleted: {session_id}"}
+
 # --- Chat with LLM Task Control Integration ---
 @app.post("/chat/completion")
 async def chat_completion(request: ChatRequest):
     """Get a chat completion from an LLM with additional task control."""
+    if not _is_safe_session_id(request.session_id):
+        raise HTTPException(status_code=400, detail="Invalid session ID")
+    if request.background:
+        job = await llm_jobs.submit("chat",
+                                    lambda report: run_chat_completion(request, report, PRIORITY_BACKGROUND),
+                                    {"session_id": request.session_id, "model_id": request.model_id})
+        return JSONResponse(status_code=202, content=job)
+    return await run_chat_completion(request)
+
+async def run_chat_completion(request: ChatRequest, report=_no_report,
+                              priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+    """Generate a chat reply, run any task action in it and append the turn to the session."""
     try:
         logger.info(f"Chat request received for model: {request.model_id}")
         
-        # Create messages array from the request
-        messages = []
-        
         # Build context data based on what the user requested
         context_data = request.context_data if request.context_data else {}
         
@@ -1801,28 +2293,32 @@ async def chat_completion(request: ChatRequest):
             except Exception as e:
                 logger.error(f"Error gathering documents information: {e}")
         
-        # Add system context if we have any
+        # Workspace context first, then history, then the new message (most to least stable)
+        layout = PromptLayout()
         if system_context:
-            messages.append({"role": "system", "content": system_context})
+            layout.add_text("workspace", system_context, STABILITY_WORKSPACE)
             logger.info("Added system context with workspace data")
         
         # Check if there's a session with history
-        session_path = HUB_DATA_PATH / "chat_sessions" / f"{request.session_id}.json"
-        if session_path.exists():
-            try:
-                session_data = read_json_file(session_path)
-                if session_data and "messages" in session_data:
-                    # Only keep the last few messages to avoid context overflow
-                    saved_messages = session_data["messages"][-10:]
-                    messages.extend([{"role": msg["role"], "content": msg["content"]} for msg in saved_messages])
-            except Exception as e:
-                logger.error(f"Error reading chat session: {e}")
+        try:
+            # Older turns are folded into a running summary, so only the summary and the
+            # messages it does not cover yet are sent
+            summary, saved_messages = chat_summarizer.build_history(
+                request.session_id, CHAT_HISTORY_MESSAGES, CHAT_HISTORY_STEP)
+            if summary:
+                layout.add_text("summary", f"Summary of the earlier conversation:\n{summary}", STABILITY_SESSION)
+            layout.add_messages("history", saved_messages, STABILITY_SESSION)
+        except Exception as e:
+            logger.error(f"Error reading chat session: {e}")
         
         # Add the new user message
-        messages.append({"role": "user", "content": request.message})
+        layout.add_text("message", request.message, STABILITY_REQUEST, role="user")
+        messages = layout.build()
+        prompt_prefix_tracker.observe(request.model_id, layout)
         
         # Get LLM response
-        response = ollama_client.chat_completion(request.model_id, messages)
+        await report("generating")
+        response = await llm_scheduler.chat_completion_async(request.model_id, messages, priority=priority)
         
         if response:
             # Extract content and check if it contains a task control command
@@ -1832,12 +2328,11 @@ async def chat_completion(request: ChatRequest):
             # If it seems to be a task control command, process it
             if extracted_json:
                 logger.info(f"Detected task control JSON in chat response, processing command")
+                await report("executing")
                 result = llm_task_controller.process_llm_response(extracted_json)
                 
                 # If successful, broadcast task update if applicable
-                if result.get("success") and result.get("action") in ["create_task", "update_task", "delete_task"] \
-                and result.get("project_id"):
-                    await manager.broadcast({"type": "tasks_updated", "project_id": result.get("project_id")})
+                await broadcast_task_result(result)
                     
                 # Add a note to the response that a task action was performed
                 if result.get("success"):
@@ -1851,6 +2346,8 @@ async def chat_completion(request: ChatRequest):
                         action_note = "✅ Task deleted successfully."
                     elif action_type == "get_tasks" or action_type == "get_projects":
                         action_note = "✅ Information retrieved successfully."
+                    elif action_type == "plan":
+                        action_note = f"✅ Action plan executed ({len(result.get('results', []))} steps)."
                         
                     if action_note:
                         content = f"{content}\n\n{action_note}"
@@ -1876,45 +2373,23 @@ async def chat_completion(request: ChatRequest):
                     "model": request.model_id
                 }
                 
-                # Read or create session
-                session_data = {
-                    "id": request.session_id,
-                    "title": request.session_id,
-                    "lastMessage": datetime.now().isoformat(),
-                    "lastUpdated": datetime.now().isoformat(),
-                    "messages": []
-                }
-                
-                if session_path.exists():
-                    try:
-                        existing_session = read_json_file(session_path)
-                        if existing_session:
-                            session_data = existing_session
-                    except Exception as e:
-                        logger.warning(f"Error reading existing session, creating new: {e}")
-                
-                # Append the new messages
-                session_data["messages"].append(user_message)
-                session_data["messages"].append(assistant_message)
-                session_data["lastMessage"] = request.message[:50] + ("..." if len(request.message) > 50 else "")
-                session_data["lastUpdated"] = datetime.now().isoformat()
-                
-                # Ensure the sessions directory exists
-                (HUB_DATA_PATH / "chat_sessions").mkdir(exist_ok=True)
-                
-                # Write back to file
-                with open(session_path, "w", encoding="utf-8") as f:
-                    json.dump(session_data, f, ensure_ascii=False, indent=2)
+                # Append both messages to the session log
+                chat_store.append_messages(
+                    request.session_id,
+                    [user_message, assistant_message],
+                    last_message=request.message[:50] + ("..." if len(request.message) > 50 else "")
+                )
+                chat_summarizer.schedule(request.session_id, request.model_id)
                     
             except Exception as e:
                 logger.error(f"Error saving chat session: {e}")
                 
             return response
         else:
-            return {"error": "No response from model"}
+            return {"success": False, "error": "No response from model"}
     except Exception as e:
         logger.error(f"Error in chat completion: {e}", exc_info=True)
-        return {"error": str(e)}
+        return {"success": False, "error": str(e)}
 
 # --- Main Execution Guard ---
 if __name__ == "__main__":
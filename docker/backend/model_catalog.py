@@ -0,0 +1,189 @@
+"""
+Model Catalog Module
+
+This module caches the list of Ollama models so that /chat/models is served from memory
+instead of calling /api/tags on every request. The catalog is refreshed in the background
+once it is older than its TTL (the stale list keeps being served meanwhile), and the last
+successful list is kept when Ollama is unreachable.
+
+It also warms up configured models: at startup, and optionally periodically, every
+configured model that is not loaded according to /api/ps is loaded with an empty request
+and keep_alive, so the first chat message does not pay the model load time.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCatalog:
+    """TTL cache of Ollama's model list plus model warm-up."""
+
+    def __init__(self, client, ttl_seconds: float = 300, warmup_models: Optional[List[str]] = None,
+                 warmup_interval: float = 0):
+        """
+        Initialize the catalog
+
+        Args:
+            client: The OllamaClient
+            ttl_seconds: Age after which the model list is refreshed in the background
+            warmup_models: Models to preload at startup
+            warmup_interval: Seconds between checks that reload warm-up models Ollama has
+                unloaded after going idle (0 disables periodic warm-up)
+        """
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.warmup_models = [m for m in (warmup_models or []) if m]
+        self.warmup_interval = warmup_interval
+        self._lock = threading.Lock()
+        self._models: Optional[List[Dict[str, Any]]] = None
+        self._fetched_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._refreshing = False
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.failed_refreshes = 0
+        self.warmups: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._models is not None
+
+    def is_stale(self) -> bool:
+        return self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl_seconds
+
+    def get_models(self) -> List[Dict[str, Any]]:
+        """
+        Get the cached model list without blocking
+
+        A stale list triggers a background refresh. Before the first successful refresh
+        the client's fallback models are returned.
+
+        Returns:
+            List of model dictionaries
+        """
+        if self.is_stale():
+            self._refresh_in_background()
+        with self._lock:
+            models = self._models if self._models is not None else self.client.FALLBACK_MODELS
+            return [dict(model) for model in models]
+
+    def refresh(self) -> bool:
+        """
+        Fetch the model list from Ollama (blocking)
+
+        Returns:
+            True if the list was refreshed; on failure the previous list is kept
+        """
+        try:
+            models = self.client.fetch_models()
+        except Exception as e:
+            with self._lock:
+                self.failed_refreshes += 1
+                self._last_error = str(e)
+            logger.warning(f"Model catalog refresh failed, keeping {'previous' if self.loaded else 'fallback'} list: {e}")
+            return False
+        with self._lock:
+            self._models = models
+            self._fetched_at = time.monotonic()
+            self._last_error = None
+            self.refreshes += 1
+        return True
+
+    def warm_up(self, only_unloaded: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Load the configured warm-up models (blocking)
+
+        Args:
+            only_unloaded: Skip models Ollama already has in memory
+
+        Returns:
+            Per-model warm-up result
+        """
+        if not self.warmup_models:
+            return {}
+        loaded = set()
+        if only_unloaded:
+            try:
+                loaded = set(self.client.fetch_loaded_models())
+            except Exception as e:
+                logger.warning(f"Could not list loaded Ollama models: {e}")
+
+        results = {}
+        for model_id in self.warmup_models:
+            if model_id in loaded or f"{model_id}:latest" in loaded:
+                continue
+            started = time.monotonic()
+            try:
+                info = self.client.load_model(model_id)
+                results[model_id] = {"status": "loaded", "load_ms": info.get("load_ms"),
+                                     "elapsed_ms": round((time.monotonic() - started) * 1000, 2)}
+                logger.info(f"Warmed up model {model_id} in {results[model_id]['elapsed_ms']} ms")
+            except Exception as e:
+                results[model_id] = {"status": "failed", "error": str(e)}
+                logger.warning(f"Warm-up of model {model_id} failed: {e}")
+            results[model_id]["at"] = time.time()
+        self.warmups.update(results)
+        return results
+
+    async def start(self):
+        """Refresh the catalog, warm up models and keep both current in a background task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._maintenance_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": len(self._models) if self._models is not None else 0,
+                "loaded": self.loaded,
+                "age_seconds": round(time.monotonic() - self._fetched_at, 1) if self._fetched_at else None,
+                "ttl_seconds": self.ttl_seconds,
+                "refreshes": self.refreshes,
+                "failed_refreshes": self.failed_refreshes,
+                "last_error": self._last_error,
+                "warmup_models": self.warmup_models,
+                "warmup_interval": self.warmup_interval,
+                "warmups": dict(self.warmups),
+            }
+
+    # --- Internals ---
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="model-catalog-refresh", daemon=True).start()
+
+    async def _maintenance_loop(self):
+        await asyncio.to_thread(self.refresh)
+        await asyncio.to_thread(self.warm_up)
+        period = min(self.ttl_seconds, self.warmup_interval) if self.warmup_interval else self.ttl_seconds
+        last_warmup = time.monotonic()
+        while True:
+            await asyncio.sleep(max(1.0, period))
+            try:
+                if self.is_stale():
+                    await asyncio.to_thread(self.refresh)
+                if self.warmup_interval and time.monotonic() - last_warmup >= self.warmup_interval:
+                    last_warmup = time.monotonic()
+                    await asyncio.to_thread(self.warm_up)
+            except Exception as e:
+                logger.error(f"Model catalog maintenance error: {e}", exc_info=True)
@@ -0,0 +1,200 @@
+"""
+Model Router Module
+
+This module routes LLM requests between a small, fast model and the large (user-selected)
+model. Configurable rules look at the request text first; open-ended requests go straight
+to the large model. Everything else is tried on the small model, which either returns the
+task action JSON itself (schema-constrained) or escalates, in which case the request falls
+through to the large model. Per-route latency is recorded so the split can be tuned.
+
+Routes:
+    small     - answered by the small model
+    escalated - the small model escalated (or failed) and the large model answered
+    large     - sent to the large model directly
+"""
+
+import re
+import json
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
+
+from llm_scheduler import PRIORITY_INTERACTIVE, latency_summary
+from prompt_layout import PromptLayout, STABILITY_STATIC, STABILITY_WORKSPACE, STABILITY_REQUEST
+from task_models import task_action_json_schema, validate_task_action
+
+logger = logging.getLogger(__name__)
+
+ROUTE_SMALL = "small"
+ROUTE_LARGE = "large"
+ROUTE_ESCALATED = "escalated"
+ROUTES = (ROUTE_SMALL, ROUTE_ESCALATED, ROUTE_LARGE)
+
+# Used when no LLM_ROUTER_RULES are configured
+DEFAULT_RULES = [
+    {"name": "open_ended", "route": ROUTE_LARGE,
+     "pattern": r"\b(why|explain|summari[sz]e|summary|brainstorm|draft|write|compare|analy[sz]e|suggest|"
+                r"advice|ideas?|how (do|should|can|would))\b"},
+    {"name": "long_request", "route": ROUTE_LARGE, "min_chars": 400},
+]
+
+ESCALATE_SCHEMA = {
+    "type": "object",
+    "properties": {"escalate": {"type": "boolean", "enum": [True]}, "reason": {"type": "string"}},
+    "required": ["escalate"],
+}
+
+SMALL_MODEL_INSTRUCTIONS = """You turn task-management commands into JSON actions for a local dashboard.
+Reply with exactly one JSON object and nothing else:
+- a single action: {"action": "create_task" | "update_task" | "delete_task" | "get_tasks" | "get_projects", ...}
+- several changes: {"actions": [...]}
+- {"escalate": true, "reason": "..."} if the request is not a clear task command, needs reasoning or
+  writing, or you are not sure which project or task is meant.
+Only use project and task ids listed below."""
+
+SAMPLES_PER_ROUTE = 500
+
+
+def parse_rules(value: Optional[str]) -> List[Dict[str, Any]]:
+    """Parse LLM_ROUTER_RULES (a JSON list of rules); falls back to DEFAULT_RULES."""
+    if not value:
+        return [dict(rule) for rule in DEFAULT_RULES]
+    try:
+        rules = json.loads(value)
+        if not isinstance(rules, list):
+            raise ValueError("rules must be a JSON list")
+        return rules
+    except ValueError as e:
+        logger.error(f"Invalid LLM_ROUTER_RULES ({e}); using default routing rules")
+        return [dict(rule) for rule in DEFAULT_RULES]
+
+
+class ModelRouter:
+    """Rule- and small-model-based routing between a small and a large model."""
+
+    def __init__(self, scheduler, small_model: Optional[str] = None,
+                 rules: Optional[List[Dict[str, Any]]] = None):
+        """
+        Initialize the router
+
+        Args:
+            scheduler: LLMScheduler used for small-model calls
+            small_model: Fast model used for classification; None disables routing
+            rules: Ordered routing rules; each has a "route" and any of "pattern" (regex,
+                case-insensitive), "min_chars" and "max_chars". The first matching rule wins.
+        """
+        self.scheduler = scheduler
+        self.small_model = small_model
+        self.rules = []
+        for rule in (rules if rules is not None else DEFAULT_RULES):
+            if not isinstance(rule, dict):
+                logger.warning(f"Ignoring routing rule that is not an object: {rule!r}")
+                continue
+            if rule.get("route") not in (ROUTE_SMALL, ROUTE_LARGE):
+                logger.warning(f"Ignoring routing rule with invalid route: {rule}")
+                continue
+            if any(not isinstance(rule.get(key, 0), int) for key in ("min_chars", "max_chars")):
+                logger.warning(f"Ignoring routing rule with non-integer length limit: {rule}")
+                continue
+            compiled = dict(rule)
+            if rule.get("pattern"):
+                try:
+                    compiled["regex"] = re.compile(rule["pattern"], re.IGNORECASE)
+                except (re.error, TypeError) as e:
+                    logger.warning(f"Ignoring routing rule with invalid pattern ({e}): {rule}")
+                    continue
+            self.rules.append(compiled)
+        self._lock = threading.Lock()
+        self._latencies = {route: deque(maxlen=SAMPLES_PER_ROUTE) for route in ROUTES}
+        self._small_latencies = deque(maxlen=SAMPLES_PER_ROUTE)
+        self._rule_hits: Dict[str, int] = {}
+        self.schema = {"anyOf": task_action_json_schema()["anyOf"] + [ESCALATE_SCHEMA]}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.small_model)
+
+    def choose(self, text: str, default: str = ROUTE_SMALL) -> Tuple[str, str]:
+        """
+        Pick a route for a request from the rules
+
+        Args:
+            text: Request text
+            default: Route used when no rule matches
+
+        Returns:
+            Tuple of (route, name of the matching rule or "default")
+        """
+        if not self.enabled:
+            return ROUTE_LARGE, "disabled"
+        for index, rule in enumerate(self.rules):
+            if "min_chars" in rule and len(text) < rule["min_chars"]:
+                continue
+            if "max_chars" in rule and len(text) > rule["max_chars"]:
+                continue
+            if "regex" in rule and not rule["regex"].search(text):
+                continue
+            name = rule.get("name") or f"rule_{index}"
+            with self._lock:
+                self._rule_hits[name] = self._rule_hits.get(name, 0) + 1
+            return rule["route"], name
+        return default, "default"
+
+    async def classify_task_command(self, command: str, context: str,
+                                    priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict[str, Any]]:
+        """
+        Ask the small model to turn a command into an action
+
+        Args:
+            command: Natural language command
+            context: Workspace description (projects and tasks)
+            priority: Scheduler priority of the small-model call
+
+        Returns:
+            The validated action (or plan) dictionary, or None if the small model escalated
+            or produced nothing usable
+        """
+        layout = PromptLayout()
+        layout.add_text("instructions", SMALL_MODEL_INSTRUCTIONS, STABILITY_STATIC)
+        layout.add_text("workspace", context, STABILITY_WORKSPACE)
+        layout.add_text("command", command, STABILITY_REQUEST, role="user")
+
+        response = await self.scheduler.chat_completion_async(
+            self.small_model, layout.build(), 0, priority=priority, format=self.schema)
+        if not response or str(response.get("id", "")).startswith("error_"):
+            logger.warning(f"Small model {self.small_model} failed, escalating")
+            return None
+        try:
+            data = json.loads(response.get("content", ""))
+        except json.JSONDecodeError:
+            logger.info(f"Small model returned invalid JSON, escalating")
+            return None
+        if isinstance(data, dict) and data.get("escalate"):
+            logger.info(f"Small model escalated: {data.get('reason', 'no reason given')}")
+            return None
+        try:
+            return validate_task_action(data)
+        except ValueError as e:
+            logger.info(f"Small model action failed validation, escalating: {e}")
+            return None
+
+    def record(self, route: str, seconds: float, small_seconds: Optional[float] = None):
+        """Record the end-to-end latency of a routed request (and of its small-model step)."""
+        with self._lock:
+            self._latencies[route].append(seconds)
+            if small_seconds is not None:
+                self._small_latencies.append(small_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(len(samples) for samples in self._latencies.values())
+            return {
+                "enabled": self.enabled,
+                "small_model": self.small_model,
+                "rules": [{k: v for k, v in rule.items() if k != "regex"} for rule in self.rules],
+                "rule_hits": dict(self._rule_hits),
+                "routes": {route: latency_summary(samples) for route, samples in self._latencies.items()},
+                "small_model_step": latency_summary(self._small_latencies),
+                "small_resolution_rate": round(len(self._latencies[ROUTE_SMALL]) / total, 4) if total else 0.0,
+            }
@@ -1,44 +1,187 @@
 import requests
 import json
+import random
 import logging
 import time  # Make sure this import is present
 
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
 logger = logging.getLogger(__name__)
 
+# Base delay of the jittered exponential backoff between connection retries (seconds)
+RETRY_BACKOFF = 0.25
+
+# Timing fields reported by Ollama (nanoseconds) and the names they are exposed under (milliseconds)
+TIMING_FIELDS = {
+    "total_duration": "total_ms",
+    "load_duration": "load_ms",
+    "prompt_eval_duration": "prompt_eval_ms",
+    "eval_duration": "eval_ms",
+}
+
+
+def parse_keep_alive(value):
+    """Ollama accepts a duration string ("30m") or a number of seconds (-1 keeps the model loaded)."""
+    if value is None or value == "":
+        return None
+    text = str(value).strip()
+    return int(text) if text.lstrip("-").isdigit() else text
+
+
 class OllamaClient:
-    def __init__(self, base_url="http://host.docker.internal:11434"):
+    def __init__(self, base_url="http://host.docker.internal:11434", keep_alive=None,
+                 connect_timeout=3.0, chat_timeout=180.0, max_retries=2,
+                 failure_threshold=3, probe_interval=5.0):
+        """
+        Args:
+            base_url: Ollama server URL
+            keep_alive: How long Ollama keeps a model loaded after a request; keeping it
+                loaded also keeps its prompt (KV) cache for the next request
+            connect_timeout: Seconds allowed to establish a connection
+            chat_timeout: Default deadline of a chat completion in seconds
+            max_retries: Retries after connection errors (other errors are not retried)
+            failure_threshold: Consecutive failed calls that open the circuit breaker
+            probe_interval: Seconds between health probes while the breaker is open
+        """
         self.base_url = base_url
-        logger.info(f"Initialized Ollama client with base URL: {self.base_url}")
+        self.keep_alive = parse_keep_alive(keep_alive)
+        self.connect_timeout = connect_timeout
+        self.chat_timeout = chat_timeout
+        self.max_retries = max_retries
+        self.breaker = CircuitBreaker("ollama", failure_threshold=failure_threshold,
+                                      probe_interval=probe_interval, probe=self.ping)
+        logger.info(f"Initialized Ollama client with base URL: {self.base_url}, keep_alive: {self.keep_alive}")
+
+    def ping(self):
+        """Cheap health check (/api/version) that bypasses the breaker; raises if Ollama is unhealthy."""
+        response = requests.get(f"{self.base_url}/api/version", timeout=(self.connect_timeout, 5))
+        response.raise_for_status()
+
+    def _request(self, method, path, deadline, **kwargs):
+        """
+        Send a request with a deadline, connection retries and the circuit breaker
+
+        Connection errors (nothing reached Ollama) are retried with jittered exponential
+        backoff while the deadline allows. Read timeouts are not retried, since Ollama may
+        still be working on the request. Failures and 5xx responses count towards opening
+        the breaker; while it is open, calls fail immediately.
+
+        Args:
+            method: HTTP method
+            path: API path, e.g. "/api/chat"
+            deadline: Total seconds the call (including retries) may take
+            **kwargs: Passed to requests.request
+
+        Returns:
+            The requests Response
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            requests.RequestException: On connection errors, timeouts or a missed deadline
+        """
+        self.breaker.check()
+        deadline_at = time.monotonic() + deadline
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                error = requests.Timeout(f"Deadline of {deadline}s exceeded for {path}")
+                self.breaker.record_failure(error)
+                raise error
+            try:
+                response = requests.request(method, f"{self.base_url}{path}",
+                                            timeout=(min(self.connect_timeout, remaining), remaining), **kwargs)
+            except requests.ConnectionError as e:
+                delay = RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+                if attempt < self.max_retries and delay < deadline_at - time.monotonic():
+                    attempt += 1
+                    logger.warning(f"Connection to Ollama failed ({e}); retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                    time.sleep(delay)
+                    continue
+                self.breaker.record_failure(e)
+                raise
+            except requests.Timeout as e:
+                self.breaker.record_failure(e)
+                raise
+            if response.status_code >= 500:
+                self.breaker.record_failure(f"HTTP {response.status_code} from {path}")
+            else:
+                self.breaker.record_success()
+            return response
+
+    # Returned by get_models when Ollama cannot be reached
+    FALLBACK_MODELS = [
+        {"id": "llama3", "name": "Llama 3", "provider": "ollama", "description": "Meta's Llama 3 model"},
+        {"id": "mistral", "name": "Mistral", "provider": "ollama", "description": "Mistral AI's model"}
+    ]
+
+    def fetch_models(self):
+        """Get all available models from Ollama, raising on connection or API errors."""
+        response = self._request("GET", "/api/tags", deadline=10)
+        response.raise_for_status()
+        models = []
+        for model in response.json().get("models", []):
+            details = model.get("details") or {}
+            models.append({
+                "id": model["name"],
+                "name": model["name"],
+                "provider": "ollama",
+                "description": f"Ollama model: {model['name']}",
+                "size": model.get("size"),
+                "parameter_size": details.get("parameter_size"),
+                "family": details.get("family"),
+            })
+        logger.info(f"Retrieved {len(models)} models from Ollama server")
+        return models
 
     def get_models(self):
         """Get all available models from Ollama."""
         try:
-            response = requests.get(f"{self.base_url}/api/tags")
-            if response.status_code == 200:
-                data = response.json()
-                models = []
-                for model in data.get("models", []):
-                    models.append({
-                        "id": model["name"],
-                        "name": model["name"],
-                        "provider": "ollama",
-                        "description": f"Ollama model: {model['name']}"
-                    })
-                logger.info(f"Retrieved {len(models)} models from Ollama server")
-                return models
-            else:
-                logger.error(f"Failed to get models from Ollama: {response.status_code} - {response.text}")
-                return []
+            return self.fetch_models()
         except Exception as e:
             logger.error(f"Error connecting to Ollama API: {e}")
             # Fallback to some default models
-            return [
-                {"id": "llama3", "name": "Llama 3", "provider": "ollama", "description": "Meta's Llama 3 model"},
-                {"id": "mistral", "name": "Mistral", "provider": "ollama", "description": "Mistral AI's model"}
-            ]
+            return [dict(model) for model in self.FALLBACK_MODELS]
+
+    def fetch_loaded_models(self):
+        """Get the names of the models currently loaded in Ollama's memory (/api/ps)."""
+        response = self._request("GET", "/api/ps", deadline=10)
+        response.raise_for_status()
+        return [model.get("name") or model.get("model") for model in response.json().get("models", [])]
+
+    def load_model(self, model_id, keep_alive=None):
+        """
+        Load a model into memory without generating anything
+
+        Ollama loads the model for a generate request with an empty prompt and keeps it
+        for keep_alive. Raises on connection or API errors.
+        """
+        payload = {"model": model_id, "prompt": "", "stream": False}
+        keep_alive = parse_keep_alive(keep_alive) if keep_alive is not None else self.keep_alive
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        response = self._request("POST", "/api/generate", deadline=300, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        return {"model": model_id, "load_ms": round(data.get("load_duration", 0) / 1e6, 2)}
+
+    def chat_completion(self, model_id, messages, temperature=0.7, format=None, keep_alive=None, timeout=None):
+        """
+        Get a chat completion from Ollama.
+
+        Args:
+            model_id: Ollama model name
+            messages: Chat messages ({"role", "content"})
+            temperature: Sampling temperature
+            format: Optional structured-output constraint, either "json" or a JSON schema
+                dictionary; Ollama then only generates text matching it
+            keep_alive: Per-request override of the client's keep_alive
+            timeout: Deadline of this call in seconds (defaults to chat_timeout)
 
-    def chat_completion(self, model_id, messages, temperature=0.7):
-        """Get a chat completion from Ollama."""
+        Returns:
+            Response dictionary; successful responses include a "metrics" dictionary with
+            Ollama's prefill (prompt_eval) and generation timings
+        """
         try:
             # Convert messages to Ollama format
             formatted_messages = []
@@ -52,12 +195,18 @@ class OllamaClient:
                 "model": model_id,
                 "messages": formatted_messages,
                 "stream": False,
-                "temperature": temperature
+                "options": {"temperature": temperature}
             }
+            if format is not None:
+                payload["format"] = format
+            keep_alive = parse_keep_alive(keep_alive) if keep_alive is not None else self.keep_alive
+            if keep_alive is not None:
+                payload["keep_alive"] = keep_alive
 
             logger.info(f"Sending chat request to Ollama for model: {model_id}")
-            response = requests.post(
-                f"{self.base_url}/api/chat", 
+            response = self._request(
+                "POST", "/api/chat",
+                deadline=timeout or self.chat_timeout,
                 json=payload,
                 headers={"Content-Type": "application/json"}
             )
@@ -68,7 +217,8 @@ class OllamaClient:
                     "id": f"resp_{int(time.time())}",
                     "role": "assistant",
                     "content": data.get("message", {}).get("content", "No response from model"),
-                    "model": model_id
+                    "model": model_id,
+                    "metrics": self._extract_metrics(data)
                 }
             else:
                 logger.error(f"Ollama API error: {response.status_code} - {response.text}")
@@ -78,6 +228,14 @@ class OllamaClient:
                     "content": f"Error from Ollama API: {response.status_code}. The model may not be available or there might be a connection issue.",
                     "model": model_id
                 }
+        except CircuitOpenError as e:
+            logger.warning(f"Skipping chat completion: {e}")
+            return {
+                "id": f"error_{int(time.time())}",
+                "role": "assistant",
+                "content": "Ollama is currently unavailable. Please try again in a moment.",
+                "model": model_id
+            }
         except Exception as e:
             logger.error(f"Error in chat completion: {e}", exc_info=True)
             return {
@@ -86,3 +244,12 @@ class OllamaClient:
                 "content": f"Failed to communicate with Ollama: {str(e)}",
                 "model": model_id
             }
+
+    @staticmethod
+    def _extract_metrics(data):
+        """Convert Ollama's timing counters into milliseconds."""
+        metrics = {"prompt_eval_count": data.get("prompt_eval_count", 0), "eval_count": data.get("eval_count", 0)}
+        for field, name in TIMING_FIELDS.items():
+            if field in data:
+                metrics[name] = round(data[field] / 1e6, 2)
+        return metrics
@@ -0,0 +1,201 @@
+"""
+Path Filter Module
+
+This module decides which hub paths the file watcher ignores. Rules use gitignore syntax
+and come from built-in defaults followed by the hub's .hubignore file, so the hub can
+extend or override them:
+
+    *.log              ignore by name anywhere (backend.log, llm_task_controller.log)
+    node_modules/      ignore a directory and everything below it
+    /templates/drafts  anchored to the hub root (any pattern containing a "/")
+    **/tmp/**          "**" matches across directories
+    !keep.log          re-include (include rule); the last matching rule wins
+
+Rules are compiled once into regular expressions. A combined expression answers the
+common "no rule matches" case with a single match; only paths that match something are
+checked rule by rule (last to first) to find the deciding rule, whose hit counter is
+incremented. Each pattern also matches every path below a matching directory, so one
+check per path covers ignored parent directories.
+"""
+
+import re
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HUBIGNORE_FILE = ".hubignore"
+
+DEFAULT_RULES = [
+    ".git/",
+    ".vscode/",
+    ".idea/",
+    "__pycache__/",
+    "node_modules/",
+    ".DS_Store",
+    "*.log",  # The backend's own logs are written on every request and LLM action
+    "/.test_write",
+    "*.swp",
+    "*~",
+]
+
+_CACHE_SIZE = 4096
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate the glob part of a gitignore pattern to a regular expression."""
+    result = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            result.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            result.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            result.append("[^/]*")
+        elif char == "?":
+            result.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                result.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                result.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            result.append(re.escape(pattern[i]))
+        else:
+            result.append(re.escape(char))
+        i += 1
+    return "".join(result)
+
+
+class _Rule:
+    __slots__ = ("pattern", "source", "include", "regex", "hits")
+
+    def __init__(self, pattern: str, source: str, include: bool, regex: str):
+        self.pattern = pattern
+        self.source = source
+        self.include = include
+        self.regex = re.compile(regex)
+        self.hits = 0
+
+
+def compile_rule(line: str, source: str) -> Optional[_Rule]:
+    """
+    Compile one gitignore-style line
+
+    Args:
+        line: Rule text
+        source: Where the rule comes from (for stats), e.g. ".hubignore:3"
+
+    Returns:
+        Compiled rule, or None for blank lines and comments
+    """
+    pattern = line.rstrip("\n").rstrip()
+    if not pattern or pattern.startswith("#"):
+        return None
+    include = pattern.startswith("!")
+    if include:
+        pattern = pattern[1:]
+    elif pattern.startswith("\\"):
+        pattern = pattern[1:]  # Escaped leading "!" or "#"
+    dir_only = pattern.endswith("/")
+    body = pattern.strip("/")
+    if not body:
+        return None
+    anchored = "/" in pattern.rstrip("/")
+    prefix = "^" if anchored else "^(?:.*/)?"
+    # Directory rules need something below the name; other rules also match below a directory
+    suffix = "/.*$" if dir_only else "(?:/.*)?$"
+    return _Rule(line.strip(), source, include, prefix + glob_to_regex(body) + suffix)
+
+
+class PathFilter:
+    """Compiled ignore/include rules with per-rule hit counters."""
+
+    def __init__(self, rules: Iterable[str] = DEFAULT_RULES, hub_path: Optional[Path] = None):
+        """
+        Initialize the filter
+
+        Args:
+            rules: Built-in rules, applied before the hub's rules
+            hub_path: Hub root; its .hubignore is loaded if present
+        """
+        self.default_rules = list(rules)
+        self.hub_path = hub_path
+        self.checked = 0
+        self.ignored = 0
+        self.reloads = 0
+        self._state: Tuple[List[_Rule], Optional[re.Pattern], Dict[str, int]] = ([], None, {})
+        self.load()
+
+    def load(self):
+        """(Re)compile the built-in rules and the hub's .hubignore."""
+        rules = [compile_rule(line, "default") for line in self.default_rules]
+        if self.hub_path is not None:
+            hubignore = Path(self.hub_path) / HUBIGNORE_FILE
+            try:
+                lines = hubignore.read_text(encoding="utf-8").splitlines()
+            except FileNotFoundError:
+                lines = []
+            except OSError as e:
+                logger.warning(f"Could not read {hubignore}: {e}")
+                lines = []
+            rules += [compile_rule(line, f"{HUBIGNORE_FILE}:{number}") for number, line in enumerate(lines, 1)]
+        rules = [rule for rule in rules if rule is not None]
+        combined = re.compile("|".join(f"(?:{rule.regex.pattern})" for rule in rules)) if rules else None
+        self._state = (rules, combined, {})
+        self.reloads += 1
+        logger.info(f"Watcher path filter compiled with {len(rules)} rules")
+
+    def is_ignored(self, relative_path: str, is_dir: bool = False) -> bool:
+        """
+        Check a path relative to the hub root ("/"-separated)
+
+        Args:
+            relative_path: Path to check
+            is_dir: The path is a directory (directory-only rules apply to it)
+        """
+        rules, combined, cache = self._state
+        key = relative_path + "/" if is_dir else relative_path
+        self.checked += 1
+        index = cache.get(key)
+        if index is None:
+            index = -1
+            if combined is not None and combined.match(key):
+                for i in range(len(rules) - 1, -1, -1):
+                    if rules[i].regex.match(key):
+                        index = i
+                        break
+            if len(cache) >= _CACHE_SIZE:
+                cache.clear()
+            cache[key] = index
+        if index < 0:
+            return False
+        rule = rules[index]
+        rule.hits += 1
+        if rule.include:
+            return False
+        self.ignored += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        rules = self._state[0]
+        return {
+            "checked": self.checked,
+            "ignored": self.ignored,
+            "reloads": self.reloads,
+            "rules": [{"rule": rule.pattern, "source": rule.source, "include": rule.include, "hits": rule.hits}
+                      for rule in rules],
+        }
@@ -0,0 +1,146 @@
+"""
+Prompt Layout Module
+
+This module assembles chat prompts so that Ollama can reuse its KV cache between requests.
+Ollama only skips prefill for the longest token prefix shared with the previous prompt of a
+loaded model, so every prompt is laid out from the most to the least stable segment:
+
+1. Static instructions (identical for every request)
+2. Workspace context (changes only when projects or tasks change)
+3. Session history (append-only within a conversation)
+4. The current request
+
+A change in a segment then only invalidates the segments after it. History windows are
+also anchored in fixed-size steps, so the oldest kept message does not shift every turn.
+"""
+
+import hashlib
+import logging
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Segment stability levels, most stable first
+STABILITY_STATIC = 0
+STABILITY_WORKSPACE = 1
+STABILITY_SESSION = 2
+STABILITY_REQUEST = 3
+
+
+def history_window_start(message_count: int, min_messages: int, step: int) -> int:
+    """
+    Index of the first history message to include in a prompt
+
+    The start only moves forward in multiples of step, so consecutive turns keep the same
+    first message (and therefore the same prompt prefix) until the window has grown by
+    step messages. Between min_messages and min_messages + step - 1 messages are kept.
+
+    Args:
+        message_count: Number of messages in the session
+        min_messages: Minimum number of recent messages to keep
+        step: Granularity in which old messages are dropped
+
+    Returns:
+        Index of the first message to include
+    """
+    overflow = message_count - min_messages
+    if overflow <= 0:
+        return 0
+    step = max(1, step)
+    return (overflow // step) * step
+
+
+class PromptLayout:
+    """Collects prompt segments and orders them by stability."""
+
+    def __init__(self):
+        self._segments: List[Dict[str, Any]] = []
+
+    def add_text(self, name: str, content: str, stability: int, role: str = "system") -> "PromptLayout":
+        """
+        Add a text segment
+
+        Args:
+            name: Segment name (for logging)
+            content: Segment text; empty segments are skipped
+            stability: One of the STABILITY_* levels
+            role: Message role of the segment
+        """
+        if content:
+            self._segments.append({"name": name, "stability": stability,
+                                   "messages": [{"role": role, "content": content}]})
+        return self
+
+    def add_messages(self, name: str, messages: List[Dict[str, Any]], stability: int) -> "PromptLayout":
+        """Add a run of chat messages (e.g. session history) as one segment."""
+        if messages:
+            self._segments.append({"name": name, "stability": stability,
+                                   "messages": [{"role": m["role"], "content": m["content"]} for m in messages]})
+        return self
+
+    def build(self) -> List[Dict[str, str]]:
+        """
+        Build the message list
+
+        Segments are ordered by stability (insertion order breaks ties), and the leading
+        system segments are merged into a single system message.
+
+        Returns:
+            Chat messages ready for the Ollama chat API
+        """
+        ordered = sorted(self._segments, key=lambda s: s["stability"])
+        messages: List[Dict[str, str]] = []
+        for segment in ordered:
+            for message in segment["messages"]:
+                if (message["role"] == "system" and len(messages) == 1
+                        and messages[0]["role"] == "system"):
+                    messages[0] = {"role": "system",
+                                   "content": messages[0]["content"] + "\n\n" + message["content"]}
+                else:
+                    messages.append(dict(message))
+        return messages
+
+    def prefix_hash(self, max_stability: int = STABILITY_WORKSPACE) -> str:
+        """Hash of the segments up to max_stability; equal hashes mean a reusable prefix."""
+        digest = hashlib.sha1()
+        for segment in sorted(self._segments, key=lambda s: s["stability"]):
+            if segment["stability"] > max_stability:
+                break
+            for message in segment["messages"]:
+                digest.update(message["role"].encode("utf-8"))
+                digest.update(message["content"].encode("utf-8"))
+        return digest.hexdigest()[:12]
+
+
+class PrefixTracker:
+    """Remembers the last prompt prefix per model to report expected KV-cache reuse."""
+
+    def __init__(self):
+        self._last: Dict[str, str] = {}
+        self.reused = 0
+        self.changed = 0
+
+    def observe(self, model_id: str, layout: PromptLayout) -> bool:
+        """
+        Record the prefix of a prompt about to be sent
+
+        Returns:
+            True if the stable prefix matches the previous prompt for this model
+        """
+        prefix = layout.prefix_hash()
+        reused = self._last.get(model_id) == prefix
+        self._last[model_id] = prefix
+        if reused:
+            self.reused += 1
+        else:
+            self.changed += 1
+            logger.info(f"Prompt prefix for {model_id} changed ({prefix}); Ollama will re-run prefill")
+        return reused
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.reused + self.changed
+        return {
+            "prefix_reused": self.reused,
+            "prefix_changed": self.changed,
+            "reuse_rate": round(self.reused / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,117 @@
+"""
+Revisions Module
+
+This module numbers change events so clients can apply them incrementally. Each stream
+(the task list or the project file of one project) has a revision counter that increases
+by one with every change event. Events that know what changed carry a delta:
+
+    {"type": "tasks_updated", "project_id": "Project-A", "revision": 7, "epoch": "3f2a9c1e",
+     "changes": [{"op": "created" | "updated", "task": {...}}, {"op": "deleted", "task_id": "task-3"}]}
+
+A client holding revision 6 of the same epoch applies the changes locally; on a gap, a
+different epoch (the backend restarted) or an event without "changes" (e.g. an external
+edit seen by the file watcher) it refetches. GET /tasks/{project_id} returns the current
+revision and epoch to start from.
+"""
+
+import uuid
+import threading
+from typing import Dict, List, Any, Optional
+
+TASK_OPS = {"create_task": "created", "update_task": "updated", "delete_task": "deleted"}
+
+
+def tasks_stream(project_id: str) -> str:
+    return f"tasks:{project_id}"
+
+
+def project_stream(project_id: str) -> str:
+    return f"project:{project_id}"
+
+
+def task_delta(action: str, task: Optional[Dict[str, Any]] = None,
+               task_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Build the delta entry for one task action
+
+    Args:
+        action: create_task, update_task or delete_task
+        task: Task body after the change (required for creates and updates)
+        task_id: Id of the deleted task
+
+    Returns:
+        Delta dictionary, or None if the change cannot be described (the client refetches)
+    """
+    op = TASK_OPS.get(action)
+    if op == "deleted" and task_id is not None:
+        return {"op": op, "task_id": str(task_id)}
+    if op in ("created", "updated") and task:
+        return {"op": op, "task": task}
+    return None
+
+
+def task_changes(results: List[Dict[str, Any]]) -> Dict[str, Optional[List[Dict[str, Any]]]]:
+    """
+    Group the deltas of successful task action results by project
+
+    Args:
+        results: Action results (single actions or the steps of a plan), in order
+
+    Returns:
+        Mapping of project id to its deltas in order; None if any change in that project
+        lacks the data for a delta
+    """
+    changes: Dict[str, Optional[List[Dict[str, Any]]]] = {}
+    for result in results:
+        project_id = result.get("project_id")
+        if not result.get("success") or result.get("action") not in TASK_OPS or not project_id:
+            continue
+        delta = task_delta(result["action"], result.get("task"), result.get("task_id"))
+        if project_id not in changes:
+            changes[project_id] = []
+        if delta is None or changes[project_id] is None:
+            changes[project_id] = None
+        else:
+            changes[project_id].append(delta)
+    return changes
+
+
+class RevisionTracker:
+    """Per-stream revision counters, valid for the lifetime of the process (the epoch)."""
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._revisions: Dict[str, int] = {}
+
+    def current(self, stream: str) -> int:
+        with self._lock:
+            return self._revisions.get(stream, 0)
+
+    def next(self, stream: str) -> int:
+        """Advance a stream's revision (thread-safe; the file watcher calls it from its thread)."""
+        with self._lock:
+            revision = self._revisions.get(stream, 0) + 1
+            self._revisions[stream] = revision
+            return revision
+
+    def tasks_event(self, project_id: str, changes: Optional[List[Dict[str, Any]]] = None,
+                    **fields) -> Dict[str, Any]:
+        """Build a tasks_updated message with the next revision (and deltas if known)."""
+        message = {"type": "tasks_updated", "project_id": project_id, **fields,
+                   "revision": self.next(tasks_stream(project_id)), "epoch": self.epoch}
+        if changes is not None:
+            message["changes"] = changes
+        return message
+
+    def project_event(self, project_id: str, project: Optional[Dict[str, Any]] = None,
+                      **fields) -> Dict[str, Any]:
+        """Build a project_updated message with the next revision (and the new body if known)."""
+        message = {"type": "project_updated", "project_id": project_id, **fields,
+                   "revision": self.next(project_stream(project_id)), "epoch": self.epoch}
+        if project is not None:
+            message["project"] = project
+        return message
+
+    def get_state(self, stream: str) -> Dict[str, Any]:
+        return {"revision": self.current(stream), "epoch": self.epoch}
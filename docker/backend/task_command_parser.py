@@ -0,0 +1,275 @@
+"""
+Task Command Parser Module
+
+This module provides a deterministic, rule-based parser for simple task commands such as
+"mark task-3 in Project-A as done" or "delete task-7 from Project-B". Recognised commands
+are turned into the same action JSON the LLM would produce, so they can be executed by the
+LLMTaskController without a round trip to the model. Anything the rules do not match
+exactly, or whose project/task cannot be resolved unambiguously, returns None and falls
+through to the LLM.
+"""
+
+import re
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+
+from task_models import TASK_PRIORITIES
+
+logger = logging.getLogger(__name__)
+
+# Commands must start with one of these verbs to be considered at all
+COMMAND_VERBS = ("create", "add", "new", "mark", "set", "change", "move", "complete", "finish",
+                 "close", "start", "assign", "reassign", "unassign", "delete", "remove",
+                 "make", "prioritize", "reprioritize")
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+STATUS_ALIASES = {
+    "done": "done", "complete": "done", "completed": "done", "finished": "done", "closed": "done",
+    "todo": "todo", "to do": "todo", "to-do": "todo", "open": "todo",
+    "in-progress": "in-progress", "in progress": "in-progress", "started": "in-progress", "doing": "in-progress",
+    "blocked": "blocked", "review": "review", "in review": "review",
+}
+
+TASK = "taskref"
+_STATUS = "|".join(sorted((re.escape(s) for s in STATUS_ALIASES), key=len, reverse=True))
+_PRIORITY = "|".join(TASK_PRIORITIES)
+_DATE = r"\d{4}-\d{2}-\d{2}|today|tomorrow|next week|in \d+ days?|(?:next )?(?:" + "|".join(WEEKDAYS) + ")"
+
+# Rules operate on the command after the project mention is removed and the task
+# reference is replaced by "taskref". Each rule is (name, pattern). Patterns are matched
+# case-insensitively against the original text, so captured names and titles keep their
+# case (lowercasing first can change string lengths, e.g. "İ", and misalign the spans).
+RULES: List[Tuple[str, "re.Pattern"]] = [
+    ("delete", re.compile(rf"^(?:delete|remove)(?: the)?(?: task)? {TASK}$", re.IGNORECASE)),
+    ("complete", re.compile(rf"^(?:complete|finish|close)(?: the)?(?: task)? {TASK}$", re.IGNORECASE)),
+    ("start", re.compile(rf"^start(?: working on)?(?: the)?(?: task)? {TASK}$", re.IGNORECASE)),
+    ("status", re.compile(rf"^(?:mark|set|move)(?: the)?(?: task)? {TASK}(?: status)? (?:as |to )?(?P<status>{_STATUS})$", re.IGNORECASE)),
+    ("status", re.compile(rf"^(?:set|change) (?:the )?status of(?: task)? {TASK} to (?P<status>{_STATUS})$", re.IGNORECASE)),
+    ("assign", re.compile(rf"^(?:assign|reassign)(?: the)?(?: task)? {TASK} to (?P<person>.+)$", re.IGNORECASE)),
+    ("unassign", re.compile(rf"^unassign(?: the)?(?: task)? {TASK}$", re.IGNORECASE)),
+    ("priority", re.compile(rf"^(?:set|change) (?:the )?priority of(?: task)? {TASK} to (?P<priority>{_PRIORITY})$", re.IGNORECASE)),
+    ("priority", re.compile(rf"^(?:set|change|make|mark|reprioritize|prioritize)(?: the)?(?: task)? {TASK}(?: priority)? (?:to |as )?(?P<priority>{_PRIORITY})(?: priority)?$", re.IGNORECASE)),
+    ("due", re.compile(rf"^(?:set|change|move) (?:the )?due(?: date)? (?:of|for)(?: task)? {TASK} to (?P<due>{_DATE})$", re.IGNORECASE)),
+    ("due", re.compile(rf"^(?:set|change|move)(?: the)?(?: task)? {TASK}(?:'s)? due(?: date)? (?:to |on )?(?P<due>{_DATE})$", re.IGNORECASE)),
+    ("due", re.compile(rf"^(?:make|set)(?: the)?(?: task)? {TASK} due (?:on )?(?P<due>{_DATE})$", re.IGNORECASE)),
+]
+
+CREATE_RULE = re.compile(
+    r"^(?:create|add|new)(?: a)?(?: new)? task(?: called| named| titled)?:? (?P<title>.+?)"
+    rf"(?: with (?P<priority>{_PRIORITY}) priority)?"
+    rf"(?: due (?:on )?(?P<due>{_DATE}))?"
+    r"(?: (?P<marker>assigned to|assign to|for) (?P<person>[^\W\d_][\w .'-]*?))?$",
+    re.IGNORECASE
+)
+
+_TASK_ID = re.compile(r"\btask-[\w-]+\b", re.IGNORECASE)
+_QUOTED = re.compile(r"[\"'“”](?P<text>[^\"'“”]+)[\"'“”]")
+_PROJECT_PREPOSITIONS = r"(?:in|from|for|to|on|of|under)"
+
+
+def parse_due_date(text: str, today: Optional[date] = None) -> Optional[str]:
+    """Convert a due-date phrase (YYYY-MM-DD, today, tomorrow, in N days, weekday) into YYYY-MM-DD."""
+    today = today or date.today()
+    text = text.strip().lower()
+    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", text):
+        try:
+            return date.fromisoformat(text).isoformat()
+        except ValueError:
+            return None
+    if text == "today":
+        return today.isoformat()
+    if text == "tomorrow":
+        return (today + timedelta(days=1)).isoformat()
+    if text == "next week":
+        return (today + timedelta(days=7)).isoformat()
+    match = re.fullmatch(r"in (\d+) days?", text)
+    if match:
+        return (today + timedelta(days=int(match.group(1)))).isoformat()
+    match = re.fullmatch(r"(next )?(\w+)", text)
+    if match and match.group(2) in WEEKDAYS:
+        days_ahead = (WEEKDAYS.index(match.group(2)) - today.weekday()) % 7 or 7
+        if match.group(1):
+            days_ahead += 7 if days_ahead < 7 else 0
+        return (today + timedelta(days=days_ahead)).isoformat()
+    return None
+
+
+class TaskCommandParser:
+    """Rule-based intent parser that emits task action JSON for simple commands."""
+
+    def __init__(self, tasks_service):
+        """
+        Initialize the parser
+
+        Args:
+            tasks_service: The TasksService used to resolve projects and tasks
+        """
+        self.tasks_service = tasks_service
+
+    def parse(self, command: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse a command into an action dictionary
+
+        Args:
+            command: Natural language command
+
+        Returns:
+            Action dictionary (same format as the LLM's JSON) or None if the command
+            is not a simple, unambiguous task command
+        """
+        text = " ".join((command or "").strip().rstrip(".!").split())
+        if not text or text.split(" ", 1)[0].lower() not in COMMAND_VERBS:
+            return None
+
+        projects = self._load_projects()
+        project_id, text = self._extract_project(text, projects)
+
+        create_match = CREATE_RULE.match(text)
+        if create_match and TASK not in text:
+            team = projects[project_id]["team"] if project_id else []
+            return self._build_create(create_match, project_id, team)
+
+        task_ref = self._extract_task_ref(text, project_id, projects)
+        if task_ref is None:
+            return None
+        task_project_id, task_id, text = task_ref
+
+        for rule_name, pattern in RULES:
+            match = pattern.match(text)
+            if match:
+                updates = self._build_updates(rule_name, match)
+                if updates is None:
+                    return None
+                if rule_name == "delete":
+                    action = {"action": "delete_task", "project_id": task_project_id, "task_id": task_id}
+                else:
+                    action = {"action": "update_task", "project_id": task_project_id,
+                              "task_id": task_id, "updates": updates}
+                logger.info(f"Fast-path parsed '{command}' as {rule_name}: {action}")
+                return action
+        return None
+
+    # --- Resolution ---
+    def _load_projects(self) -> Dict[str, Dict[str, Any]]:
+        """Map project id to {"title": ..., "tasks": [...]} for every project in the hub."""
+        projects = {}
+        for item in self.tasks_service.data_path.iterdir():
+            if not item.is_dir() or item.name.startswith('.') or item.name.startswith('_'):
+                continue
+            if not (item / "project.yaml").exists() and not (item / "tasks.yaml").exists():
+                continue
+            project_data = self.tasks_service._get_project_data(item.name) or {}
+            team = project_data.get("team") if isinstance(project_data.get("team"), list) else []
+            projects[item.name] = {
+                "title": str(project_data.get("title") or ""),
+                "team": [str(member["name"]) for member in team if isinstance(member, dict) and member.get("name")],
+                "tasks": None,  # Loaded lazily
+            }
+        return projects
+
+    def _project_tasks(self, projects: Dict[str, Dict[str, Any]], project_id: str) -> List[Dict[str, Any]]:
+        entry = projects[project_id]
+        if entry["tasks"] is None:
+            entry["tasks"] = self.tasks_service._get_project_tasks_internal(project_id)
+        return entry["tasks"]
+
+    def _extract_project(self, text: str, projects: Dict[str, Dict[str, Any]]) -> Tuple[Optional[str], str]:
+        """Find a "<preposition> [project] <id or title>" mention and remove it from the text."""
+        names = []
+        for project_id, entry in projects.items():
+            names.append((project_id, project_id))
+            if entry["title"]:
+                names.append((entry["title"], project_id))
+        # Longest names first so "Project-A2" is not matched as "Project-A"
+        for name, project_id in sorted(names, key=lambda n: len(n[0]), reverse=True):
+            pattern = re.compile(
+                rf"\s+{_PROJECT_PREPOSITIONS}\s+(?:the\s+)?(?:project\s+)?{re.escape(name)}(?:\s+project)?(?=$|\s)",
+                re.IGNORECASE
+            )
+            match = pattern.search(text)
+            if match:
+                return project_id, (text[:match.start()] + text[match.end():]).strip()
+        return None, text
+
+    def _extract_task_ref(self, text: str, project_id: Optional[str],
+                          projects: Dict[str, Dict[str, Any]]) -> Optional[Tuple[str, str, str]]:
+        """Resolve a task id or quoted task title; returns (project_id, task_id, text with the placeholder)."""
+        candidates = [project_id] if project_id else list(projects)
+
+        match = _TASK_ID.search(text)
+        if match:
+            wanted = match.group().lower()
+            hits = [(pid, str(task["id"])) for pid in candidates
+                    for task in self._project_tasks(projects, pid) if str(task.get("id", "")).lower() == wanted]
+        else:
+            match = _QUOTED.search(text)
+            if not match:
+                return None
+            wanted = match.group("text").strip().lower()
+            hits = [(pid, str(task["id"])) for pid in candidates
+                    for task in self._project_tasks(projects, pid)
+                    if str(task.get("title", "")).strip().lower() == wanted]
+
+        if len(hits) != 1:
+            if len(hits) > 1:
+                logger.info(f"Fast path: task reference '{match.group()}' is ambiguous, deferring to LLM")
+            return None
+        resolved_project, task_id = hits[0]
+        return resolved_project, task_id, text[:match.start()] + TASK + text[match.end():]
+
+    # --- Builders ---
+    def _build_updates(self, rule_name: str, match: "re.Match") -> Optional[Dict[str, Any]]:
+        if rule_name == "delete":
+            return {}
+        if rule_name == "complete":
+            return {"status": "done"}
+        if rule_name == "start":
+            return {"status": "in-progress"}
+        if rule_name == "status":
+            return {"status": STATUS_ALIASES[match.group("status").lower()]}
+        if rule_name == "assign":
+            person = match.group("person").strip()
+            return {"assigned_to": person} if person else None
+        if rule_name == "unassign":
+            return {"assigned_to": None}
+        if rule_name == "priority":
+            return {"priority": match.group("priority").lower()}
+        if rule_name == "due":
+            due = parse_due_date(match.group("due"))
+            return {"due": due} if due else None
+        return None
+
+    def _build_create(self, match: "re.Match", project_id: Optional[str],
+                      team: List[str]) -> Optional[Dict[str, Any]]:
+        if not project_id:
+            return None
+        title = match.group("title").strip()
+        quoted = _QUOTED.fullmatch(title)
+        if quoted:
+            title = quoted.group("text").strip()
+        if not title:
+            return None
+
+        task = {"title": title, "description": "", "status": "todo",
+                "priority": (match.group("priority") or "medium").lower()}
+        if match.group("due"):
+            due = parse_due_date(match.group("due"))
+            if not due:
+                return None
+            task["due"] = due
+        if match.group("person"):
+            person = match.group("person").strip()
+            if match.group("marker").lower() == "for":
+                # "for X" is usually part of the title ("Write tests for login"); only a
+                # known team member of the project makes it an assignee
+                member = next((name for name in team if name.lower() == person.lower()), None)
+                if member is None:
+                    return None
+                person = member
+            task["assigned_to"] = person
+
+        action = {"action": "create_task", "project_id": project_id, "task": task}
+        logger.info(f"Fast-path parsed create command: {action}")
+        return action
@@ -130,4 +130,170 @@ class TaskFromTemplate(BaseModel):
     priority: Optional[str] = None
     due: Optional[str] = None
     assigned_to: Optional[str] = None
-    tags: Optional[List[str]] = None
\ No newline at end of file
+    tags: Optional[List[str]] = None
+
+
+class TaskPatch(BaseModel):
+    """Model for the partial updates carried by an update_task action."""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    due: Optional[str] = None
+    assigned_to: Optional[str] = None
+    tags: Optional[List[str]] = None
+
+    @validator('status')
+    def validate_status(cls, v):
+        """Validate that status is one of the allowed values."""
+        if v is not None and v.lower() not in TASK_STATUSES:
+            raise ValueError(f"Status must be one of {TASK_STATUSES}")
+        return v.lower() if v else None
+
+    @validator('priority')
+    def validate_priority(cls, v):
+        """Validate that priority is one of the allowed values."""
+        if v is not None and v.lower() not in TASK_PRIORITIES:
+            raise ValueError(f"Priority must be one of {TASK_PRIORITIES}")
+        return v.lower() if v else None
+
+    @validator('due')
+    def validate_due_date(cls, v):
+        """Validate that due date is in correct format."""
+        if v is not None:
+            try:
+                datetime.strptime(v, "%Y-%m-%d")
+            except ValueError:
+                raise ValueError("Due date must be in YYYY-MM-DD format")
+        return v
+
+
+class CreateTaskAction(BaseModel):
+    """LLM action that creates a task."""
+    action: str = Field("create_task", pattern="^create_task$")
+    project_id: str
+    task: TaskCreate
+
+
+class UpdateTaskAction(BaseModel):
+    """LLM action that updates fields of a task."""
+    action: str = Field("update_task", pattern="^update_task$")
+    project_id: str
+    task_id: str
+    updates: TaskPatch
+
+
+class DeleteTaskAction(BaseModel):
+    """LLM action that deletes a task."""
+    action: str = Field("delete_task", pattern="^delete_task$")
+    project_id: str
+    task_id: str
+
+
+class GetTasksAction(BaseModel):
+    """LLM action that lists the tasks of a project."""
+    action: str = Field("get_tasks", pattern="^get_tasks$")
+    project_id: str
+
+
+class GetProjectsAction(BaseModel):
+    """LLM action that lists all projects."""
+    action: str = Field("get_projects", pattern="^get_projects$")
+
+
+TASK_ACTION_MODELS = {
+    "create_task": CreateTaskAction,
+    "update_task": UpdateTaskAction,
+    "delete_task": DeleteTaskAction,
+    "get_tasks": GetTasksAction,
+    "get_projects": GetProjectsAction,
+}
+
+
+def _task_fields_schema() -> Dict[str, Any]:
+    return {
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+        "status": {"type": "string", "enum": TASK_STATUSES},
+        "priority": {"type": "string", "enum": TASK_PRIORITIES},
+        "due": {"type": "string", "pattern": r"^\d{4}-\d{2}-\d{2}$"},
+        "assigned_to": {"type": "string"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+    }
+
+
+def task_action_json_schema(allow_plans: bool = True) -> Dict[str, Any]:
+    """
+    JSON schema for the task action union, suitable for Ollama's `format` parameter
+
+    Args:
+        allow_plans: Also accept {"actions": [...]} multi-action plans
+
+    Returns:
+        JSON schema dictionary
+    """
+    def action(name: str, properties: Dict[str, Any], required: List[str]) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {"action": {"type": "string", "enum": [name]}, **properties},
+            "required": ["action", *required],
+        }
+
+    project_id = {"type": "string"}
+    task_id = {"type": "string"}
+    actions = [
+        action("create_task", {
+            "project_id": project_id,
+            "task": {"type": "object", "properties": _task_fields_schema(), "required": ["title", "description"]},
+        }, ["project_id", "task"]),
+        action("update_task", {
+            "project_id": project_id,
+            "task_id": task_id,
+            "updates": {"type": "object", "properties": _task_fields_schema()},
+        }, ["project_id", "task_id", "updates"]),
+        action("delete_task", {"project_id": project_id, "task_id": task_id}, ["project_id", "task_id"]),
+        action("get_tasks", {"project_id": project_id}, ["project_id"]),
+        action("get_projects", {}, []),
+    ]
+    if not allow_plans:
+        return {"anyOf": actions}
+    plan = {
+        "type": "object",
+        "properties": {"actions": {"type": "array", "items": {"anyOf": actions}, "minItems": 1}},
+        "required": ["actions"],
+    }
+    return {"anyOf": actions + [plan]}
+
+
+def validate_task_action(data: Any) -> Dict[str, Any]:
+    """
+    Validate an action (or {"actions": [...]} plan) produced by an LLM
+
+    Args:
+        data: Parsed JSON value
+
+    Returns:
+        The normalized action dictionary, with fields the LLM did not set dropped
+
+    Raises:
+        ValueError: If the value is not a valid action or plan
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Action must be a JSON object")
+
+    if "actions" in data:
+        steps = data["actions"]
+        if not isinstance(steps, list) or not steps:
+            raise ValueError("'actions' must be a non-empty list")
+        normalized = []
+        for index, step in enumerate(steps, start=1):
+            try:
+                normalized.append(validate_task_action(step))
+            except ValueError as e:
+                raise ValueError(f"Step {index}: {e}")
+        return {"actions": normalized}
+
+    model = TASK_ACTION_MODELS.get(data.get("action"))
+    if model is None:
+        raise ValueError(f"Unknown action: {data.get('action')!r}")
+    return model.model_validate(data).model_dump(exclude_unset=True)
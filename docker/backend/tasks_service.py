@@ -15,15 +15,25 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional, Union
 import uuid
 import time
+import hashlib
 
 logger = logging.getLogger(__name__)
 
 class TasksService:
     """Service class for task operations."""
 
-    def __init__(self, data_path: Path):
-        """Initialize TasksService with base data path."""
+    def __init__(self, data_path: Path, on_write=None):
+        """
+        Initialize TasksService with base data path.
+
+        on_write, if given, is called with the path of every tasks file written.
+        """
         self.data_path = data_path
+        self.on_write = on_write
+
+    def _written(self, tasks_file: Path):
+        if self.on_write:
+            self.on_write(tasks_file)
         
     def get_all_tasks(self) -> List[Dict[str, Any]]:
         """Get all tasks from all projects."""
@@ -113,6 +123,20 @@ class TasksService:
         
         return filtered_tasks
     
+    def get_workspace_version(self) -> str:
+        """Get a fingerprint of all project and task files that changes whenever any of them is written."""
+        digest = hashlib.sha1()
+        for project_dir in sorted(self.data_path.iterdir()):
+            if not project_dir.is_dir() or project_dir.name.startswith('.') or project_dir.name.startswith('_'):
+                continue
+            for filename in ("project.yaml", "tasks.yaml"):
+                try:
+                    stat = (project_dir / filename).stat()
+                except FileNotFoundError:
+                    continue
+                digest.update(f"{project_dir.name}/{filename}:{stat.st_mtime_ns}:{stat.st_size};".encode("utf-8"))
+        return digest.hexdigest()
+    
     def get_project_tasks(self, project_id: str) -> List[Dict[str, Any]]:
         """Get tasks for a specific project."""
         tasks = self._get_project_tasks_internal(project_id)
@@ -194,6 +218,7 @@ class TasksService:
                 yaml.dump(tasks_data, f, default_flow_style=False, sort_keys=False)
             else:
                 yaml.dump(tasks, f, default_flow_style=False, sort_keys=False)
+        self._written(tasks_file)
             
         # Add project_id for the response
         task_data["project_id"] = project_id
@@ -247,6 +272,7 @@ class TasksService:
                     yaml.dump(tasks_data, f, default_flow_style=False, sort_keys=False)
                 else:
                     yaml.dump(tasks, f, default_flow_style=False, sort_keys=False)
+            self._written(tasks_file)
                 
             # Add project_id for the response
             task_data["project_id"] = project_id
@@ -299,6 +325,7 @@ class TasksService:
                     yaml.dump(tasks_data, f, default_flow_style=False, sort_keys=False)
                 else:
                     yaml.dump(tasks, f, default_flow_style=False, sort_keys=False)
+            self._written(tasks_file)
                 
             return True
             
@@ -306,6 +333,94 @@ class TasksService:
             logger.error(f"Invalid YAML in tasks file: {tasks_file}")
             return False
     
+    def apply_task_operations(self, project_id: str, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Apply several create/update/delete operations to one project with a single read and write.
+
+        Each operation is a dict with an "action" of "create_task" (with "task"),
+        "update_task" (with "task_id" and "updates") or "delete_task" (with "task_id").
+        Operations are applied in order against the in-memory task list; the file is
+        written once at the end if any operation succeeded.
+
+        Returns a result dict per operation, in the same order.
+        """
+        tasks_file = self.data_path / project_id / "tasks.yaml"
+        tasks_data = {"tasks": []}
+        
+        if tasks_file.exists():
+            with open(tasks_file, "r", encoding="utf-8") as f:
+                file_content = f.read().strip()
+            if file_content:
+                try:
+                    loaded = yaml.safe_load(file_content)
+                except yaml.YAMLError:
+                    logger.error(f"Invalid YAML in tasks file: {tasks_file}")
+                    return [{"success": False, "action": op.get("action"), "project_id": project_id,
+                             "error": "Invalid YAML in tasks file"} for op in operations]
+                if isinstance(loaded, list):
+                    tasks_data = {"tasks": loaded}
+                elif isinstance(loaded, dict):
+                    # Keep the file's other top-level keys; only the task list is replaced
+                    tasks_data = loaded
+                    if not isinstance(tasks_data.get("tasks"), list):
+                        tasks_data["tasks"] = []
+        tasks = tasks_data["tasks"]
+        
+        results = []
+        changed = False
+        now = datetime.now().isoformat()
+        for op in operations:
+            action = op.get("action")
+            result = {"success": False, "action": action, "project_id": project_id}
+            
+            if action == "create_task":
+                task_data = dict(op.get("task") or {})
+                if not task_data.get("id") or any(t.get("id") == task_data["id"] for t in tasks):
+                    task_data["id"] = f"task-{str(uuid.uuid4())[:8]}"
+                if not task_data.get("created_at"):
+                    task_data["created_at"] = now
+                tasks.append(task_data)
+                result.update(success=True, task_id=task_data["id"], task=dict(task_data, project_id=project_id))
+                changed = True
+                
+            elif action == "update_task":
+                task_id = op.get("task_id")
+                for task in tasks:
+                    if str(task.get("id")) == task_id:
+                        for key, value in (op.get("updates") or {}).items():
+                            if key not in ("id", "project_id"):
+                                task[key] = value
+                        task["updated_at"] = now
+                        result.update(success=True, task_id=task_id, task=dict(task, project_id=project_id))
+                        changed = True
+                        break
+                else:
+                    result.update(task_id=task_id, error=f"Task not found: {task_id}")
+                    
+            elif action == "delete_task":
+                task_id = op.get("task_id")
+                for i, task in enumerate(tasks):
+                    if str(task.get("id")) == task_id:
+                        tasks.pop(i)
+                        result.update(success=True, task_id=task_id)
+                        changed = True
+                        break
+                else:
+                    result.update(task_id=task_id, error=f"Task not found: {task_id}")
+                    
+            else:
+                result["error"] = f"Unsupported batch action: {action}"
+                
+            results.append(result)
+            
+        if changed:
+            tasks_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(tasks_file, "w", encoding="utf-8") as f:
+                yaml.dump(tasks_data, f, default_flow_style=False, sort_keys=False)
+            self._written(tasks_file)
+                
+        return results
+    
     def update_task_status(self, project_id: str, task_id: str, new_status: str) -> Optional[Dict[str, Any]]:
         """Update just the status of a task."""
         task = self.get_task(project_id, task_id)
@@ -0,0 +1,57 @@
+"""Tests for the final status of background LLM jobs."""
+
+import asyncio
+
+from llm_jobs import LLMJobManager, JOB_COMPLETED, JOB_FAILED
+
+
+def run_job(runner, kind="chat"):
+    """Submit one job, wait until it has finished and return it as a dictionary."""
+    async def run():
+        manager = LLMJobManager()
+        job = await manager.submit(kind, runner)
+        while manager.get(job["id"])["status"] not in (JOB_COMPLETED, JOB_FAILED):
+            await asyncio.sleep(0.01)
+        result = manager.get(job["id"])
+        await manager.stop()
+        return result
+    return asyncio.run(run())
+
+
+def test_failing_chat_runner_fails_job():
+    async def runner(report):
+        await report("generating")
+        return {"error": "No response from model"}
+
+    job = run_job(runner)
+    assert job["status"] == JOB_FAILED
+    assert job["error"] == "No response from model"
+    assert job["result"] == {"error": "No response from model"}
+
+
+def test_unsuccessful_result_fails_job():
+    async def runner(report):
+        return {"success": False, "error": "Could not extract JSON command from LLM response"}
+
+    job = run_job(runner, kind="task_command")
+    assert job["status"] == JOB_FAILED
+    assert job["error"] == "Could not extract JSON command from LLM response"
+
+
+def test_raising_runner_fails_job():
+    async def runner(report):
+        raise RuntimeError("scheduler stopped")
+
+    job = run_job(runner)
+    assert job["status"] == JOB_FAILED
+    assert job["error"] == "scheduler stopped"
+
+
+def test_chat_reply_completes_job():
+    async def runner(report):
+        return {"id": "resp_1", "role": "assistant", "content": "Hello"}
+
+    job = run_job(runner)
+    assert job["status"] == JOB_COMPLETED
+    assert job["error"] is None
+    assert job["result"]["content"] == "Hello"
@@ -0,0 +1,172 @@
+"""
+Polling Watcher Benchmark
+
+This module measures the stat-based polling watcher on a large synthetic tree (100k files
+by default): time and memory of a full os.scandir snapshot, time to diff snapshots with
+and without changes, detection latency of a change once the adaptive interval has backed
+off, and the resulting share of a core spent scanning. watchdog's DirectorySnapshot
+(what its PollingObserver uses) is scanned as a reference.
+
+Usage:
+    python watcher_benchmark.py --files 100000
+    python watcher_benchmark.py --files 20000 --dirs 200 --changes 500 --json results.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from typing import Dict, List, Any, Optional
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.utils.dirsnapshot import DirectorySnapshot
+
+from hub_watcher import PollingWatcher, scan_tree, diff_snapshots
+
+
+def generate_tree(root: str, files: int, dirs: int) -> List[str]:
+    """Create files spread over dirs project-like directories; returns their paths."""
+    paths = []
+    per_dir = max(1, files // dirs)
+    for d in range(dirs):
+        directory = os.path.join(root, f"Project-{d}", "docs")
+        os.makedirs(directory, exist_ok=True)
+        for f in range(min(per_dir, files - len(paths))):
+            path = os.path.join(directory, f"note-{f}.md")
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write(f"# Note {f}\n")
+            paths.append(path)
+    return paths
+
+
+def timed(func, repeat: int = 3) -> float:
+    """Best wall time of func over repeat runs, in ms."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1000, 2)
+
+
+class _Recorder(FileSystemEventHandler):
+    def __init__(self):
+        super().__init__()
+        self.seen = threading.Event()
+
+    def dispatch(self, event):
+        self.seen.set()
+
+
+def detection_latency(root: str, paths: List[str], min_interval: float, max_interval: float) -> Dict[str, Any]:
+    """Time from a write to its event with an idle (backed-off) poller."""
+    recorder = _Recorder()
+    watcher = PollingWatcher(recorder, root, min_interval=min_interval, max_interval=max_interval)
+    watcher.start()
+    try:
+        # Wait for the baseline snapshot and let the interval back off to its idle value
+        deadline = time.monotonic() + 120
+        while (watcher.scans < 2 or watcher.interval < max_interval) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        idle_interval = watcher.interval
+        written = time.perf_counter()
+        with open(random.choice(paths), "a", encoding="utf-8") as handle:
+            handle.write("changed\n")
+        recorder.seen.wait(idle_interval * 3 + 10)
+        latency = time.perf_counter() - written
+    finally:
+        watcher.stop()
+        watcher.join(5)
+    stats = watcher.get_stats()
+    return {
+        "idle_interval_seconds": round(idle_interval, 3),
+        "latency_ms": round(latency * 1000, 1),
+        "avg_scan_ms": stats["avg_scan_ms"],
+        "idle_core_share": round(stats["avg_scan_ms"] / 1000 / idle_interval, 4) if idle_interval else None,
+    }
+
+
+def run_benchmark(root: str, files: int, dirs: int, changes: int, min_interval: float, max_interval: float,
+                  seed: int = 0) -> Dict[str, Any]:
+    random.seed(seed)
+    started = time.perf_counter()
+    paths = generate_tree(root, files, dirs)
+    generate_seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    snapshot = scan_tree(root)
+    snapshot_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    scan_ms = timed(lambda: scan_tree(root))
+    watchdog_ms = timed(lambda: DirectorySnapshot(root, recursive=True), repeat=1)
+    unchanged = scan_tree(root)
+    diff_unchanged_ms = timed(lambda: diff_snapshots(snapshot, unchanged))
+
+    for path in random.sample(paths, min(changes, len(paths))):
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write("changed\n")
+    changed = scan_tree(root)
+    events = diff_snapshots(snapshot, changed)
+    diff_changed_ms = timed(lambda: diff_snapshots(snapshot, changed))
+
+    return {
+        "files": len(snapshot),
+        "generate_seconds": round(generate_seconds, 2),
+        "scan_ms": scan_ms,
+        "watchdog_snapshot_ms": watchdog_ms,
+        "snapshot_mb": round(snapshot_bytes / 1024 / 1024, 1),
+        "diff_unchanged_ms": diff_unchanged_ms,
+        "diff_changed_ms": diff_changed_ms,
+        "changes": changes,
+        "events_detected": len(events),
+        "idle_detection": detection_latency(root, paths, min_interval, max_interval),
+    }
+
+
+def print_report(summary: Dict[str, Any]):
+    idle = summary["idle_detection"]
+    print(f"\n{summary['files']} files (generated in {summary['generate_seconds']} s)")
+    print(f"scan (os.scandir)        {summary['scan_ms']:>10.1f} ms")
+    print(f"scan (DirectorySnapshot) {summary['watchdog_snapshot_ms']:>10.1f} ms")
+    print(f"snapshot memory          {summary['snapshot_mb']:>10.1f} MB")
+    print(f"diff, no changes         {summary['diff_unchanged_ms']:>10.1f} ms")
+    print(f"{'diff, ' + str(summary['changes']) + ' changes':<25}{summary['diff_changed_ms']:>10.1f} ms "
+          f"({summary['events_detected']} events)")
+    print(f"idle interval {idle['idle_interval_seconds']} s: detection {idle['latency_ms']} ms, "
+          f"scanning uses {idle['idle_core_share'] * 100:.1f}% of a core")
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the polling file watcher on a large synthetic tree.")
+    parser.add_argument("--files", type=int, default=100000, help="Files in the tree")
+    parser.add_argument("--dirs", type=int, default=1000, help="Directories the files are spread over")
+    parser.add_argument("--changes", type=int, default=100, help="Files modified for the diff measurement")
+    parser.add_argument("--min-interval", type=float, default=1.0, help="Polling interval after a change")
+    parser.add_argument("--max-interval", type=float, default=10.0, help="Longest idle polling interval")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--root", help="Directory for the tree (default: a temporary directory)")
+    parser.add_argument("--json", dest="json_path", help="Also write the summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    root = args.root or tempfile.mkdtemp(prefix="watcher-benchmark-")
+    try:
+        summary = run_benchmark(root, args.files, args.dirs, args.changes, args.min_interval, args.max_interval, args.seed)
+    finally:
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+    print_report(summary)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,105 @@
+"""
+Write Tokens Module
+
+This module lets the backend recognize file events caused by its own writes. Code that
+writes a hub file and broadcasts the change itself registers a short-lived write token:
+the path with the file's (mtime_ns, size) right after the write. When the file watcher
+later delivers an event for that path, the token is compared with the file's current
+state; if they match, the event is the echo of the backend's own write and is dropped.
+If the file was changed again in between (an external edit), the state differs and the
+event propagates as usual.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple, Union
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def _file_state(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class WriteTokens:
+    """Registry of recent self-originated writes, keyed by path."""
+
+    def __init__(self, ttl_seconds: float = 10.0, max_tokens: int = 1000):
+        """
+        Initialize the registry
+
+        Args:
+            ttl_seconds: How long a token stays valid; must exceed the watcher's delivery
+                delay (debounce and batching)
+            max_tokens: Maximum number of outstanding tokens
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self.registered = 0
+        self.suppressed = 0
+        self.mismatched = 0
+        self.expired = 0
+
+    def register(self, path: Union[str, Path]):
+        """Record that the backend has just written path (call after the file is closed)."""
+        key = str(path)
+        state = _file_state(key)
+        if state is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._tokens) >= self.max_tokens:
+                self._prune_locked(now)
+            self._tokens[key] = (state, now + self.ttl_seconds)
+            self.registered += 1
+
+    def is_own_write(self, path: Union[str, Path]) -> bool:
+        """
+        Check whether an event for path is the echo of a registered write
+
+        The token is consumed either way.
+
+        Returns:
+            True if the file is still exactly as the backend wrote it
+        """
+        key = str(path)
+        with self._lock:
+            token = self._tokens.pop(key, None)
+            if token is None:
+                return False
+            state, expires_at = token
+            if time.monotonic() > expires_at:
+                self.expired += 1
+                return False
+            if _file_state(key) != state:
+                self.mismatched += 1
+                return False
+            self.suppressed += 1
+            return True
+
+    def _prune_locked(self, now: float):
+        for key in [k for k, (_, expires_at) in self._tokens.items() if expires_at < now]:
+            del self._tokens[key]
+            self.expired += 1
+        while len(self._tokens) >= self.max_tokens:
+            del self._tokens[next(iter(self._tokens))]
+            self.expired += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "outstanding": len(self._tokens),
+                "registered": self.registered,
+                "suppressed": self.suppressed,
+                "mismatched": self.mismatched,
+                "expired": self.expired,
+            }
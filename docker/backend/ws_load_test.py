@@ -0,0 +1,177 @@
+"""
+WebSocket Fanout Load Test
+
+This module load-tests ConnectionManager with many in-process fake WebSocket clients, so
+slow-consumer handling can be checked without a browser or network. Clients come in
+three kinds:
+    healthy  - sends complete almost immediately
+    slow     - every send takes --slow-ms (the client reads slower than messages arrive)
+    stalled  - sends never complete (a peer that stopped reading)
+
+A mix of coalescable notifications (tasks_updated for a few projects) and
+non-coalescable ones (chat messages) is broadcast at a fixed rate. The report shows how
+long broadcast() itself takes (it should not depend on the slow clients), the delivery
+latency per client kind, and the overflow counters (coalesced messages, resyncs, send
+timeouts and disconnects).
+
+Usage:
+    python ws_load_test.py --healthy 300 --slow 50 --stalled 10 --messages 2000 --rate 100
+    python ws_load_test.py --policy resync --queue-size 64 --json results.json
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+from types import SimpleNamespace
+from typing import Dict, List, Any, Optional
+
+from connection_manager import ConnectionManager
+from llm_benchmark import percentiles
+
+KINDS = ["healthy", "slow", "stalled"]
+
+
+class FakeWebSocket:
+    """Stand-in for fastapi.WebSocket recording what it receives."""
+
+    def __init__(self, kind: str, index: int, slow_seconds: float):
+        self.kind = kind
+        self.client = SimpleNamespace(host=kind, port=index)
+        self.slow_seconds = slow_seconds
+        self.frames: List[tuple] = []  # (receive time, frame); parsed after the run to keep sends cheap
+        self.closed = False
+        self._never = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        if self.kind == "stalled":
+            await self._never.wait()
+        elif self.kind == "slow":
+            await asyncio.sleep(self.slow_seconds)
+        self.frames.append((time.perf_counter(), data))
+
+    def summarize(self) -> Dict[str, Any]:
+        resyncs = 0
+        delivery: List[float] = []
+        for received_at, data in self.frames:
+            message = json.loads(data)
+            if message.get("type") == "resync":
+                resyncs += 1
+            elif "sent_at" in message:
+                delivery.append(received_at - message["sent_at"])
+        return {"received": len(self.frames), "resyncs": resyncs, "delivery": delivery}
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+def _message(index: int, projects: int) -> Dict[str, Any]:
+    if index % 4 == 3:
+        return {"type": "chat_message_received", "session_id": "load", "index": index, "sent_at": time.perf_counter()}
+    return {"type": "tasks_updated", "project_id": f"Project-{index % projects}", "revision": index,
+            "sent_at": time.perf_counter()}
+
+
+async def run_load_test(counts: Dict[str, int], messages: int, rate: float, projects: int, slow_ms: float,
+                        queue_size: int, policy: str, send_timeout: float, drain: float, seed: int = 0) -> Dict[str, Any]:
+    random.seed(seed)
+    manager = ConnectionManager(max_queue=queue_size, overflow_policy=policy, heartbeat_interval=0,
+                                send_timeout=send_timeout)
+    sockets = [FakeWebSocket(kind, index, slow_ms / 1000) for kind in KINDS for index in range(counts[kind])]
+    random.shuffle(sockets)
+    for websocket in sockets:
+        await manager.connect(websocket)
+
+    broadcast_times: List[float] = []
+    interval = 1.0 / rate if rate > 0 else 0.0
+    started = time.perf_counter()
+    for index in range(messages):
+        due = started + index * interval
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        call_started = time.perf_counter()
+        await manager.broadcast(_message(index, projects))
+        broadcast_times.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    # Let healthy and slow clients drain and stalled sends run into the send timeout
+    await asyncio.sleep(drain)
+    stats = manager.get_stats()
+    await manager.stop()
+
+    clients: Dict[str, Any] = {}
+    for kind in KINDS:
+        group = [ws for ws in sockets if ws.kind == kind]
+        if not group:
+            continue
+        results = [ws.summarize() for ws in group]
+        clients[kind] = {
+            "clients": len(group),
+            "received_avg": round(sum(r["received"] for r in results) / len(group), 1),
+            "resyncs": sum(r["resyncs"] for r in results),
+            "closed": sum(ws.closed for ws in group),
+            "delivery": percentiles([sample for r in results for sample in r["delivery"]]),
+        }
+    return {
+        "messages": messages,
+        "target_rate": rate,
+        "achieved_rate": round(messages / elapsed, 1) if elapsed else 0.0,
+        "broadcast_call": percentiles(broadcast_times),
+        "clients": clients,
+        "manager": stats,
+    }
+
+
+def print_report(summary: Dict[str, Any]):
+    call = summary["broadcast_call"]
+    manager = summary["manager"]
+    print(f"\n{summary['messages']} messages at {summary['achieved_rate']} msg/s "
+          f"(policy {manager['overflow_policy']}, queue {manager['max_queue']})")
+    print(f"broadcast() call: avg {call['avg_ms']:.3f} ms, p99 {call['p99_ms']:.3f} ms, max {call['max_ms']:.3f} ms")
+    print(f"{'clients':<10}{'count':>7}{'recv avg':>10}{'resyncs':>9}{'closed':>8}"
+          f"{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  (delivery ms)")
+    for kind, group in summary["clients"].items():
+        delivery = group["delivery"]
+        print(f"{kind:<10}{group['clients']:>7}{group['received_avg']:>10}{group['resyncs']:>9}{group['closed']:>8}"
+              f"{delivery['p50_ms']:>10.2f}{delivery['p90_ms']:>10.2f}{delivery['p99_ms']:>10.2f}{delivery['max_ms']:>10.2f}")
+    print(f"coalesced {manager['coalesced']}, resyncs {manager['resyncs']}, "
+          f"send timeouts {manager['send_timeouts']}, send errors {manager['send_errors']}")
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test WebSocket fanout with healthy, slow and stalled clients.")
+    parser.add_argument("--healthy", type=int, default=300, help="Clients that read immediately")
+    parser.add_argument("--slow", type=int, default=50, help="Clients that take --slow-ms per message")
+    parser.add_argument("--stalled", type=int, default=10, help="Clients that never finish a send")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages broadcast")
+    parser.add_argument("--rate", type=float, default=100.0, help="Messages per second (0 = as fast as possible)")
+    parser.add_argument("--projects", type=int, default=5, help="Projects the tasks_updated messages cycle through")
+    parser.add_argument("--slow-ms", type=float, default=20.0, help="Send time of slow clients")
+    parser.add_argument("--queue-size", type=int, default=256, help="Per-client send queue size")
+    parser.add_argument("--policy", choices=["coalesce", "resync"], default="coalesce", help="Overflow policy")
+    parser.add_argument("--send-timeout", type=float, default=2.0, help="Seconds before a stalled send closes the client")
+    parser.add_argument("--drain", type=float, default=3.0, help="Seconds to wait for deliveries after the last broadcast")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write the summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    counts = {"healthy": args.healthy, "slow": args.slow, "stalled": args.stalled}
+    summary = asyncio.run(run_load_test(counts, args.messages, args.rate, args.projects, args.slow_ms,
+                                        args.queue_size, args.policy, args.send_timeout, args.drain, args.seed))
+    print_report(summary)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -65,6 +65,7 @@ function App() {
   const [wsClient, setWsClient] = useState<WebSocket | null>(null);
   const [activityItems, setActivityItems] = useState<ActivityItem[]>([]);
   const connectIntervalRef = useRef<NodeJS.Timeout | null>(null);
+  const lastEventIdRef = useRef<string | null>(null); // Sent on reconnect so the backend replays missed events
   const [isSidebarCollapsed, setSidebarCollapsed] = useState(false);
 
   // --- Lifted Chat State ---
@@ -287,7 +288,8 @@ function App() {
             return;
         }
         console.log("Attempting WebSocket connection to ws://localhost:8000/ws");
-        ws = new WebSocket('ws://localhost:8000/ws');
+        const resumeFrom = lastEventIdRef.current;
+        ws = new WebSocket(`ws://localhost:8000/ws${resumeFrom ? `?last_event_id=${encodeURIComponent(resumeFrom)}` : ''}`);
         setWsClient(ws);
 
         ws.onopen = () => {
@@ -322,6 +324,15 @@ function App() {
         ws.onmessage = (event) => {
             try {
                 const message = JSON.parse(event.data);
+                // Heartbeat: answer so the backend knows this connection is alive
+                if (message.type === 'ping') {
+                    ws?.send(JSON.stringify({ type: 'pong', ts: message.ts }));
+                    return;
+                }
+                // Remember where we are in the event stream (a resync carries the current position)
+                if (message.event_id || message.last_event_id) {
+                    lastEventIdRef.current = message.event_id ?? message.last_event_id;
+                }
                 console.log('%cWebSocket message received', 'background: #4CAF50; color: white; padding: 2px 5px; border-radius: 3px;', message);
                 
                 // Emit specific events
@@ -336,6 +347,11 @@ function App() {
                     
                     eventBus.emit(message.type, message);
 
+                    // Coalesced file changes: deliver each merged change to its usual listeners
+                    if (message.type === 'batch' && Array.isArray(message.changes)) {
+                        message.changes.forEach((change: any) => { if (change?.type) eventBus.emit(change.type, change); });
+                    }
+
                    // --- Centralized State Updates based on WS ---
                    // Example: Update chat list if a session changes
                    if (message.type === 'chat_session_updated' && message.session_id) {
@@ -427,6 +427,7 @@ const Dashboard: React.FC = () => {
          eventBus.on('alarms_updated', handleUpdate),
          eventBus.on('focus_summary_updated', (msg: any) => { if (msg.date === today) handleUpdate(msg); }),
          eventBus.on('meta_updated', handleUpdate), // Assume pinned docs are in meta
+         eventBus.on('resync', handleUpdate), // Backend dropped queued updates for this connection
          // Listen for workspace snap events to potentially update UI feedback
          eventBus.on('workspace-snap-started', () => console.log("Workspace snap started...")),
          eventBus.on('workspace-snap-success', () => console.log("Workspace snap success!")),
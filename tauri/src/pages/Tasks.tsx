@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useMemo, useCallback } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import axios from 'axios';
 import { useLocation } from 'react-router-dom';
 import { eventBus } from '../App';
@@ -21,6 +21,13 @@ interface Project {
   title: string;
 }
 
+// Revision of the loaded task list; change events carry the next revision and deltas
+interface TaskListRevision {
+  projectId: string;
+  epoch: string;
+  revision: number;
+}
+
 // --- Constants ---
 // IMPORTANT: These must match exactly what the server expects
 const COLUMN_IDS = {
@@ -29,6 +36,13 @@ const COLUMN_IDS = {
   DONE: 'done',
 };
 
+const normalizeTask = (task: any): Task => ({
+  ...task,
+  id: String(task.id),
+  // Ensure status is normalized to match our column IDs
+  status: task.status?.toLowerCase().replace(/[\s_]/g, '-') || COLUMN_IDS.TODO
+});
+
 const columnTitles = {
   [COLUMN_IDS.TODO]: 'To Do',
   [COLUMN_IDS.IN_PROGRESS]: 'In Progress',
@@ -49,6 +63,7 @@ const Tasks: React.FC = () => {
   const [error, setError] = useState<string | null>(null);
   const [draggedTask, setDraggedTask] = useState<Task | null>(null);
   const [debugInfo, setDebugInfo] = useState('');
+  const revisionRef = useRef<TaskListRevision | null>(null);
 
   // --- Data Fetching Callbacks ---
   const fetchProjects = useCallback(async () => {
@@ -98,15 +113,13 @@ const Tasks: React.FC = () => {
       setDebugInfo(`Task statuses: ${taskStatuses.join(', ')}`);
 
       // Normalize all task statuses - IMPORTANT for consistency
-      const processedTasks = fetchedTasks.map((task: any) => ({
-        ...task,
-        id: String(task.id),
-        // Ensure status is normalized to match our column IDs
-        status: task.status?.toLowerCase().replace(/[\s_]/g, '-') || COLUMN_IDS.TODO
-      }));
+      const processedTasks = fetchedTasks.map(normalizeTask);
       
       console.log('Processed tasks with normalized status:', processedTasks);
       setTasks(processedTasks);
+      revisionRef.current = response.data.epoch
+        ? { projectId, epoch: response.data.epoch, revision: response.data.revision ?? 0 }
+        : null;
     } catch (err) {
       console.error(`Error fetching tasks for project ${projectId}:`, err);
       if (axios.isAxiosError(err) && err.response?.status === 404) {
@@ -131,14 +144,44 @@ const Tasks: React.FC = () => {
   }, [selectedProject, fetchTasks]);
 
   useEffect(() => {
+    // Apply a delta that directly follows the loaded revision; anything else needs a refetch
+    const applyDelta = (message: any): boolean => {
+      const current = revisionRef.current;
+      if (!current || current.projectId !== message?.project_id || current.epoch !== message?.epoch) return false;
+      if (typeof message.revision !== 'number') return false;
+      if (message.revision <= current.revision) return true; // Already part of the loaded list
+      if (message.revision !== current.revision + 1 || !Array.isArray(message.changes)) return false;
+      setTasks(prev => {
+        let next = prev;
+        for (const change of message.changes) {
+          if (change.op === 'deleted') {
+            next = next.filter(t => t.id !== String(change.task_id));
+          } else if (change.task) {
+            const task = normalizeTask(change.task);
+            next = next.some(t => t.id === task.id) ? next.map(t => (t.id === task.id ? task : t)) : [...next, task];
+          }
+        }
+        return next;
+      });
+      revisionRef.current = { ...current, revision: message.revision };
+      return true;
+    };
+
     const handleTasksUpdate = (message: any) => {
-      if (message?.project_id && message.project_id === selectedProject) {
+      const projectIds: string[] = message?.project_ids ?? (message?.project_id ? [message.project_id] : []);
+      if (projectIds.includes(selectedProject)) {
+        if (applyDelta(message)) {
+          console.log(`Applied task delta r${message.revision} for ${selectedProject}`);
+          return;
+        }
         console.log(`Tasks updated via WebSocket for current project ${selectedProject}, refetching...`);
         fetchTasks(selectedProject);
       }
     };
     const unsubscribe = eventBus.on('tasks_updated', handleTasksUpdate);
-    return () => unsubscribe();
+    // The backend dropped queued updates for this connection (slow consumer): refetch
+    const unsubscribeResync = eventBus.on('resync', () => fetchTasks(selectedProject));
+    return () => { unsubscribe(); unsubscribeResync(); };
   }, [selectedProject, fetchTasks]);
 
   // --- Event Handlers ---